@@ -0,0 +1,74 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import require_admin
+from app.core.singleflight import product_reads
+from app.db.invalidation import publish_catalog_invalidation
+from app.db.session import get_db, slow_query_log
+from app.schemas.admin import SingleFlightKey, SlowQuery
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries", response_model=List[SlowQuery])
+def read_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Retrieve the most recent slow queries, newest first.
+    
+    Parameters:
+    - limit: Maximum number of entries to return
+    
+    Returns:
+    - List of slow queries with parameters, query plan and originating route
+    
+    Raises:
+    - 403: If the admin token is missing or invalid
+    """
+    return slow_query_log.entries(limit=limit)
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries():
+    """
+    Clear the slow-query log.
+    
+    Raises:
+    - 403: If the admin token is missing or invalid
+    """
+    slow_query_log.clear()
+
+
+@router.get("/singleflight", response_model=List[SingleFlightKey])
+def read_singleflight_metrics(
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    Retrieve coalescing counters of product reads, most shared keys first.
+    
+    Parameters:
+    - limit: Maximum number of keys to return
+    
+    Returns:
+    - Per product ID: calls, database executions, calls that shared an execution and errors
+    
+    Raises:
+    - 403: If the admin token is missing or invalid
+    """
+    return product_reads.metrics.top(limit)
+
+
+@router.post("/cache/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+def invalidate_caches(
+    db: Session = Depends(get_db),
+):
+    """
+    Drop cached products in every worker, e.g. after editing the database by hand.
+    
+    Raises:
+    - 403: If the admin token is missing or invalid
+    """
+    publish_catalog_invalidation(db)
@@ -0,0 +1,76 @@
+import json
+from typing import AsyncIterator, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.events import Subscriber, event_broker
+
+router = APIRouter()
+
+# Path of the stream, exempt from admission control: a stream holds its connection for hours
+STREAM_PATH = "/events/stream"
+
+
+async def _stream(subscriber: Subscriber) -> AsyncIterator[bytes]:
+    try:
+        # Reconnect after 3 seconds if the stream is cut
+        yield b"retry: 3000\n\n"
+        while True:
+            events = await subscriber.next_events(timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+            if subscriber.closed:
+                break
+            if not events:
+                # Keeps proxies from timing out the connection and detects dead clients
+                yield b": keepalive\n\n"
+                continue
+            yield b"".join(event.encode() for event in events)
+        if subscriber.dropped:
+            yield f"event: dropped\ndata: {json.dumps({'reason': subscriber.drop_reason})}\n\n".encode()
+    finally:
+        event_broker.unsubscribe(subscriber)
+
+
+@router.get("/stream")
+async def stream_events(
+    product_id: Optional[List[int]] = Query(None),
+    category: Optional[List[str]] = Query(None),
+):
+    """
+    Stream stock and order status changes as Server-Sent Events.
+
+    Events are `stock` ({"product_id", "stock"}) and `order` ({"order_id",
+    "status", "product_ids"}). Several changes of the same product or order
+    made before the client reads them are sent once, with the latest value.
+    Stock changes made by other workers are streamed too, within the
+    invalidation bus poll interval. Order changes are not: they are only
+    streamed by the worker that processed the order, as orders have no
+    change log to follow. A client that falls too far behind, or
+    whose changes cannot be followed, gets a `dropped` event and the stream
+    ends; it should reload what it shows and reconnect.
+
+    Parameters:
+    - product_id: Products to receive changes for (repeatable)
+    - category: Categories to receive changes for (repeatable)
+
+    With no filter, every change is streamed.
+
+    Returns:
+    - A `text/event-stream` response
+
+    Raises:
+    - 503: If the worker already serves its maximum number of streams
+    """
+    subscriber = event_broker.subscribe(product_ids=product_id or (), categories=category or ())
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event streams, retry later",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        _stream(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
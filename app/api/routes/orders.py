@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
+from app.core.profiling import ProfiledRoute
 from app.crud.order import order as crud_order
-from app.db.session import get_db
-from app.schemas.order import OrderCreate, OrderResponseWithDetails, OrderProductDetail
+from app.db.session import get_db, get_read_db
+from app.schemas.order import OrderCreate, OrderQuote, OrderResponseWithDetails, OrderProductDetail
 from app.schemas.product import Product as ProductSchema
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# POST requests to this path only read, and are admitted as reads
+QUOTE_PATH = "/orders/quote"
 
 
 @router.post("/", response_model=OrderResponseWithDetails)
@@ -66,10 +70,36 @@ def place_order(
         )
 
 
+@router.post("/quote", response_model=OrderQuote)
+def quote_order(
+    order: OrderCreate,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Price a cart without placing an order, e.g. on every cart edit.
+    
+    The cart is priced with the same promotions as order placement, so
+    placing it charges the quoted total unless prices or promotions
+    change meanwhile. Nothing is written or locked, and stock is only
+    reported, not reserved.
+    
+    Parameters:
+    - order: Order data containing products and quantities
+    
+    Returns:
+    - Every line's price, discount and promotion and whether it is in
+      stock, and the cart's subtotal, discount and total
+    
+    Raises:
+    - 404: If any product in the order doesn't exist
+    """
+    return crud_order.quote(db, obj_in=order)
+
+
 @router.get("/{order_id}", response_model=OrderResponseWithDetails)
 def get_order_by_id(
     order_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """
     Get order details by ID with complete product information.
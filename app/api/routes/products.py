@@ -1,35 +1,142 @@
-from typing import List, Any
+from datetime import datetime, timezone
+from typing import List, Any, Literal, Optional, Tuple
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
+from app.core.profiling import ProfiledRoute
+from app.crud.inventory import inventory as crud_inventory
+from app.crud.order import order as crud_order
 from app.crud.product import product as crud_product
-from app.db.session import get_db
-from app.schemas.product import Product, ProductCreate
+from app.db.session import get_db, get_read_db
+from app.schemas.inventory import InventoryMovement, StockLevel
+from app.schemas.product import (
+    Product,
+    ProductChangePage,
+    ProductCreate,
+    ProductFacets,
+    ProductLookup,
+    ProductLookupEntry,
+    ProductLookupResult,
+    ProductSuggestion,
+    ProductUpdate,
+    RelatedProduct,
+    StockAdjustmentBatch,
+    StockAdjustmentReport,
+)
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+# POST requests to this path only read, and are admitted as reads
+LOOKUP_PATH = "/products/lookup"
+
+# Keys accepted by GET /products/batch?ids=...&skus=...; POST /products/lookup takes more
+MAX_QUERY_KEYS = 100
+
+
+def _parse_keys(ids: Optional[str], skus: Optional[str]) -> Tuple[List[int], List[str]]:
+    """Split comma-separated `ids` and `skus` query parameters."""
+    id_list = [key.strip() for key in ids.split(",") if key.strip()] if ids else []
+    sku_list = [key.strip() for key in skus.split(",") if key.strip()] if skus else []
+    if len(id_list) + len(sku_list) > MAX_QUERY_KEYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_QUERY_KEYS} ids and skus can be looked up at once; use POST {LOOKUP_PATH}"
+        )
+    try:
+        return [int(key) for key in id_list], sku_list
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+
+
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def _if_match_version(if_match: Optional[str]) -> Optional[int]:
+    """Version required by an If-Match header holding one ETag of this API, or None for none or "*"."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if len(value) > 2 and value[0] == value[-1] == '"' and value[1:-1].isdigit():
+        return int(value[1:-1])
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="If-Match must be a single ETag returned by this API, or *"
+    )
 
 
 @router.get("/", response_model=List[Product])
 def read_products(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
+    category: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    sort: Literal["id", "-id", "price", "name"] = "id",
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db),
 ):
     """
-    Retrieve all products.
+    Retrieve products, optionally filtered and sorted.
     
     Parameters:
     - skip: Number of products to skip (pagination)
     - limit: Maximum number of products to return
+    - category: Only products of this category
+    - min_price / max_price: Only products in this price range (inclusive)
+    - in_stock: Only products in stock (true) or out of stock (false)
+    - sort: `id` (default), `-id` (newest first), `price` or `name`
+    - cursor: Value of the `X-Next-Cursor` header of the previous page
+    
+    When the page is full, the `X-Next-Cursor` response header holds the
+    cursor of the next page; pass it back with the same filters and sort.
     
     Returns:
     - List of products
+    
+    Raises:
+    - 400: If the cursor is malformed or was issued for another sort
     """
-    products = crud_product.get_multi(db, skip=skip, limit=limit)
+    products, next_cursor = crud_product.get_listing(
+        db, category=category, min_price=min_price, max_price=max_price, in_stock=in_stock,
+        sort=sort, cursor=cursor, skip=skip, limit=limit,
+    )
+    if next_cursor is not None:
+        response.headers["X-Next-Cursor"] = next_cursor
     return products
 
 
+@router.get("/batch", response_model=List[Optional[Product]])
+def read_products_batch(
+    ids: Optional[str] = None,
+    skus: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Look up products by ID and SKU.
+    
+    Parameters:
+    - ids: Comma-separated product IDs
+    - skus: Comma-separated product SKUs
+    
+    Returns:
+    - The products of the IDs, then of the SKUs, in request order, with
+      null for each key that matches no product
+    
+    Raises:
+    - 400: If `ids` are not integers or more than 100 keys are given
+    """
+    id_list, sku_list = _parse_keys(ids, skus)
+    by_id, by_sku = crud_product.get_many_cached(db, ids=id_list, skus=sku_list)
+    return by_id + by_sku
+
+
 @router.post("/", response_model=Product, status_code=status.HTTP_201_CREATED)
 def create_new_product(
     product: ProductCreate,
@@ -59,10 +166,129 @@ def create_new_product(
         )
 
 
+@router.post("/lookup", response_model=ProductLookupResult)
+def lookup_products(
+    lookup: ProductLookup,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Look up many products at once, e.g. for a cart page.
+    
+    Parameters:
+    - ids: Product IDs
+    - skus: Product SKUs, case-insensitive
+    
+    Returns:
+    - An entry for each ID, then each SKU, in request order, with the
+      product or `found: false`, and the number of keys not found
+    
+    Raises:
+    - 422: If no keys or more than 1000 keys are given
+    """
+    by_id, by_sku = crud_product.get_many_cached(db, ids=lookup.ids, skus=lookup.skus)
+    results = [
+        ProductLookupEntry(id=id, found=product is not None, product=product)
+        for id, product in zip(lookup.ids, by_id)
+    ] + [
+        ProductLookupEntry(sku=sku, found=product is not None, product=product)
+        for sku, product in zip(lookup.skus, by_sku)
+    ]
+    return ProductLookupResult(results=results, not_found=sum(not entry.found for entry in results))
+
+
+@router.get("/autocomplete", response_model=List[ProductSuggestion])
+def autocomplete_products(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Suggest products as the user types.
+    
+    Parameters:
+    - prefix: Start of a product name or SKU, case-insensitive
+    - limit: Maximum number of suggestions
+    
+    Returns:
+    - Matching products (id, name, sku), most ordered first
+    """
+    return crud_product.autocomplete(db, prefix=prefix, limit=limit)
+
+
+@router.get("/facets", response_model=ProductFacets)
+def read_product_facets(
+    category: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get product counts for faceted navigation.
+    
+    Parameters:
+    - category: Restrict the price histogram to this category
+    
+    Returns:
+    - Products and in-stock products per category, and per price bucket
+    """
+    return crud_product.get_facets(db, category=category)
+
+
+@router.get("/changes", response_model=ProductChangePage)
+def read_product_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get the products changed after a catalog version, for incremental sync.
+    
+    Start with `since=0`, then pass `next_since` of each page back until
+    `has_more` is false; keep `next_since` of the last page to poll for
+    later changes.
+    
+    Parameters:
+    - since: Catalog version the caller is up to date with
+    - limit: Maximum number of products to return
+    
+    Returns:
+    - Changed products at their latest version, tombstones for deleted
+      products, and the version to continue from
+    
+    Raises:
+    - 410: If changes after `since` were pruned from the log; reload the
+      catalog from GET /products/ and sync from the X-Catalog-Version header
+    """
+    return crud_product.get_changes(db, since=since, limit=limit)
+
+
+@router.patch("/stock", response_model=StockAdjustmentReport)
+def adjust_stock(
+    batch: StockAdjustmentBatch,
+    db: Session = Depends(get_db),
+):
+    """
+    Adjust the stock of many products at once, e.g. for a warehouse sync.
+    
+    Parameters:
+    - adjustments: Adjustments, each with a product `id` or `sku` and either a
+      `delta` to add or an absolute `stock`
+    - policy: "clamp" to set stock that would go negative to 0 (default),
+      "reject" to skip such adjustments
+    
+    Returns:
+    - Counts of applied, rejected and not found adjustments, and the outcome
+      and resulting stock of every adjustment in request order
+    
+    Raises:
+    - 422: If an adjustment has no or both keys, or no or both changes
+    """
+    return crud_product.adjust_stock(db, adjustments=batch.adjustments, policy=batch.policy)
+
+
 @router.get("/{product_id}", response_model=Product)
-def read_product(
+async def read_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_read_db),
 ):
     """
     Get a specific product by ID.
@@ -71,15 +297,137 @@ def read_product(
     - product_id: ID of the product to retrieve
     
     Returns:
-    - Product with matching ID
+    - Product with matching ID, with its version as the ETag header
     
     Raises:
     - 404: If product not found
     """
-    db_product = crud_product.get(db, id=product_id)
+    db_product = await crud_product.get_cached_async(db, id=product_id)
     if db_product is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Product not found"
         )
-    return db_product 
\ No newline at end of file
+    response.headers["ETag"] = _etag(db_product.version)
+    return db_product 
+
+
+@router.patch("/{product_id}", response_model=Product)
+def update_product(
+    product_id: int,
+    product: ProductUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Change some fields of a product, e.g. its price, without locking or re-reading it.
+    
+    The change is written in one statement, only if the product is still
+    at the version given by If-Match (an ETag from GET or PATCH) or by
+    `version` in the body; without either it is written whatever the
+    version. Stock is changed through PATCH /products/stock.
+    
+    Parameters:
+    - product_id: ID of the product to update
+    - product: Fields to change, and optionally the `version` they were made against
+    
+    Returns:
+    - Updated product, with its new version as the ETag header
+    
+    Raises:
+    - 400: If another product has the new name or SKU, or If-Match is malformed or disagrees with `version`
+    - 404: If product not found
+    - 409: If the product changed since the given version
+    - 422: If validation fails, no field is given or stock is given
+    """
+    version = _if_match_version(if_match)
+    if version is not None and product.version is not None and version != product.version:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match and version name different versions"
+        )
+    db_product = crud_product.patch(
+        db, id=product_id, obj_in=product, version=version if version is not None else product.version
+    )
+    response.headers["ETag"] = _etag(db_product.version)
+    return db_product
+
+
+@router.get("/{product_id}/related", response_model=List[RelatedProduct])
+def read_related_products(
+    product_id: int,
+    limit: int = Query(10, ge=1, le=20),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get the products most often bought together with a product.
+    
+    Parameters:
+    - product_id: ID of the product
+    - limit: Maximum number of products to return
+    
+    Returns:
+    - Related products with the number of orders containing both, most frequent first
+    
+    Raises:
+    - 404: If product not found
+    """
+    related = crud_order.get_bought_together(db, product_id=product_id, limit=limit)
+    if not related and crud_product.get_cached(db, id=product_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    return related
+
+
+@router.get("/{product_id}/stock", response_model=StockLevel)
+def read_product_stock(
+    product_id: int,
+    at: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get the stock of a product from the inventory ledger, now or at a point in time.
+    
+    Parameters:
+    - product_id: ID of the product
+    - at: Point in time (UTC, ISO 8601); defaults to now
+    
+    Returns:
+    - Stock after every movement recorded up to `at`
+    
+    Raises:
+    - 404: If product not found
+    """
+    if crud_product.get(db, id=product_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    if at is not None and at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    stock = crud_inventory.stock_at(db, product_id=product_id, at=at)
+    return StockLevel(product_id=product_id, stock=stock, at=at or datetime.utcnow())
+
+
+@router.get("/{product_id}/movements", response_model=List[InventoryMovement])
+def read_product_movements(
+    product_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+):
+    """
+    Get the inventory movements of a product, newest first.
+    
+    Parameters:
+    - product_id: ID of the product
+    - skip: Number of movements to skip (pagination)
+    - limit: Maximum number of movements to return
+    
+    Returns:
+    - List of movements with their delta, reason and order
+    """
+    return crud_inventory.get_movements(db, product_id=product_id, skip=skip, limit=limit)
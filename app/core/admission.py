@@ -0,0 +1,218 @@
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Iterable, Optional
+
+from fastapi import HTTPException
+
+# Monotonic time by which the current request has to finish, set by AdmissionMiddleware
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# Limiter that admitted the current request, for the Retry-After of check_deadline()
+_limiter: ContextVar[Optional["AdmissionLimiter"]] = ContextVar("request_limiter", default=None)
+
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def remaining_time() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline() -> None:
+    """
+    Stop work for a request whose client has given up.
+
+    Raises:
+        HTTPException: 503 with Retry-After, as for shed requests, if the request's deadline has passed
+    """
+    remaining = remaining_time()
+    if remaining is not None and remaining <= 0:
+        limiter = _limiter.get()
+        raise HTTPException(
+            status_code=503,
+            detail="Request deadline exceeded",
+            headers={"Retry-After": str(limiter.retry_after() if limiter is not None else 1)},
+        )
+
+
+class AdmissionLimiter:
+    """
+    Concurrency limit with a bounded FIFO wait queue, for one event loop.
+
+    **Parameters**
+
+    * `name`: Name used in rejections, e.g. "read" or "write"
+    * `limit`: Requests allowed to run at once
+    * `max_queue`: Requests allowed to wait; more are rejected immediately
+    * `max_wait`: Seconds a request may wait before it is rejected
+    """
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of seconds a request holds its slot, for Retry-After
+        self._service_time = 0.05
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, timeout: float) -> bool:
+        """
+        Wait for a slot.
+
+        Args:
+            timeout: Seconds to wait at most, further capped by `max_wait`
+
+        Returns:
+            True if admitted, False if rejected
+        """
+        if self.in_flight < self.limit and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        timeout = min(timeout, self.max_wait)
+        if len(self._waiters) >= self.max_queue or timeout <= 0:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.rejected += 1
+            return False
+        except BaseException:
+            # Cancelled while waiting; give back a slot handed over meanwhile
+            self._discard(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        self.admitted += 1
+        return True
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, service_time: Optional[float] = None) -> None:
+        """Free a slot, handing it straight to the longest waiting request."""
+        if service_time is not None:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain, at least 1."""
+        return max(1, math.ceil(self._service_time * (len(self._waiters) + 1) / self.limit))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware that sheds load before it reaches the threadpool.
+
+    Reads and writes get separate limiters, so browsing keeps its own capacity
+    while order placement is throttled. A request that cannot be admitted
+    within its limiter's wait budget, or before its deadline, gets an immediate
+    `503` with `Retry-After` instead of queueing until the client times out.
+    The deadline is the arrival time plus `X-Request-Timeout` seconds (or
+    `default_timeout`), and is available to downstream code via
+    `remaining_time()` and `check_deadline()`.
+
+    **Parameters**
+
+    * `app`: ASGI application to wrap
+    * `read`: Limiter for GET, HEAD and OPTIONS requests
+    * `write`: Limiter for every other method
+    * `default_timeout`: Deadline in seconds for requests without a finite `X-Request-Timeout`
+    * `exempt_paths`: Paths never limited, such as health checks
+    * `read_paths`: Paths whose requests are reads whatever their method, such as lookups with a body
+    """
+
+    def __init__(self, app, read: AdmissionLimiter, write: AdmissionLimiter, default_timeout: float = 30.0,
+                 exempt_paths: Iterable[str] = ("/", "/ready"), read_paths: Iterable[str] = ()):
+        self.app = app
+        self.read = read
+        self.write = write
+        self.default_timeout = default_timeout
+        self.exempt_paths = frozenset(exempt_paths)
+        self.read_paths = frozenset(read_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        arrived = time.monotonic()
+        timeout = self._timeout(scope)
+        if scope["method"] in READ_METHODS or scope["path"] in self.read_paths:
+            limiter = self.read
+        else:
+            limiter = self.write
+        if not await limiter.acquire(timeout):
+            await self._reject(send, limiter)
+            return
+
+        token = _deadline.set(arrived + timeout)
+        limiter_token = _limiter.set(limiter)
+        admitted = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _limiter.reset(limiter_token)
+            _deadline.reset(token)
+            limiter.release(time.monotonic() - admitted)
+
+    def _timeout(self, scope) -> float:
+        for name, value in scope.get("headers") or []:
+            if name == b"x-request-timeout":
+                try:
+                    timeout = float(value)
+                except ValueError:
+                    break
+                # nan or inf would be a deadline that never passes
+                if math.isfinite(timeout):
+                    return max(timeout, 0.0)
+                break
+        return self.default_timeout
+
+    @staticmethod
+    async def _reject(send, limiter: AdmissionLimiter) -> None:
+        body = json.dumps({"detail": f"Server is busy ({limiter.name} capacity), retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(limiter.retry_after()).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
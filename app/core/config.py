@@ -24,9 +24,120 @@ class Settings(BaseSettings):
     # Security settings
     SECRET_KEY: str = os.environ.get("SECRET_KEY", "dev_secret_key")
     
+    # Token expected in the X-Admin-Token header by the /admin endpoints and profiling
+    # headers; both are disabled while it is empty
+    ADMIN_TOKEN: str = os.environ.get("ADMIN_TOKEN", "")
+    
     # CORS settings
     BACKEND_CORS_ORIGINS: list[str] = ["*"]
 
+    # In-process cache of products served by GET /products/{id}; 0 disables it
+    PRODUCT_CACHE_SIZE: int = 10000
+
+    # Connection pool of the application engine
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+
+    # Separate engine and pool for endpoints that only read. Its SQLite connections are
+    # query_only; READ_DATABASE_URL points it at a replica instead of the main database.
+    DB_READ_ENGINE_ENABLED: bool = True
+    READ_DATABASE_URL: str = ""
+    DB_READ_POOL_SIZE: int = 10
+    DB_READ_MAX_OVERFLOW: int = 10
+    # Reads of a client that wrote within this many seconds use the write engine (cookie based); 0 disables
+    DB_READ_YOUR_WRITES_SECONDS: float = 0.0
+
+    # Admission control: separate concurrency limits and wait queues for reads and writes.
+    # Keep READ_LIMIT within the read pool (DB_READ_POOL_SIZE + DB_READ_MAX_OVERFLOW) and
+    # WRITE_LIMIT within DB_POOL_SIZE + DB_MAX_OVERFLOW, or their sum within the latter
+    # without a read engine: a session is only closed by a threadpool thread, so more
+    # admitted requests than connections can leave every thread waiting for a connection.
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_LIMIT: int = 10
+    ADMISSION_READ_QUEUE: int = 256
+    ADMISSION_READ_MAX_WAIT_MS: float = 2000.0
+    ADMISSION_WRITE_LIMIT: int = 4
+    ADMISSION_WRITE_QUEUE: int = 64
+    ADMISSION_WRITE_MAX_WAIT_MS: float = 500.0
+    # Deadline of requests that do not send X-Request-Timeout
+    ADMISSION_DEFAULT_TIMEOUT_SECONDS: float = 30.0
+
+    # Server-Sent Events stream of stock and order changes (GET /events/stream)
+    EVENTS_MAX_SUBSCRIBERS: int = 10000
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
+
+    # Share one database load between concurrent reads of the same product
+    SINGLEFLIGHT_ENABLED: bool = True
+
+    # Cross-worker invalidation of in-process caches
+    INVALIDATION_BUS_ENABLED: bool = True
+    INVALIDATION_POLL_SECONDS: float = 0.5
+
+    # Pruning of the productchange log; GET /products/changes answers 410 for versions pruned since
+    PRODUCT_CHANGE_PRUNE_ENABLED: bool = True
+    PRODUCT_CHANGE_RETENTION_HOURS: float = 168.0
+    PRODUCT_CHANGE_PRUNE_SECONDS: float = 600.0
+    PRODUCT_CHANGE_PRUNE_BATCH: int = 10000
+
+    # Background folding of the inventory ledger into per-product stock snapshots
+    INVENTORY_COMPACTION_ENABLED: bool = True
+    INVENTORY_COMPACTION_SECONDS: float = 60.0
+    INVENTORY_COMPACTION_BATCH: int = 10000
+
+    # Archival of completed orders older than AFTER_DAYS out of the order table into compressed chunks;
+    # opt-in, as it moves rows out of the order table of an existing deployment
+    ORDER_ARCHIVE_ENABLED: bool = False
+    ORDER_ARCHIVE_AFTER_DAYS: float = 90.0
+    ORDER_ARCHIVE_SECONDS: float = 3600.0
+    ORDER_ARCHIVE_BATCH: int = 10000
+    ORDER_ARCHIVE_CHUNK: int = 1000
+
+    # In-memory prefix index behind GET /products/autocomplete
+    AUTOCOMPLETE_ENABLED: bool = True
+    AUTOCOMPLETE_REBUILD_SECONDS: float = 600.0
+    AUTOCOMPLETE_MAX_PENDING: int = 1000
+    AUTOCOMPLETE_RECENT_ORDERS: int = 100000
+
+    # JSON file of promotions applied to quotes and orders, {"promotions": [...]}; none when empty
+    PRICING_RULES_PATH: str = ""
+
+    # Co-occurrence matrix behind GET /products/{id}/related
+    RECOMMENDATIONS_ENABLED: bool = True
+    RECOMMENDATIONS_TOP_K: int = 20
+    RECOMMENDATIONS_REBUILD_SECONDS: float = 3600.0
+    RECOMMENDATIONS_BATCH_SIZE: int = 10000
+
+    # In-memory filter of product names and SKUs that lets creates skip uniqueness queries
+    PRODUCT_KEY_FILTER_ENABLED: bool = False
+    PRODUCT_KEY_FILTER_CAPACITY: int = 100000
+    PRODUCT_KEY_FILTER_ERROR_RATE: float = 0.01
+
+    # Memory-mapped catalog snapshot serving product reads without queries
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_PATH: str = "./catalog.snapshot"
+    CATALOG_SNAPSHOT_POLL_SECONDS: float = 1.0
+    CATALOG_SNAPSHOT_REBUILD_SECONDS: float = 30.0
+
+    # Startup warm-up settings
+    WARMUP_ENABLED: bool = True
+    WARMUP_BUDGET_SECONDS: float = 10.0
+    WARMUP_TOP_PRODUCTS: int = 1000
+
+    # Slow-query log settings
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    SLOW_QUERY_SAMPLE_RATE: float = 1.0
+    SLOW_QUERY_LOG_SIZE: int = 100
+
+    # Per-request profiling settings
+    PROFILING_ENABLED: bool = False
+    PROFILING_MODE: str = "sampling"  # "sampling" or "cprofile"
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SAMPLE_INTERVAL_MS: float = 1.0
+    PROFILING_SPOOL_DIR: str = "./profiles"
+    PROFILING_SPOOL_MAX_FILES: int = 100
+
     class Config:
         case_sensitive = True
         env_file = ".env"
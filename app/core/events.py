@@ -0,0 +1,281 @@
+"""
+In-process fan-out of stock and order status changes to Server-Sent Events streams.
+
+CRUD writes publish events from threadpool threads; the broker hands them
+to the event loop in one call and delivers each event only to the
+subscribers whose filter it matches, found through per-product and
+per-category indexes rather than by scanning every subscriber. Each
+subscriber has a bounded queue keyed by product or order, so rapid updates
+of the same product coalesce into the latest one, and a subscriber whose
+queue is full of distinct keys is dropped instead of buffering without
+bound. An idle subscriber is a parked coroutine and a few small objects.
+
+Changes made by other workers arrive through the invalidation bus, see
+app/db/stock_events.py, so a write may be published twice: by its own
+worker and again when the bus reports it. The broker remembers the stock
+it last sent per product and drops a stock event that repeats it.
+"""
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set
+
+from app.core.config import settings
+
+STOCK_EVENT = "stock"
+ORDER_EVENT = "order"
+
+
+class Event:
+    """
+    A change delivered to subscribers.
+
+    **Parameters**
+
+    * `kind`: STOCK_EVENT or ORDER_EVENT
+    * `key`: Identity used to coalesce, e.g. ("stock", product_id)
+    * `data`: JSON-serializable payload
+    * `product_ids`: Products the change concerns
+    * `categories`: Categories of those products, if known
+    """
+
+    __slots__ = ("kind", "key", "data", "product_ids", "categories", "_encoded")
+
+    def __init__(self, kind: str, key: Hashable, data: Dict[str, Any], product_ids: Iterable[int],
+                 categories: Iterable[str] = ()):
+        self.kind = kind
+        self.key = key
+        self.data = data
+        self.product_ids = frozenset(product_ids)
+        self.categories = frozenset(categories)
+        self._encoded: Optional[bytes] = None
+
+    def encode(self) -> bytes:
+        """The event as an SSE frame, serialized once however many subscribers get it."""
+        if self._encoded is None:
+            self._encoded = f"event: {self.kind}\ndata: {json.dumps(self.data)}\n\n".encode()
+        return self._encoded
+
+
+def stock_event(product_id: int, stock: int, category: Optional[str] = None) -> Event:
+    return Event(
+        STOCK_EVENT, (STOCK_EVENT, product_id),
+        {"product_id": product_id, "stock": stock}, [product_id], [category] if category else (),
+    )
+
+
+def order_event(order_id: int, status: str, product_ids: Iterable[int], categories: Iterable[str] = ()) -> Event:
+    product_ids = sorted(set(product_ids))
+    return Event(
+        ORDER_EVENT, (ORDER_EVENT, order_id),
+        {"order_id": order_id, "status": status, "product_ids": product_ids}, product_ids, categories,
+    )
+
+
+class Subscriber:
+    """
+    One stream's filter and queue of pending events; used on the event loop only.
+
+    **Parameters**
+
+    * `product_ids`: Products to receive events for
+    * `categories`: Categories to receive events for
+    * `max_pending`: Distinct pending events before the subscriber is dropped
+
+    With neither filter, every event is received.
+    """
+
+    def __init__(self, product_ids: FrozenSet[int] = frozenset(), categories: FrozenSet[str] = frozenset(),
+                 max_pending: int = 100):
+        self.product_ids = product_ids
+        self.categories = categories
+        self.max_pending = max_pending
+        self.dropped = False
+        self.drop_reason: Optional[str] = None
+        self.closed = False
+        self._pending: "OrderedDict[Hashable, Event]" = OrderedDict()
+        self._wakeup = asyncio.Event()
+
+    def offer(self, event: Event) -> bool:
+        """Queue an event, replacing a pending one with the same key; False if the queue is full."""
+        if event.key in self._pending:
+            self._pending[event.key] = event
+            return True
+        if len(self._pending) >= self.max_pending:
+            return False
+        self._pending[event.key] = event
+        self._wakeup.set()
+        return True
+
+    def close(self, dropped: bool = False, reason: Optional[str] = None) -> None:
+        if dropped and not self.dropped:
+            self.dropped, self.drop_reason = True, reason
+        self.closed = True
+        self._wakeup.set()
+
+    async def next_events(self, timeout: Optional[float] = None) -> List[Event]:
+        """
+        Wait for pending events and take them all.
+
+        Returns:
+            Pending events, oldest key first; empty on timeout or once closed
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._wakeup.clear()
+        if self.closed:
+            return []
+        events = list(self._pending.values())
+        self._pending.clear()
+        return events
+
+
+class EventBroker:
+    """
+    Delivers published events to matching subscribers on one event loop.
+
+    **Parameters**
+
+    * `max_subscribers`: Subscribers allowed at once
+    * `queue_size`: Distinct pending events per subscriber before it is dropped
+    * `stock_memory`: Products whose last sent stock is remembered to drop repeats
+    """
+
+    def __init__(self, max_subscribers: int = 10_000, queue_size: int = 100, stock_memory: int = 10_000):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.stock_memory = stock_memory
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[Subscriber] = set()
+        self._unfiltered: Set[Subscriber] = set()
+        self._by_product: Dict[int, Set[Subscriber]] = {}
+        self._by_category: Dict[str, Set[Subscriber]] = {}
+        self._last_stock: "OrderedDict[int, int]" = OrderedDict()
+
+    @property
+    def has_subscribers(self) -> bool:
+        # Read from other threads; a stale answer only delays or wastes one publish
+        return bool(self._subscribers)
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def stop(self) -> None:
+        """Close every stream, e.g. so the server can shut down."""
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+            self.unsubscribe(subscriber)
+        self._loop = None
+
+    def subscribe(self, product_ids: Iterable[int] = (), categories: Iterable[str] = ()) -> Optional[Subscriber]:
+        """
+        Register a stream; call on the event loop.
+
+        Returns:
+            The subscriber, or None if the broker is full or not started
+        """
+        if self._loop is None or len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(frozenset(product_ids), frozenset(categories), self.queue_size)
+        self._subscribers.add(subscriber)
+        if not subscriber.product_ids and not subscriber.categories:
+            self._unfiltered.add(subscriber)
+        for product_id in subscriber.product_ids:
+            self._by_product.setdefault(product_id, set()).add(subscriber)
+        for category in subscriber.categories:
+            self._by_category.setdefault(category, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        self._unfiltered.discard(subscriber)
+        for index, keys in ((self._by_product, subscriber.product_ids), (self._by_category, subscriber.categories)):
+            for key in keys:
+                subscribers = index.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscriber)
+                    if not subscribers:
+                        del index[key]
+        if not self._subscribers:
+            # Stock may change unseen until the next subscriber, who loads it on connect
+            self._last_stock.clear()
+
+    def publish(self, events: Iterable[Event]) -> None:
+        """Hand events to the event loop; safe to call from any thread, cheap with no subscribers."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        events = list(events)
+        if not events:
+            return
+        try:
+            loop.call_soon_threadsafe(self._dispatch, events)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
+
+    def drop_all(self, reason: str) -> None:
+        """Drop every stream so its client reloads and reconnects; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        try:
+            loop.call_soon_threadsafe(self._drop_all, reason)
+        except RuntimeError:
+            # Loop closed during shutdown
+            pass
+
+    def _drop_all(self, reason: str) -> None:
+        for subscriber in list(self._subscribers):
+            self.dropped += 1
+            subscriber.close(dropped=True, reason=reason)
+            self.unsubscribe(subscriber)
+
+    def _dispatch(self, events: List[Event]) -> None:
+        for event in events:
+            if not self._subscribers:
+                return
+            if event.kind == STOCK_EVENT and not self._remember_stock(event):
+                continue
+            self.published += 1
+            targets = set(self._unfiltered)
+            for product_id in event.product_ids:
+                targets.update(self._by_product.get(product_id, ()))
+            for category in event.categories:
+                targets.update(self._by_category.get(category, ()))
+            for subscriber in targets:
+                if subscriber.offer(event):
+                    self.delivered += 1
+                else:
+                    # Too slow to keep up: drop it so it reconnects and resyncs
+                    self.dropped += 1
+                    subscriber.close(dropped=True, reason="slow consumer")
+                    self.unsubscribe(subscriber)
+
+    def _remember_stock(self, event: Event) -> bool:
+        """Record the stock an event sends; False if it was the last stock sent for the product."""
+        product_id, stock = event.data["product_id"], event.data["stock"]
+        if self._last_stock.get(product_id) == stock:
+            return False
+        self._last_stock[product_id] = stock
+        self._last_stock.move_to_end(product_id)
+        if len(self._last_stock) > self.stock_memory:
+            self._last_stock.popitem(last=False)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
+
+
+event_broker = EventBroker(max_subscribers=settings.EVENTS_MAX_SUBSCRIBERS, queue_size=settings.EVENTS_QUEUE_SIZE)
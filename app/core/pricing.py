@@ -0,0 +1,152 @@
+"""
+Pricing of order lines with promotions.
+
+Promotions are compiled when they are loaded into a PromotionTable per
+product ID and per category they apply to. Pricing a line is then two
+dictionary lookups and a bisection in each table found, however many
+promotions are loaded, so a quote costs O(lines).
+
+A line gets the largest discount of the promotions that apply to it;
+promotions do not stack. Lines are priced independently, including lines
+of the same product.
+
+Quotes and order placement price carts with the same engine, so a quote
+matches the charge as long as prices and promotions do not change in
+between.
+"""
+import bisect
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.schemas.order import OrderQuote, QuoteLine
+from app.schemas.pricing import BuyXGetY, PercentOff, Promotion, PromotionSet, TieredDiscount
+
+
+class PromotionTable:
+    """
+    Promotions applying to one product or one category, merged for lookup.
+
+    Percentage discounts, flat or by quantity tier, become one step function
+    of the quantity holding the best percentage from each quantity on, so a
+    line costs one bisection however many of them apply. Buy-X-get-Y
+    promotions are kept once per distinct (buy, get).
+
+    **Parameters**
+
+    * `promotions`: Promotions to merge, in load order; of equal ones the first is named
+    """
+
+    def __init__(self, promotions: Iterable[Promotion]):
+        steps: List[Tuple[int, float, int, str]] = []
+        offers: Dict[Tuple[int, int], str] = {}
+        for order, promotion in enumerate(promotions):
+            if isinstance(promotion, PercentOff):
+                steps.append((1, promotion.percent / 100, order, promotion.name))
+            elif isinstance(promotion, TieredDiscount):
+                steps.extend((tier.min_quantity, tier.percent / 100, order, promotion.name) for tier in promotion.tiers)
+            elif isinstance(promotion, BuyXGetY):
+                offers.setdefault((promotion.buy, promotion.get), promotion.name)
+            else:
+                raise ValueError(f"Unknown promotion type: {promotion.type}")
+        self.thresholds: List[int] = []
+        self.rates: List[Tuple[float, str]] = []
+        best: Tuple[float, int, str] = (0.0, 0, "")
+        for min_quantity, rate, order, name in sorted(steps):
+            if rate > best[0] or (rate == best[0] and order < best[1]):
+                best = (rate, order, name)
+                if self.thresholds and self.thresholds[-1] == min_quantity:
+                    self.rates[-1] = (rate, name)
+                else:
+                    self.thresholds.append(min_quantity)
+                    self.rates.append((rate, name))
+        self.offers = [(buy + get, get, name) for (buy, get), name in offers.items()]
+
+    def best(self, unit_price: float, quantity: int, subtotal: float) -> Tuple[float, Optional[str]]:
+        """Largest discount of a line, rounded to cents, and the promotion giving it."""
+        discount, promotion = 0.0, None
+        step = bisect.bisect_right(self.thresholds, quantity) - 1
+        if step >= 0:
+            rate, promotion = self.rates[step]
+            discount = round(subtotal * rate, 2)
+        for group, free, name in self.offers:
+            amount = round(unit_price * (quantity // group) * free, 2)
+            if amount > discount:
+                discount, promotion = amount, name
+        return min(discount, subtotal), promotion
+
+
+class PricingEngine:
+    """Prices carts with the loaded promotions; loading new ones swaps the lookup tables at once."""
+
+    def __init__(self):
+        # Promotions by product ID and by category
+        self._tables: Tuple[Dict[int, PromotionTable], Dict[str, PromotionTable]] = ({}, {})
+        self.promotions = 0
+
+    def load(self, promotions: Iterable[Promotion]) -> int:
+        """
+        Compile promotions into lookup tables and price with them from now on.
+
+        Returns:
+            Number of promotions loaded
+        """
+        by_product: Dict[int, List[Promotion]] = {}
+        by_category: Dict[str, List[Promotion]] = {}
+        count = 0
+        for promotion in promotions:
+            if promotion.category is not None:
+                by_category.setdefault(promotion.category, []).append(promotion)
+            for product_id in promotion.product_ids:
+                by_product.setdefault(product_id, []).append(promotion)
+            count += 1
+        self._tables = (
+            {product_id: PromotionTable(applying) for product_id, applying in by_product.items()},
+            {category: PromotionTable(applying) for category, applying in by_category.items()},
+        )
+        self.promotions = count
+        return count
+
+    def load_file(self, path: str) -> int:
+        """Load promotions from a JSON file holding {"promotions": [...]}."""
+        with open(path) as f:
+            promotion_set = PromotionSet.model_validate(json.load(f))
+        return self.load(promotion_set.promotions)
+
+    def price_line(self, product: Any, quantity: int) -> QuoteLine:
+        """Price `quantity` units of a product, read from its `id`, `category`, `price` and `stock`."""
+        by_product, by_category = self._tables
+        subtotal = round(product.price * quantity, 2)
+        discount, promotion = 0.0, None
+        for table in (by_product.get(product.id), by_category.get(product.category)):
+            if table is not None:
+                amount, name = table.best(product.price, quantity, subtotal)
+                if amount > discount:
+                    discount, promotion = amount, name
+        return QuoteLine(
+            product_id=product.id,
+            quantity=quantity,
+            unit_price=product.price,
+            subtotal=subtotal,
+            discount=discount,
+            total=round(subtotal - discount, 2),
+            promotion=promotion,
+            in_stock=product.stock >= quantity,
+        )
+
+    def quote(self, lines: Iterable[Tuple[Any, int]]) -> OrderQuote:
+        """
+        Price a cart.
+
+        Args:
+            lines: (product, quantity) of every line
+
+        Returns:
+            Priced lines and the cart's subtotal, discount and total
+        """
+        priced = [self.price_line(product, quantity) for product, quantity in lines]
+        subtotal = round(sum(line.subtotal for line in priced), 2)
+        total = round(sum(line.total for line in priced), 2)
+        return OrderQuote(lines=priced, subtotal=subtotal, discount=round(subtotal - total, 2), total_price=total)
+
+
+pricing_engine = PricingEngine()
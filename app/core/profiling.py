@@ -0,0 +1,307 @@
+import asyncio
+import cProfile
+import functools
+import marshal
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+from app.core.config import settings
+from app.core.request_context import describe_route
+
+# Profile recorder for the request being served, set by ProfilingMiddleware
+_active_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("active_profile", default=None)
+
+
+class StackSampler:
+    """
+    Sampling profiler for a single thread.
+
+    A daemon thread periodically captures the target thread's stack and
+    counts identical stacks, which renders directly to the collapsed format
+    read by flamegraph.pl, speedscope and most other flamegraph tools.
+
+    **Parameters**
+
+    * `thread_id`: Identifier of the thread to sample
+    * `interval`: Seconds between samples
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = frame.f_globals.get("__name__", "?")
+            names.append(f"{module}:{code.co_name}:{code.co_firstlineno}".replace(";", ":"))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def render(self) -> bytes:
+        """Render samples in collapsed-stack format, one `stack count` per line."""
+        lines = [f"{stack} {count}" for stack, count in self.samples.most_common()]
+        return ("\n".join(lines) + "\n").encode() if lines else b""
+
+
+class RequestProfile:
+    """
+    Profile of one request, recorded in whichever thread runs its handler.
+
+    Sync endpoints run in the threadpool, so recording has to start in that
+    worker thread rather than in the middleware; ProfiledRoute does that. For
+    async endpoints the event loop thread is profiled, which also picks up
+    any other coroutine that runs while the handler is awaiting.
+
+    **Parameters**
+
+    * `mode`: "sampling" for collapsed stacks or "cprofile" for pstats output
+    * `interval`: Seconds between samples in sampling mode
+    """
+
+    def __init__(self, mode: str = "sampling", interval: float = 0.001):
+        self.mode = mode
+        self.interval = interval
+        self._sampler: Optional[StackSampler] = None
+        self._profiler: Optional[cProfile.Profile] = None
+
+    @property
+    def extension(self) -> str:
+        return "prof" if self.mode == "cprofile" else "folded"
+
+    @contextmanager
+    def record(self) -> Iterator[None]:
+        """Profile the current thread for the duration of the block."""
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+            try:
+                yield
+            finally:
+                self._profiler.disable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+            try:
+                yield
+            finally:
+                self._sampler.stop()
+
+    def render(self) -> bytes:
+        """Serialize the profile: pstats marshal data or collapsed stacks."""
+        if self._profiler is not None:
+            self._profiler.create_stats()
+            return marshal.dumps(self._profiler.stats)
+        if self._sampler is not None:
+            return self._sampler.render()
+        return b""
+
+
+def profiled(endpoint: Callable) -> Callable:
+    """Wrap an endpoint so it is profiled when the request carries a RequestProfile."""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def async_wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            with profile.record():
+                return await endpoint(*args, **kwargs)
+        async_wrapper.__profiled__ = True
+        return async_wrapper
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _active_profile.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        with profile.record():
+            return endpoint(*args, **kwargs)
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that wraps its endpoint with `profiled` when profiling is enabled."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # include_router() re-creates routes from already wrapped endpoints
+        if settings.PROFILING_ENABLED and not getattr(endpoint, "__profiled__", False):
+            endpoint = profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfileSpool:
+    """
+    Bounded on-disk directory of profiles; the oldest files are removed first.
+
+    **Parameters**
+
+    * `directory`: Directory the profiles are written to
+    * `max_files`: Maximum number of profiles kept
+    """
+
+    def __init__(self, directory: str, max_files: int = 100):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def write(self, data: bytes, route: Optional[str], extension: str) -> str:
+        """
+        Store a profile and prune the spool.
+
+        Args:
+            data: Rendered profile
+            route: Route the profile was recorded for
+            extension: File extension matching the profile format
+
+        Returns:
+            Path of the stored profile
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route or "request").strip("-")
+        path = os.path.join(self.directory, f"{time.time_ns()}-{slug}.{extension}")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._prune()
+        return path
+
+    def files(self) -> List[str]:
+        """List stored profiles, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory) if not name.endswith(".tmp"))
+
+    def _prune(self) -> None:
+        with self._lock:
+            names = self.files()
+            for name in names[:max(len(names) - self.max_files, 0)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that decides which requests are profiled.
+
+    A request is profiled when it sends `X-Profile: attachment` or
+    `X-Profile: spool` together with a valid `X-Admin-Token` (never while
+    ADMIN_TOKEN is empty), or when it is
+    picked by the sampling rate. Attachment profiles replace the response
+    body, with the original status in `X-Profiled-Status`; spooled and sampled
+    profiles are written to the spool and the response is left untouched.
+
+    **Parameters**
+
+    * `app`: ASGI application to wrap
+    * `spool`: Where spooled profiles are stored
+    * `sample_rate`: Fraction of requests profiled without a header
+    * `mode`: Profile format, see RequestProfile
+    * `interval`: Seconds between samples in sampling mode
+    """
+
+    def __init__(self, app, spool: ProfileSpool, sample_rate: float = 0.0,
+                 mode: str = "sampling", interval: float = 0.001):
+        self.app = app
+        self.spool = spool
+        self.sample_rate = sample_rate
+        self.mode = mode
+        self.interval = interval
+        self._random = random.Random()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        output = self._requested_output(scope)
+        if output is None and self.sample_rate > 0 and self._random.random() < self.sample_rate:
+            output = "spool"
+        if output is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(self.mode, self.interval)
+        token = _active_profile.set(profile)
+        try:
+            if output == "spool":
+                await self.app(scope, receive, send)
+            else:
+                status = await self._run_discarding_body(scope, receive)
+        finally:
+            _active_profile.reset(token)
+
+        data = await asyncio.get_running_loop().run_in_executor(None, profile.render)
+        if output == "spool":
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.spool.write, data, describe_route(scope), profile.extension
+            )
+            return
+
+        filename = f"profile-{time.time_ns()}.{profile.extension}"
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/octet-stream"),
+                (b"content-disposition", f'attachment; filename="{filename}"'.encode()),
+                (b"content-length", str(len(data)).encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": data})
+
+    async def _run_discarding_body(self, scope, receive) -> int:
+        status = 500
+
+        async def capture(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        await self.app(scope, receive, capture)
+        return status
+
+    @staticmethod
+    def _requested_output(scope) -> Optional[str]:
+        headers = dict(scope.get("headers") or [])
+        output = headers.get(b"x-profile", b"").decode().lower()
+        if output not in ("attachment", "spool"):
+            return None
+        token = headers.get(b"x-admin-token", b"").decode()
+        if not settings.ADMIN_TOKEN or not secrets.compare_digest(token, settings.ADMIN_TOKEN):
+            return None
+        return output
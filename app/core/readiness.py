@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class Readiness:
+    """
+    Tracks the startup steps a worker has to finish before it takes traffic.
+
+    Liveness (`GET /`) only says the process is up; readiness (`GET /ready`)
+    additionally requires every startup step to have completed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+        self._steps: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    @property
+    def steps(self) -> Dict[str, float]:
+        """Completed startup steps and how long each took, in milliseconds."""
+        with self._lock:
+            return dict(self._steps)
+
+    @contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        """Time a startup step and record it once it completes."""
+        started = time.perf_counter()
+        yield
+        with self._lock:
+            self._steps[name] = round((time.perf_counter() - started) * 1000, 2)
+
+    def mark_ready(self) -> None:
+        self._ready = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._ready = False
+            self._steps.clear()
+
+
+readiness = Readiness()
@@ -0,0 +1,47 @@
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+# ASGI scope of the request currently being served. Context variables are
+# copied into the threadpool that runs sync endpoints, so code deep in the
+# CRUD or database layer can still tell which request it is working for.
+_current_scope: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_scope", default=None)
+
+
+def describe_route(scope: Dict[str, Any]) -> str:
+    """
+    Describe the route of a request.
+
+    Args:
+        scope: ASGI scope of the request
+
+    Returns:
+        "METHOD /route/{template}" once routing has happened, the raw path before that
+    """
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+def current_route() -> Optional[str]:
+    """Describe the route of the request being served, or None outside of a request."""
+    scope = _current_scope.get()
+    if scope is None:
+        return None
+    return describe_route(scope)
+
+
+class RequestContextMiddleware:
+    """ASGI middleware that publishes the current request scope to the context."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = _current_scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_scope.reset(token)
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class SingleFlightMetrics:
+    """
+    Per-key counters of coalesced calls, kept for the most recently used keys.
+
+    **Parameters**
+
+    * `max_keys`: Number of keys tracked; the least recently used are dropped
+    """
+
+    def __init__(self, max_keys: int = 1000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._keys: OrderedDict = OrderedDict()
+
+    def record(self, key: Hashable, *, shared: bool, error: bool) -> None:
+        with self._lock:
+            stats = self._keys.get(key)
+            if stats is None:
+                stats = self._keys[key] = {"calls": 0, "executions": 0, "shared": 0, "errors": 0}
+                while len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            else:
+                self._keys.move_to_end(key)
+            stats["calls"] += 1
+            stats["shared" if shared else "executions"] += 1
+            stats["errors"] += error
+
+    def top(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Keys with the most shared calls first."""
+        with self._lock:
+            entries = [dict(stats, key=str(key)) for key, stats in self._keys.items()]
+        entries.sort(key=lambda entry: (entry["shared"], entry["calls"]), reverse=True)
+        return entries[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+class _Call:
+    __slots__ = ("generation", "done", "result", "error")
+
+    def __init__(self, generation: Hashable):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls made from threads.
+
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for it and receive the same result or exception. A caller only
+    joins a call made for the same `generation`, so a read that starts after
+    a write never receives the result of a read that started before it.
+
+    **Parameters**
+
+    * `metrics`: Where per-key counters are recorded
+    """
+
+    def __init__(self, metrics: Optional[SingleFlightMetrics] = None):
+        self.metrics = metrics or SingleFlightMetrics()
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], generation: Hashable = None) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None or call.generation != generation
+            if leader:
+                call = self._calls[key] = _Call(generation)
+
+        if not leader:
+            call.done.wait()
+            self.metrics.record(key, shared=True, error=call.error is not None)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+            self.metrics.record(key, shared=False, error=call.error is not None)
+        return call.result
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent identical calls made from coroutines on one event loop.
+
+    Same semantics as SingleFlight. If the running call is cancelled, the
+    coroutines waiting for it are cancelled too.
+
+    **Parameters**
+
+    * `metrics`: Where per-key counters are recorded
+    """
+
+    def __init__(self, metrics: Optional[SingleFlightMetrics] = None):
+        self.metrics = metrics or SingleFlightMetrics()
+        self._calls: Dict[Hashable, Tuple[Hashable, asyncio.Future]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], generation: Hashable = None) -> Any:
+        entry = self._calls.get(key)
+        if entry is not None and entry[0] == generation:
+            future = entry[1]
+            try:
+                # shield() so a cancelled waiter does not cancel the shared call
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                raise
+            except BaseException:
+                self.metrics.record(key, shared=True, error=True)
+                raise
+            self.metrics.record(key, shared=True, error=False)
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = (generation, future)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody waited for is not logged
+            future.exception()
+            self.metrics.record(key, shared=False, error=True)
+            raise
+        else:
+            future.set_result(result)
+            self.metrics.record(key, shared=False, error=False)
+            return result
+        finally:
+            if self._calls.get(key, (None, None))[1] is future:
+                del self._calls[key]
+
+
+# Coalesces database loads of products, keyed by product id: product_reads
+# for sync callers, async_product_reads for GET /products/{id}. They share
+# their metrics, so GET /admin/singleflight counts both.
+product_reads = SingleFlight()
+async_product_reads = AsyncSingleFlight(metrics=product_reads.metrics)
@@ -1,7 +1,9 @@
 from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 
+from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
 from app.db.base_class import Base
@@ -80,6 +82,60 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db.refresh(db_obj)
         return db_obj
 
+    def patch(
+        self,
+        db: Session,
+        *,
+        id: Any,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        version: Optional[int] = None
+    ) -> ModelType:
+        """
+        Update the given columns of a record in one UPDATE ... RETURNING statement.
+        
+        Nothing is read first and no row is locked: the record is only
+        written if its `version` column still has `version`, and the version
+        is incremented in the same statement. Models without a version
+        column are written unconditionally. Commits, and returns the record detached from the
+        session, so reading it does not query again.
+        
+        Args:
+            db: Database session
+            id: ID of the record
+            obj_in: Columns to set
+            version: Version the change was made against; None to write whatever the current version
+            
+        Returns:
+            The updated record
+            
+        Raises:
+            HTTPException: 404 if the record does not exist, 409 if its version is no longer `version`
+        """
+        values = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        version_col = self.model.__table__.c.get("version")
+        statement = update(self.model).where(self.model.id == id)
+        if version_col is not None:
+            values = {**values, version_col.key: version_col + 1}
+            if version is not None:
+                statement = statement.where(version_col == version)
+        db_obj = db.scalars(
+            statement.values(**values).returning(self.model)
+            .execution_options(populate_existing=True)
+        ).first()
+        if db_obj is None:
+            current = db.query(version_col if version_col is not None else self.model.id).filter(
+                self.model.id == id
+            ).scalar()
+            if current is None:
+                raise HTTPException(status_code=404, detail=f"{self.model.__name__} with ID {id} not found")
+            raise HTTPException(
+                status_code=409,
+                detail=f"{self.model.__name__} with ID {id} is at version {current}, not {version}",
+            )
+        db.expunge(db_obj)
+        db.commit()
+        return db_obj
+
     def remove(self, db: Session, *, id: int) -> ModelType:
         """
         Delete a record.
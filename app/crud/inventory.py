@@ -0,0 +1,121 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.crud.base import CRUDBase
+from app.db.models.inventory import InventoryMovement, InventorySnapshot
+from app.schemas.inventory import InventoryMovementCreate
+
+
+class CRUDInventory(CRUDBase[InventoryMovement, InventoryMovementCreate, InventoryMovementCreate]):
+    """
+    Operations on the inventory ledger.
+
+    Movements are written in the transaction that changes `Product.stock`,
+    so the ledger sums to the stock column. The compactor folds the ledger
+    into InventorySnapshot rows, and stock at any point in time is the
+    latest snapshot before it plus the movements after that snapshot.
+    """
+
+    def record(
+        self,
+        db: Session,
+        *,
+        product_id: int,
+        delta: int,
+        reason: str,
+        order_id: Optional[int] = None,
+    ) -> InventoryMovement:
+        """
+        Add a movement to the session; it is written by the caller's commit.
+
+        Args:
+            db: Database session
+            product_id: ID of the product whose stock changed
+            delta: Change in stock
+            reason: Why the stock changed, e.g. "order" or "adjustment"
+            order_id: ID of the order that caused the change, if any
+
+        Returns:
+            The pending movement
+        """
+        movement = self.model(product_id=product_id, delta=delta, reason=reason, order_id=order_id)
+        db.add(movement)
+        return movement
+
+    def record_many(self, db: Session, *, movements: Sequence[Dict[str, Any]]) -> None:
+        """
+        Write movements with one executemany INSERT, in the caller's transaction.
+
+        Args:
+            db: Database session
+            movements: Dicts with product_id, delta, reason and optionally order_id
+        """
+        if movements:
+            db.connection().execute(
+                insert(self.model.__table__),
+                [{"order_id": None, **movement} for movement in movements],
+            )
+
+    def get_movements(
+        self, db: Session, *, product_id: int, skip: int = 0, limit: int = 100
+    ) -> List[InventoryMovement]:
+        """
+        Get the movements of a product, newest first.
+
+        Args:
+            db: Database session
+            product_id: Product ID
+            skip: Number of movements to skip
+            limit: Maximum number of movements to return
+
+        Returns:
+            List of movements
+        """
+        return (
+            db.query(self.model)
+            .filter(self.model.product_id == product_id)
+            .order_by(self.model.id.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def stock_at(self, db: Session, *, product_id: int, at: Optional[datetime] = None) -> int:
+        """
+        Get the stock of a product from the ledger, as of a point in time.
+
+        Reads at most one snapshot and the movements recorded after it, so
+        the cost is bounded by how far the compactor is behind.
+
+        Args:
+            db: Database session
+            product_id: Product ID
+            at: Point in time (UTC); None for the current stock
+
+        Returns:
+            Stock after every movement recorded up to `at`; 0 before the first
+        """
+        snapshot_query = (
+            select(InventorySnapshot.stock, InventorySnapshot.movement_id)
+            .where(InventorySnapshot.product_id == product_id)
+            .order_by(InventorySnapshot.movement_id.desc())
+            .limit(1)
+        )
+        if at is not None:
+            snapshot_query = snapshot_query.where(InventorySnapshot.taken_at <= at)
+        snapshot = db.execute(snapshot_query).first()
+        stock, after = (snapshot.stock, snapshot.movement_id) if snapshot else (0, 0)
+
+        tail_query = select(func.coalesce(func.sum(self.model.delta), 0)).where(
+            self.model.product_id == product_id, self.model.id > after
+        )
+        if at is not None:
+            tail_query = tail_query.where(self.model.created_at <= at)
+        return stock + db.execute(tail_query).scalar()
+
+
+# Create a singleton instance
+inventory = CRUDInventory(InventoryMovement)
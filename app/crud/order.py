@@ -1,13 +1,21 @@
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 from fastapi import HTTPException
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
 
+from app.core.admission import check_deadline
+from app.core.events import event_broker, order_event
+from app.core.pricing import pricing_engine
 from app.crud.base import CRUDBase
 from app.crud.product import product as product_crud
+from app.db.models.inventory import REASON_ORDER
 from app.db.models.order import Order
-from app.schemas.order import OrderCreate, OrderUpdate, OrderProductDetail
-from app.schemas.product import Product as ProductSchema
+from app.db.models.product import Product
+from app.db.order_archive import get_archived
+from app.db.recommendations import recommendations
+from app.schemas.order import OrderCreate, OrderQuote, OrderUpdate, OrderProductDetail
+from app.schemas.product import Product as ProductSchema, RelatedProduct
 
 
 class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
@@ -25,10 +33,9 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             Tuple of (Order object, message)
             
         Raises:
-            HTTPException: If product does not exist or insufficient stock
+            HTTPException: If product does not exist, stock is insufficient or the request deadline passed
         """
         # validate all products have sufficient stock
-        total_price = 0.0
         insufficient_stock_items = []
         products_data = []  # Store product data for later use
         
@@ -50,7 +57,6 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
                 })
             else:
                 products_data.append((product, item.quantity))
-                total_price += product.price * item.quantity
         
         if insufficient_stock_items:
             raise HTTPException(
@@ -61,9 +67,12 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
                 }
             )
         
+        # Last point where giving up leaves nothing behind
+        check_deadline()
+        
         db_order = Order(
             products=[{"product_id": item.product_id, "quantity": item.quantity} for item in obj_in.products],
-            total_price=round(total_price, 2),
+            total_price=pricing_engine.quote(products_data).total_price,
             status="pending"
         )
         db.add(db_order)
@@ -71,12 +80,17 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         db.refresh(db_order)
         
         for item in obj_in.products:
-            product_crud.update_stock(db, product_id=item.product_id, quantity_change=-item.quantity)
+            product_crud.update_stock(
+                db, product_id=item.product_id, quantity_change=-item.quantity,
+                reason=REASON_ORDER, order_id=db_order.id,
+            )
         
         db_order.status = "completed"
         db.add(db_order)
         db.commit()
         db.refresh(db_order)
+        self._publish_status(db, db_order)
+        recommendations.record_order(db_order.id, db_order.get_products())
         
         # Store product data in a separate attribute for the API to use
         # We won't change the Order model but will make this data available
@@ -84,10 +98,38 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
             
         return db_order, "Order placed successfully"
 
+    def quote(self, db: Session, *, obj_in: OrderCreate) -> OrderQuote:
+        """
+        Price a cart as placing it would, without writing or locking anything.
+        
+        Args:
+            db: Database session
+            obj_in: Order data
+            
+        Returns:
+            Priced lines, with whether each is in stock, and the cart's total
+            
+        Raises:
+            HTTPException: If a product does not exist
+        """
+        products, _ = product_crud.get_many_cached(db, ids=[item.product_id for item in obj_in.products])
+        for item, product in zip(obj_in.products, products):
+            if product is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Product with ID {item.product_id} not found"
+                )
+        return pricing_engine.quote(
+            (product, item.quantity) for item, product in zip(obj_in.products, products)
+        )
+
     def get_order_with_product_details(self, db: Session, *, order_id: int) -> Optional[Order]:
         """
         Get order with full product details.
         
+        Orders moved to the archive are read from it, as transient Order
+        objects not attached to the session.
+        
         Args:
             db: Database session
             order_id: ID of the order to retrieve
@@ -95,7 +137,7 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         Returns:
             Order with product details or None if not found
         """
-        db_order = self.get(db, id=order_id)
+        db_order = self.get(db, id=order_id) or get_archived(db, order_id)
         if not db_order:
             return None
             
@@ -109,6 +151,93 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         
         return db_order
 
+    def get_popular_product_ids(self, db: Session, *, limit: int, recent_orders: int = 10000) -> List[int]:
+        """
+        Get the most ordered products by units sold in recent orders.
+        
+        Args:
+            db: Database session
+            limit: Maximum number of product IDs to return
+            recent_orders: Number of most recent orders considered
+            
+        Returns:
+            Product IDs, most popular first
+        """
+        rows = db.execute(
+            text(
+                'SELECT json_extract(line.value, \'$.product_id\') AS product_id '
+                'FROM (SELECT products FROM "order" ORDER BY id DESC LIMIT :recent_orders) AS recent, '
+                'json_each(recent.products) AS line '
+                'GROUP BY product_id '
+                'ORDER BY sum(json_extract(line.value, \'$.quantity\')) DESC, product_id '
+                'LIMIT :limit'
+            ),
+            {"recent_orders": recent_orders, "limit": limit},
+        )
+        return [row.product_id for row in rows]
+
+    def get_units_sold(self, db: Session, *, recent_orders: int = 100000) -> Dict[int, int]:
+        """
+        Get the units sold per product in recent orders.
+        
+        Args:
+            db: Database session
+            recent_orders: Number of most recent orders considered
+            
+        Returns:
+            Units sold by product ID, for products in those orders
+        """
+        rows = db.execute(
+            text(
+                'SELECT json_extract(line.value, \'$.product_id\') AS product_id, '
+                'sum(json_extract(line.value, \'$.quantity\')) AS units '
+                'FROM (SELECT products FROM "order" ORDER BY id DESC LIMIT :recent_orders) AS recent, '
+                'json_each(recent.products) AS line '
+                'GROUP BY product_id'
+            ),
+            {"recent_orders": recent_orders},
+        )
+        return {row.product_id: row.units for row in rows}
+
+    def get_bought_together(self, db: Session, *, product_id: int, limit: int = 10) -> List[RelatedProduct]:
+        """
+        Get the products most often ordered together with a product.
+        
+        Served from the recommendation engine's co-occurrence matrix, or
+        counted from the order table until the matrix is built.
+        
+        Args:
+            db: Database session
+            product_id: Product ID
+            limit: Maximum number of products to return
+            
+        Returns:
+            Related products with the number of orders containing both, most frequent first
+        """
+        related = recommendations.related(product_id, limit)
+        if related is None:
+            rows = db.execute(
+                text(
+                    'SELECT other.product_id, count(*) AS orders FROM '
+                    '(SELECT DISTINCT o.id, json_extract(line.value, \'$.product_id\') AS product_id '
+                    'FROM "order" AS o, json_each(o.products) AS line) AS other '
+                    'WHERE other.id IN (SELECT o.id FROM "order" AS o, json_each(o.products) AS line '
+                    'WHERE json_extract(line.value, \'$.product_id\') = :product_id) '
+                    'AND other.product_id != :product_id '
+                    'GROUP BY other.product_id '
+                    'ORDER BY orders DESC, other.product_id '
+                    'LIMIT :limit'
+                ),
+                {"product_id": product_id, "limit": limit},
+            )
+            related = [(row.product_id, row.orders) for row in rows]
+        products, _ = product_crud.get_many_cached(db, ids=[other for other, _ in related])
+        return [
+            RelatedProduct(product=product, orders=orders)
+            for product, (_, orders) in zip(products, related)
+            if product is not None
+        ]
+
     def process_order(self, db: Session, *, order_id: int) -> Tuple[Order, str]:
         """
         Process a pending order.
@@ -125,6 +254,10 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         """
         order = self.get(db, id=order_id)
         if not order:
+            # Only completed orders are archived
+            archived = get_archived(db, order_id)
+            if archived is not None:
+                return archived, f"Order already {archived.status}"
             raise HTTPException(status_code=404, detail=f"Order with ID {order_id} not found")
         
         if order.status != "pending":
@@ -134,9 +267,20 @@ class CRUDOrder(CRUDBase[Order, OrderCreate, OrderUpdate]):
         db.add(order)
         db.commit()
         db.refresh(order)
+        self._publish_status(db, order)
         
         return order, "Order processed successfully"
 
+    def _publish_status(self, db: Session, order: Order) -> None:
+        """Publish an order's status to event streams, looking up categories only if someone listens."""
+        if not event_broker.has_subscribers:
+            return
+        product_ids = [item["product_id"] for item in order.get_products()]
+        categories = db.execute(
+            select(Product.category).where(Product.id.in_(product_ids)).distinct()
+        ).scalars().all()
+        event_broker.publish([order_event(order.id, order.status, product_ids, categories)])
+
 
 # Create a singleton instance
 order = CRUDOrder(Order) 
\ No newline at end of file
@@ -1,17 +1,467 @@
-from typing import List, Optional, Tuple, Dict, Any, Union
+import base64
+import binascii
+import json
+import re
+from typing import List, Optional, Sequence, Tuple, Dict, Any, Union
 
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, func, literal_column, select, text, tuple_, update
+from sqlalchemy.orm import Query, Session
 from sqlalchemy.exc import IntegrityError
 
+from app.core.cache import product_cache
+from app.core.config import settings
+from app.core.events import event_broker, stock_event
+from app.core.singleflight import async_product_reads, product_reads
 from app.crud.base import CRUDBase
+from app.crud.inventory import inventory
+from app.db.autocomplete import autocomplete_index
+from app.db.change_log import retention_watermark
+from app.db.models.inventory import REASON_ADJUSTMENT, REASON_INITIAL
+from app.db.invalidation import CATALOG_OP
 from app.db.models.product import Product
-from app.schemas.product import ProductCreate
+from app.db.models.product_change import ProductChange
+from app.db.models.product_facet import PRICE_BUCKETS, ProductFacet
+from app.db.snapshot import catalog_snapshot
+from app.db.uniqueness import product_key_filter
+from app.schemas.product import (
+    CategoryFacet,
+    PriceBucket,
+    Product as ProductSchema,
+    ProductChangeEntry,
+    ProductChangePage,
+    ProductCreate,
+    ProductFacets,
+    ProductSuggestion,
+    ProductUpdate,
+    StockAdjustment,
+    StockAdjustmentReport,
+    StockAdjustmentResult,
+)
+
+
+# Listing sorts: key columns, each ending in a unique column so cursors are
+# exact, and whether the order is descending
+LISTING_SORTS: Dict[str, Tuple[Tuple[Any, ...], bool]] = {
+    "id": ((Product.id,), False),
+    "-id": ((Product.id,), True),
+    "price": ((Product.price, Product.id), False),
+    "name": ((Product.name,), False),
+}
+
+# Above this many matching products, a listing filtered by price but sorted
+# otherwise reads rows in sort order instead of sorting the whole price range
+WIDE_PRICE_RANGE = 5000
+
+# Unique constraint or index of a product column, as named in IntegrityError
+# messages: "product.name" (SQLite), "uq_product_name" or "ix_product_name"
+_UNIQUE_VIOLATION = re.compile(r"\b(?:product\.|uq_product_|ix_product_)(name|sku)\b")
+
+
+def _unique_violation(error: IntegrityError) -> Optional[str]:
+    """Product column whose uniqueness an insert violated, or None for another integrity error."""
+    match = _UNIQUE_VIOLATION.search(str(error.orig))
+    return match.group(1) if match else None
 
 
 class CRUDProduct(CRUDBase[Product, ProductCreate, ProductCreate]):
     """CRUD operations for Product model."""
     
+    def get_cached(self, db: Session, *, id: int) -> Optional[ProductSchema]:
+        """
+        Get a product by ID through the in-process product cache and catalog snapshot.
+        
+        Args:
+            db: Database session
+            id: Product ID
+            
+        Returns:
+            Product schema if found, None otherwise
+        """
+        cached = self._get_in_memory(id)
+        if cached is not None:
+            return cached
+        epoch = product_cache.epoch
+
+        def load() -> Optional[ProductSchema]:
+            return self._load_cached(db, id=id, epoch=epoch)
+
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return load()
+        # Concurrent misses for the same product share one query; the epoch
+        # keeps reads that start after a write from sharing an older load
+        return product_reads.do(id, load, generation=epoch)
+    
+    async def get_cached_async(self, db: Session, *, id: int) -> Optional[ProductSchema]:
+        """
+        Get a product by ID like get_cached, from an async endpoint.
+        
+        Hits are served on the event loop. A miss is loaded in the threadpool,
+        and concurrent misses for the same product wait for that load on the
+        event loop, so a herd holds one threadpool thread, not one per request.
+        
+        Args:
+            db: Database session
+            id: Product ID
+            
+        Returns:
+            Product schema if found, None otherwise
+        """
+        cached = self._get_in_memory(id)
+        if cached is not None:
+            return cached
+        epoch = product_cache.epoch
+
+        async def load() -> Optional[ProductSchema]:
+            return await run_in_threadpool(self._load_cached, db, id=id, epoch=epoch)
+
+        if not settings.SINGLEFLIGHT_ENABLED:
+            return await load()
+        return await async_product_reads.do(id, load, generation=epoch)
+    
+    def _get_in_memory(self, id: int) -> Optional[ProductSchema]:
+        cached = product_cache.get(id)
+        if cached is not None:
+            return cached
+        return catalog_snapshot.get(id)
+    
+    def _load_cached(self, db: Session, *, id: int, epoch: int) -> Optional[ProductSchema]:
+        """Read a product and cache it, unless it was invalidated since `epoch`."""
+        db_product = self.get(db, id=id)
+        if db_product is None:
+            return None
+        loaded = ProductSchema.model_validate(db_product)
+        product_cache.set(id, loaded, epoch=epoch)
+        return loaded
+    
+    def get_many_cached(
+        self,
+        db: Session,
+        *,
+        ids: Sequence[int] = (),
+        skus: Sequence[str] = (),
+        chunk_size: int = 500,
+    ) -> Tuple[List[Optional[ProductSchema]], List[Optional[ProductSchema]]]:
+        """
+        Get many products by ID or SKU, reading the ones not cached with chunked IN queries.
+        
+        Args:
+            db: Database session
+            ids: Product IDs
+            skus: Product SKUs, matched case-insensitively
+            chunk_size: Maximum number of keys per query
+            
+        Returns:
+            Products of `ids` and of `skus`, each in request order, with None
+            for keys that match no product
+        """
+        by_id: Dict[int, ProductSchema] = {}
+        missing: List[int] = []
+        for id in dict.fromkeys(ids):
+            cached = product_cache.get(id)
+            if cached is None:
+                cached = catalog_snapshot.get(id)
+            if cached is not None:
+                by_id[id] = cached
+            else:
+                missing.append(id)
+        epoch = product_cache.epoch
+        
+        def load(column, keys: List[Any]) -> List[ProductSchema]:
+            loaded = []
+            for start in range(0, len(keys), chunk_size):
+                for db_product in db.query(self.model).filter(column.in_(keys[start:start + chunk_size])):
+                    product = ProductSchema.model_validate(db_product)
+                    product_cache.set(product.id, product, epoch=epoch)
+                    loaded.append(product)
+            return loaded
+        
+        by_id.update((product.id, product) for product in load(self.model.id, missing))
+        upper_skus = [sku.upper() for sku in skus]
+        by_sku = {product.sku: product for product in load(self.model.sku, list(dict.fromkeys(upper_skus)))}
+        return [by_id.get(id) for id in ids], [by_sku.get(sku) for sku in upper_skus]
+    
+    def get_multi_cached(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[Any]:
+        """
+        Get a page of products from the catalog snapshot, or the database if it cannot serve it.
+        
+        Args:
+            db: Database session
+            skip: Number of products to skip
+            limit: Maximum number of products to return
+            
+        Returns:
+            List of products
+        """
+        products = catalog_snapshot.page(skip, limit)
+        if products is not None:
+            return products
+        return self.get_multi(db, skip=skip, limit=limit)
+    
+    def get_listing(
+        self,
+        db: Session,
+        *,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[List[Any], Optional[str]]:
+        """
+        Get a page of products, filtered and sorted.
+        
+        The unfiltered listing in ID order is served like get_multi_cached.
+        Pages after the first should be read with the returned cursor rather
+        than `skip`: the cursor seeks in an index to the last product of the
+        previous page, so deep pages cost as little as the first.
+        
+        Args:
+            db: Database session
+            category: Only products of this category
+            min_price: Only products at this price or above
+            max_price: Only products at this price or below
+            in_stock: Only products in stock (True) or out of stock (False)
+            sort: One of LISTING_SORTS
+            cursor: Cursor returned with the previous page, for the same filters and sort
+            skip: Number of products to skip
+            limit: Maximum number of products to return
+            
+        Returns:
+            Tuple of (products, cursor of the next page or None if this page is the last)
+            
+        Raises:
+            HTTPException: If the cursor is malformed or was issued for another sort
+        """
+        if (category is None and min_price is None and max_price is None and in_stock is None
+                and sort == "id" and cursor is None):
+            products = self.get_multi_cached(db, skip=skip, limit=limit)
+        else:
+            query = self._listing_query(
+                db, category=category, min_price=min_price, max_price=max_price,
+                in_stock=in_stock, sort=sort, cursor=cursor,
+            )
+            products = query.offset(skip).limit(limit).all()
+        
+        next_cursor = None
+        if len(products) == limit:
+            columns, _ = LISTING_SORTS[sort]
+            last = products[-1]
+            key = [sort] + [getattr(last, column.key) for column in columns]
+            next_cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+        return products, next_cursor
+    
+    def _listing_query(
+        self,
+        db: Session,
+        *,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        in_stock: Optional[bool] = None,
+        sort: str = "id",
+        cursor: Optional[str] = None,
+    ) -> Query:
+        """
+        Query of a filtered and sorted listing, without offset and limit.
+        
+        SQLite has no statistics on price ranges and always prefers a price
+        index when there is a price filter, then sorts every product in the
+        range. When sorting by something else, the range is probed first
+        and, if it holds more than WIDE_PRICE_RANGE products, the price
+        indexes are bypassed so rows are read in sort order and the scan
+        stops once the page is full.
+        """
+        columns, descending = LISTING_SORTS[sort]
+        
+        def filters(price) -> List[Any]:
+            clauses = []
+            if category is not None:
+                clauses.append(self.model.category == category)
+            if min_price is not None:
+                clauses.append(price >= min_price)
+            if max_price is not None:
+                clauses.append(price <= max_price)
+            if in_stock is not None:
+                # A literal, not a bound parameter, or SQLite cannot match ix_product_in_stock_price
+                zero = literal_column("0")
+                clauses.append(self.model.stock > zero if in_stock else self.model.stock <= zero)
+            return clauses
+        
+        clauses = filters(self.model.price)
+        if (min_price is not None or max_price is not None) and sort != "price":
+            probe = select(literal_column("1")).select_from(self.model).where(*clauses).limit(WIDE_PRICE_RANGE)
+            if db.execute(select(func.count()).select_from(probe.subquery())).scalar() >= WIDE_PRICE_RANGE:
+                # An expression on the column keeps the planner off the price indexes
+                clauses = filters(self.model.price + 0)
+        query = db.query(self.model).filter(*clauses)
+        if cursor is not None:
+            try:
+                key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            except (binascii.Error, UnicodeError, ValueError):
+                key = None
+            if not isinstance(key, list) or len(key) != len(columns) + 1 or key[0] != sort:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            values = key[1:]
+            if len(columns) == 1:
+                after = columns[0] < values[0] if descending else columns[0] > values[0]
+            else:
+                after = tuple_(*columns) > tuple_(*values)
+            query = query.filter(after)
+        return query.order_by(*(column.desc() if descending else column for column in columns))
+    
+    def autocomplete(self, db: Session, *, prefix: str, limit: int = 10) -> List[ProductSuggestion]:
+        """
+        Get products whose name or SKU starts with a prefix, most popular first.
+        
+        Served from the in-memory prefix index; until the worker has built
+        it, from a LIKE query on the product table without ranking.
+        
+        Args:
+            db: Database session
+            prefix: Start of a name or SKU, case-insensitive
+            limit: Maximum number of products to return
+            
+        Returns:
+            List of suggestions
+        """
+        suggestions = autocomplete_index.search(prefix, limit) if settings.AUTOCOMPLETE_ENABLED else None
+        if suggestions is None:
+            pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            suggestions = db.execute(
+                select(self.model.id, self.model.name, self.model.sku)
+                .where(self.model.name.like(pattern, escape="\\") | self.model.sku.like(pattern, escape="\\"))
+                .order_by(self.model.name)
+                .limit(limit)
+            ).all()
+        return [ProductSuggestion(id=id, name=name, sku=sku) for id, name, sku in suggestions]
+    
+    def get_facets(self, db: Session, *, category: Optional[str] = None) -> ProductFacets:
+        """
+        Get product counts per category and a price histogram.
+        
+        Read from the productfacet table, which triggers on the product
+        table keep current, so the cost depends on the number of categories
+        and price buckets rather than of products.
+        
+        Args:
+            db: Database session
+            category: Restrict the price histogram to this category
+            
+        Returns:
+            Counts of all and in-stock products per category, and per price bucket
+        """
+        categories: Dict[str, List[int]] = {}
+        buckets = [[0, 0] for _ in range(len(PRICE_BUCKETS) + 1)]
+        rows = db.execute(
+            select(ProductFacet.category, ProductFacet.price_bucket, ProductFacet.products, ProductFacet.in_stock)
+            .where(ProductFacet.products > 0)
+        )
+        for row_category, bucket, products, in_stock in rows:
+            counts = categories.setdefault(row_category, [0, 0])
+            counts[0] += products
+            counts[1] += in_stock
+            if category is None or row_category == category:
+                buckets[bucket][0] += products
+                buckets[bucket][1] += in_stock
+        
+        bounds = (0,) + PRICE_BUCKETS + (None,)
+        return ProductFacets(
+            categories=[
+                CategoryFacet(category=name, products=products, in_stock=in_stock)
+                for name, (products, in_stock) in sorted(categories.items())
+            ],
+            price_histogram=[
+                PriceBucket(min_price=bounds[i], max_price=bounds[i + 1], products=products, in_stock=in_stock)
+                for i, (products, in_stock) in enumerate(buckets)
+            ],
+        )
+    
+    def get_changes(self, db: Session, *, since: int = 0, limit: int = 500) -> ProductChangePage:
+        """
+        Get the products changed after a catalog version, oldest change first.
+        
+        Versions are productchange IDs, which triggers append on every write
+        to the product table. Each product appears once, at its latest
+        version, with its current row or as a tombstone if it was deleted.
+        The cost is proportional to the number of changes after `since`.
+        
+        Args:
+            db: Database session
+            since: Catalog version the caller is up to date with; 0 for everything
+            limit: Maximum number of products to return
+            
+        Returns:
+            Page of changes and the version to continue from
+            
+        Raises:
+            HTTPException: 410 if changes after `since` were pruned from the log, with
+                the current version in X-Catalog-Version to resync from
+        """
+        # Bound the page by the version read first, so a write committed
+        # meanwhile is picked up by the next page rather than skipped
+        current = db.query(func.coalesce(func.max(ProductChange.id), 0)).scalar()
+        if since < retention_watermark(db.connection()):
+            raise HTTPException(
+                status_code=410,
+                detail="Changes since this version were pruned; reload the catalog and sync from X-Catalog-Version",
+                headers={"X-Catalog-Version": str(current)},
+            )
+        version = func.max(ProductChange.id).label("version")
+        rows = (
+            db.query(ProductChange.product_id, version)
+            .filter(ProductChange.id > since, ProductChange.id <= current, ProductChange.op != CATALOG_OP)
+            .group_by(ProductChange.product_id)
+            .order_by(version)
+            .limit(limit + 1)
+            .all()
+        )
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        products = {}
+        if rows:
+            products = {
+                db_product.id: db_product
+                for db_product in db.query(self.model).filter(self.model.id.in_([row.product_id for row in rows]))
+            }
+        changes = [
+            ProductChangeEntry(
+                id=row.product_id,
+                version=row.version,
+                deleted=row.product_id not in products,
+                product=ProductSchema.model_validate(products[row.product_id]) if row.product_id in products else None,
+            )
+            for row in rows
+        ]
+        next_since = rows[-1].version if has_more else max(current, since)
+        return ProductChangePage(changes=changes, next_since=next_since, has_more=has_more)
+    
+    def preload(self, db: Session, *, ids: Sequence[int], chunk_size: int = 500) -> int:
+        """
+        Load products into the product cache.
+        
+        Args:
+            db: Database session
+            ids: Product IDs to load
+            chunk_size: Maximum number of IDs per query
+            
+        Returns:
+            Number of products cached
+        """
+        loaded = 0
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            for db_product in db.query(self.model).filter(self.model.id.in_(chunk)):
+                product_cache.set(db_product.id, ProductSchema.model_validate(db_product))
+                loaded += 1
+        return loaded
+    
     def get_by_name(self, db: Session, *, name: str) -> Optional[Product]:
         """
         Get a product by name.
@@ -52,64 +502,313 @@ class CRUDProduct(CRUDBase[Product, ProductCreate, ProductCreate]):
         Raises:
             HTTPException: If a product with the same name or SKU already exists
         """
-        db_product = self.get_by_name(db, name=obj_in.name)
-        if db_product:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Product with name '{obj_in.name}' already exists"
-            )
-        
-        db_product = self.get_by_sku(db, sku=obj_in.sku)
-        if db_product:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Product with SKU '{obj_in.sku}' already exists"
-            )
+        if product_key_filter.might_exist(name=obj_in.name, sku=obj_in.sku):
+            db_product = self.get_by_name(db, name=obj_in.name)
+            if db_product:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Product with name '{obj_in.name}' already exists"
+                )
+            
+            db_product = self.get_by_sku(db, sku=obj_in.sku)
+            if db_product:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Product with SKU '{obj_in.sku}' already exists"
+                )
+            product_key_filter.record_false_positive()
         
         try:
-            return super().create(db=db, obj_in=obj_in)
+            db_product = self.model(**jsonable_encoder(obj_in))
+            db.add(db_product)
+            if db_product.stock:
+                db.flush()
+                inventory.record(db, product_id=db_product.id, delta=db_product.stock, reason=REASON_INITIAL)
+            db.commit()
+            db.refresh(db_product)
+            catalog_snapshot.mark_dirty(db_product.id, structural=True)
+            autocomplete_index.upsert(db_product.id, db_product.name, db_product.sku)
+            product_key_filter.add(name=db_product.name, sku=db_product.sku)
+            return db_product
         except IntegrityError as e:
             db.rollback()
-            if "uq_product_name" in str(e):
+            # Duplicates the filter let through, or created concurrently
+            column = _unique_violation(e)
+            if column == "name":
                 raise HTTPException(
                     status_code=400, 
-                    detail="A product with this name already exists"
+                    detail=f"Product with name '{obj_in.name}' already exists"
                 )
-            elif "uq_product_sku" in str(e):
+            elif column == "sku":
                 raise HTTPException(
                     status_code=400, 
-                    detail="A product with this SKU already exists"
+                    detail=f"Product with SKU '{obj_in.sku}' already exists"
                 )
             raise HTTPException(
                 status_code=400, 
                 detail="Database integrity error occurred"
             )
     
-    def update_stock(self, db: Session, *, product_id: int, quantity_change: int) -> Optional[Product]:
+    def update_stock(
+        self,
+        db: Session,
+        *,
+        product_id: int,
+        quantity_change: int,
+        reason: str = REASON_ADJUSTMENT,
+        order_id: Optional[int] = None,
+    ) -> Optional[Product]:
         """
         Update product stock. Use negative quantity_change to reduce stock.
         
+        The stock is written with one UPDATE relative to the stored value,
+        which also increments the product's version; the write lock is taken
+        first, so the stock read for the ledger and the clamp at 0 is current.
+        
         Args:
             db: Database session
             product_id: ID of the product to update
             quantity_change: Amount to change stock by (positive to add, negative to subtract)
+            reason: Reason recorded in the inventory ledger
+            order_id: Order recorded in the inventory ledger, if the change is for one
             
         Returns:
             Product object if successful, None if product not found
         """
-        product = self.get(db, id=product_id)
-        if not product:
+        self._lock_for_write(db)
+        table = self.model.__table__
+        row = db.execute(
+            select(table.c.stock, table.c.category).where(table.c.id == product_id).with_for_update()
+        ).first()
+        if row is None:
+            # Release the write lock
+            db.rollback()
             return None
         
-        product.stock += quantity_change
+        previous, category = row
+        stock = max(previous + quantity_change, 0)
+        if stock != previous:
+            db.execute(
+                update(table).where(table.c.id == product_id)
+                .values(stock=table.c.stock + (stock - previous), version=table.c.version + 1)
+            )
+            inventory.record(
+                db, product_id=product_id, delta=stock - previous, reason=reason, order_id=order_id
+            )
+        db.commit()
+        self._invalidate(product_id)
+        if stock != previous:
+            event_broker.publish([stock_event(product_id, stock, category)])
+        return self.get(db, id=product_id)
+
+    def adjust_stock(
+        self,
+        db: Session,
+        *,
+        adjustments: Sequence[StockAdjustment],
+        policy: str = "clamp",
+        chunk_size: int = 500,
+    ) -> StockAdjustmentReport:
+        """
+        Apply a batch of stock adjustments in one transaction.
+        
+        Adjustments are applied in order, so several for the same product
+        compound. Products are looked up with one query per chunk of IDs or
+        SKUs and written with a single executemany UPDATE, with their
+        inventory movements in a single executemany INSERT; no ORM objects
+        are loaded.
         
-        if product.stock < 0:
-            product.stock = 0
+        Args:
+            db: Database session
+            adjustments: Adjustments keyed by product ID or SKU
+            policy: "clamp" to set stock that would go negative to 0,
+                "reject" to skip such adjustments
+            chunk_size: Maximum number of IDs or SKUs per lookup query
             
-        db.add(product)
+        Returns:
+            Outcome of every adjustment, in request order
+        """
+        self._lock_for_write(db)
+        
+        stock_by_id: Dict[int, int] = {}
+        category_by_id: Dict[int, str] = {}
+        id_by_sku: Dict[str, int] = {}
+        ids = sorted({a.id for a in adjustments if a.id is not None})
+        skus = sorted({a.sku for a in adjustments if a.sku is not None})
+        table = self.model.__table__
+        conn = db.connection()
+        for column, keys in ((table.c.id, ids), (table.c.sku, skus)):
+            for start in range(0, len(keys), chunk_size):
+                rows = conn.execute(
+                    select(table.c.id, table.c.sku, table.c.stock, table.c.category)
+                    .where(column.in_(keys[start:start + chunk_size]))
+                    .with_for_update()
+                ).all()
+                for product_id, sku, stock, category in rows:
+                    stock_by_id[product_id] = stock
+                    category_by_id[product_id] = category
+                    id_by_sku[sku] = product_id
+        
+        results: List[StockAdjustmentResult] = []
+        new_stock: Dict[int, int] = {}
+        movements: List[Dict[str, Any]] = []
+        counts = {"applied": 0, "rejected": 0, "not_found": 0}
+        for index, adjustment in enumerate(adjustments):
+            product_id = adjustment.id if adjustment.id is not None else id_by_sku.get(adjustment.sku)
+            if product_id not in stock_by_id:
+                counts["not_found"] += 1
+                results.append(StockAdjustmentResult(
+                    index=index, id=adjustment.id, sku=adjustment.sku, status="not_found"
+                ))
+                continue
+            
+            current = new_stock.get(product_id, stock_by_id[product_id])
+            stock = adjustment.stock if adjustment.stock is not None else current + adjustment.delta
+            status = "updated"
+            if stock < 0:
+                if policy == "reject":
+                    counts["rejected"] += 1
+                    results.append(StockAdjustmentResult(
+                        index=index, id=product_id, sku=adjustment.sku, status="rejected", stock=current
+                    ))
+                    continue
+                stock, status = 0, "clamped"
+            new_stock[product_id] = stock
+            if stock != current:
+                movements.append({"product_id": product_id, "delta": stock - current, "reason": REASON_ADJUSTMENT})
+            counts["applied"] += 1
+            results.append(StockAdjustmentResult(
+                index=index, id=product_id, sku=adjustment.sku, status=status, stock=stock
+            ))
+        
+        # Rows left at their stock are not written, so their version, change
+        # log and caches are untouched
+        changed = {
+            product_id: stock for product_id, stock in new_stock.items() if stock != stock_by_id[product_id]
+        }
+        if changed:
+            # Core executemany in primary key order, which keeps page writes
+            # sequential; the ORM bulk path costs more than the UPDATE itself
+            conn.execute(
+                update(table).where(table.c.id == bindparam("b_id")).values(stock=bindparam("b_stock"), version=table.c.version + 1),
+                [{"b_id": k, "b_stock": changed[k]} for k in sorted(changed)],
+            )
+        inventory.record_many(db, movements=movements)
         db.commit()
-        db.refresh(product)
-        return product
+        product_cache.invalidate_many(changed)
+        for product_id in changed:
+            catalog_snapshot.mark_dirty(product_id)
+        event_broker.publish(
+            stock_event(product_id, stock, category_by_id[product_id]) for product_id, stock in changed.items()
+        )
+        return StockAdjustmentReport(results=results, **counts)
+
+    def _lock_for_write(self, db: Session) -> None:
+        """Keep other writers out until commit, so stock read now is still current when written."""
+        if db.get_bind().dialect.name == "sqlite":
+            # SQLite ignores FOR UPDATE; any write statement takes the database write lock
+            db.execute(text("UPDATE product SET stock = stock WHERE 0"))
+
+    def update(
+        self,
+        db: Session,
+        *,
+        db_obj: Product,
+        obj_in: Union[ProductCreate, Dict[str, Any]]
+    ) -> Product:
+        """
+        Update a product and stop serving it from the product cache and snapshot.
+        
+        A change of stock is recorded in the inventory ledger and published
+        to event streams. The version is incremented by the same UPDATE.
+        """
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.dict(exclude_unset=True)
+        obj_in = {**update_data, "version": self.model.version + 1}
+        old_keys = {"name": db_obj.name, "sku": db_obj.sku}
+        stock = update_data.get("stock")
+        stock_changed = stock is not None and stock != db_obj.stock
+        if stock_changed:
+            inventory.record(db, product_id=db_obj.id, delta=stock - db_obj.stock, reason=REASON_ADJUSTMENT)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=obj_in)
+        self._invalidate(db_obj.id)
+        if "name" in update_data or "sku" in update_data:
+            autocomplete_index.upsert(db_obj.id, db_obj.name, db_obj.sku)
+            product_key_filter.remove(**old_keys)
+            product_key_filter.add(name=db_obj.name, sku=db_obj.sku)
+        if stock_changed:
+            event_broker.publish([stock_event(db_obj.id, db_obj.stock, db_obj.category)])
+        return db_obj
+
+    def patch(
+        self,
+        db: Session,
+        *,
+        id: int,
+        obj_in: Union[ProductUpdate, Dict[str, Any]],
+        version: Optional[int] = None
+    ) -> Product:
+        """
+        Update the given fields of a product in one statement if it is still at `version`.
+        
+        A renamed product's old name and SKU stay in the product key
+        filter, where they only cost an exact query on a later create.
+        
+        Args:
+            db: Database session
+            id: ID of the product
+            obj_in: Fields to change; stock is changed through adjust_stock
+            version: Version the change was made against; None to skip the check
+            
+        Returns:
+            Updated product, detached from the session
+            
+        Raises:
+            HTTPException: 404 if the product does not exist, 409 if it changed since `version`,
+                400 if another product has the new name or SKU
+        """
+        update_data = obj_in if isinstance(obj_in, dict) else obj_in.model_dump(exclude_unset=True)
+        try:
+            db_obj = super().patch(db, id=id, obj_in=update_data, version=version)
+        except IntegrityError as e:
+            db.rollback()
+            column = _unique_violation(e)
+            if column == "name":
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Product with name '{update_data['name']}' already exists"
+                )
+            elif column == "sku":
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Product with SKU '{update_data['sku']}' already exists"
+                )
+            raise HTTPException(
+                status_code=400, 
+                detail="Database integrity error occurred"
+            )
+        self._invalidate(db_obj.id)
+        if "name" in update_data or "sku" in update_data:
+            autocomplete_index.upsert(db_obj.id, db_obj.name, db_obj.sku)
+            product_key_filter.add(name=db_obj.name, sku=db_obj.sku)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Product:
+        """
+        Delete a product and stop serving it from the product cache and snapshot.
+        """
+        existing = self.get(db, id=id)
+        keys = {"name": existing.name, "sku": existing.sku} if existing is not None else None
+        obj = super().remove(db, id=id)
+        self._invalidate(id, structural=True)
+        autocomplete_index.remove(id)
+        if keys is not None:
+            product_key_filter.remove(**keys)
+        return obj
+
+    def _invalidate(self, product_id: int, structural: bool = False) -> None:
+        """Stop serving a product written by this worker from in-process copies."""
+        product_cache.invalidate(product_id)
+        catalog_snapshot.mark_dirty(product_id, structural=structural)
 
     def check_stock_availability(
         self, db: Session, product_id: int, quantity: int
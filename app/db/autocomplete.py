@@ -0,0 +1,345 @@
+"""
+In-memory prefix index of product names and SKUs for search-as-you-type.
+
+A PrefixIndex is built from the whole catalog and never modified. Its keys
+live in one bytes blob with an offsets array, sorted by their lowercased
+form, so a key costs a few bytes of arrays instead of a str object. The
+keys starting with a prefix are a contiguous range found by bisection, and
+a segment tree holding the most popular entry of every node returns the
+top matches of a range in order without scanning it, however short the
+prefix.
+
+AutocompleteIndex serves searches from the current PrefixIndex plus a
+small overlay of products written since it was built: products created or
+renamed in this worker are added directly by the CRUD layer, and those
+written elsewhere through the invalidation bus. A background thread
+rebuilds the index, with fresh popularity, every `rebuild_interval`
+seconds or as soon as the overlay outgrows `max_pending`.
+
+Matching is case-insensitive for ASCII letters only.
+"""
+import bisect
+import heapq
+import logging
+import threading
+from array import array
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.invalidation import invalidation_bus
+from app.db.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+# (product id, name, sku)
+Suggestion = Tuple[int, str, str]
+
+
+class _Keys:
+    """Sequence view of the lowercased keys, for bisect."""
+
+    def __init__(self, blob: bytes, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].lower()
+
+
+class PrefixIndex:
+    """
+    Immutable index of product names and SKUs by prefix, ranked by popularity.
+
+    **Parameters**
+
+    * `products`: (id, name, sku) of every product, in ID order
+    * `popularity`: Score by product ID, e.g. units sold; missing products score 0
+    """
+
+    def __init__(self, products: Iterable[Suggestion], popularity: Dict[int, float]):
+        ids = array("i")
+        entries = []
+        for slot, (product_id, name, sku) in enumerate(products):
+            ids.append(product_id)
+            for kind, text in enumerate((name, sku)):
+                raw = text.encode()
+                entries.append((raw.lower(), raw, slot, kind))
+        entries.sort()
+
+        self.ids = ids
+        self.offsets = array("I", [0])
+        self.entry_slots = array("I")
+        self.entry_scores = array("f")
+        # Entry of the name and of the SKU of every slot
+        self.slot_entries = array("I", bytes(8 * len(ids)))
+        chunks = []
+        position = 0
+        for entry, (_, raw, slot, kind) in enumerate(entries):
+            chunks.append(raw)
+            position += len(raw)
+            self.offsets.append(position)
+            self.entry_slots.append(slot)
+            self.entry_scores.append(popularity.get(ids[slot], 0))
+            self.slot_entries[2 * slot + kind] = entry
+        self.blob = b"".join(chunks)
+        self.keys = _Keys(self.blob, self.offsets)
+        del entries, chunks
+
+        # Segment tree over the entries; each node holds its most popular
+        # entry, the first in key order on ties, or -1 when empty
+        size = 1
+        while size < len(self.entry_slots):
+            size *= 2
+        self.size = size
+        tree = array("i", [-1]) * (2 * size)
+        tree[size:size + len(self.entry_slots)] = array("i", range(len(self.entry_slots)))
+        scores = self.entry_scores
+        for node in range(size - 1, 0, -1):
+            left, right = tree[2 * node], tree[2 * node + 1]
+            if right < 0 or (left >= 0 and scores[left] >= scores[right]):
+                tree[node] = left
+            else:
+                tree[node] = right
+        self.tree = tree
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def nbytes(self) -> int:
+        """Memory held by the index's arrays and key blob."""
+        arrays = (self.ids, self.offsets, self.entry_slots, self.entry_scores, self.slot_entries, self.tree)
+        return len(self.blob) + sum(a.itemsize * len(a) for a in arrays)
+
+    def product(self, slot: int) -> Suggestion:
+        name_entry, sku_entry = self.slot_entries[2 * slot], self.slot_entries[2 * slot + 1]
+        return (
+            self.ids[slot],
+            self.blob[self.offsets[name_entry]:self.offsets[name_entry + 1]].decode(),
+            self.blob[self.offsets[sku_entry]:self.offsets[sku_entry + 1]].decode(),
+        )
+
+    def find(self, product_id: int) -> Optional[Suggestion]:
+        slot = bisect.bisect_left(self.ids, product_id)
+        if slot < len(self.ids) and self.ids[slot] == product_id:
+            return self.product(slot)
+        return None
+
+    def matches(self, prefix: bytes) -> Iterator[Tuple[float, int]]:
+        """
+        Products with a name or SKU starting with a lowercased prefix, most popular first.
+
+        Returns:
+            Iterator of (score, slot); a product matching by name and SKU comes twice
+        """
+        lo = bisect.bisect_left(self.keys, prefix)
+        # No UTF-8 encoded key contains 0xff, so this sorts after every key with the prefix
+        hi = bisect.bisect_left(self.keys, prefix + b"\xff", lo)
+        tree, scores, size = self.tree, self.entry_scores, self.size
+        heap: List[Tuple[float, int, int]] = []
+
+        def push(node: int) -> None:
+            entry = tree[node]
+            if entry >= 0:
+                heapq.heappush(heap, (-scores[entry], entry, node))
+
+        # Cover [lo, hi) with O(log n) nodes, then descend only into the best one
+        left, right = lo + size, hi + size
+        while left < right:
+            if left & 1:
+                push(left)
+                left += 1
+            if right & 1:
+                right -= 1
+                push(right)
+            left //= 2
+            right //= 2
+        while heap:
+            score, entry, node = heapq.heappop(heap)
+            if node >= size:
+                yield -score, self.entry_slots[entry]
+            else:
+                push(2 * node)
+                push(2 * node + 1)
+
+
+class AutocompleteIndex:
+    """
+    Keeps a worker's PrefixIndex current and answers prefix searches.
+
+    **Parameters**
+
+    * `rebuild_interval`: Seconds between rebuilds, which also refresh popularity
+    * `max_pending`: Products written since the last build that trigger an early rebuild
+    * `recent_orders`: Number of most recent orders popularity is computed from
+    """
+
+    def __init__(self, rebuild_interval: float = 600.0, max_pending: int = 1000, recent_orders: int = 100_000):
+        self.rebuild_interval = rebuild_interval
+        self.max_pending = max_pending
+        self.recent_orders = recent_orders
+        self.builds = 0
+        self._index: Optional[PrefixIndex] = None
+        self._popularity: Dict[int, float] = {}
+        # Products written since the build: (current suggestion, or None if deleted; write sequence)
+        self._pending: Dict[int, Tuple[Optional[Suggestion], int]] = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._index is not None
+
+    def start(self, bind: Engine) -> None:
+        """Build the first index in the background and keep rebuilding it."""
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="autocomplete-index", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._index = None
+            self._pending.clear()
+        self._bind = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rebuild(self._bind)
+            except Exception:
+                logger.exception("Autocomplete index build failed")
+            self._wakeup.wait(self.rebuild_interval)
+            self._wakeup.clear()
+
+    def rebuild(self, bind: Engine) -> PrefixIndex:
+        """Build an index from the database and serve it, keeping writes made during the build."""
+        # Imported here: app.crud.order imports app.crud.product, which imports this module
+        from app.crud.order import order as order_crud
+
+        with self._lock:
+            started_seq = self._seq
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+        with session_factory() as db:
+            popularity = order_crud.get_units_sold(db, recent_orders=self.recent_orders)
+            products = db.execute(
+                select(Product.id, Product.name, Product.sku).order_by(Product.id)
+                .execution_options(yield_per=10_000)
+            )
+            index = PrefixIndex(products, popularity)
+        with self._lock:
+            # Writes committed before the build started are in it
+            self._pending = {
+                product_id: pending for product_id, pending in self._pending.items() if pending[1] > started_seq
+            }
+            self._index = index
+            self._popularity = popularity
+            self.builds += 1
+        return index
+
+    def upsert(self, product_id: int, name: str, sku: str) -> None:
+        """Record a created or renamed product."""
+        self._record(product_id, (product_id, name, sku))
+
+    def remove(self, product_id: int) -> None:
+        """Record a deleted product."""
+        self._record(product_id, None)
+
+    def _record(self, product_id: int, suggestion: Optional[Suggestion]) -> None:
+        if self._thread is None and self._index is None:
+            return
+        with self._lock:
+            self._seq += 1
+            self._pending[product_id] = (suggestion, self._seq)
+            if len(self._pending) > self.max_pending:
+                self._wakeup.set()
+
+    def _current(self, product_id: int) -> Optional[Suggestion]:
+        pending = self._pending.get(product_id)
+        if pending is not None:
+            return pending[0]
+        return self._index.find(product_id) if self._index is not None else None
+
+    def refresh(self, product_ids: Optional[FrozenSet[int]]) -> None:
+        """
+        Pick up products written by other workers; an invalidation bus handler.
+
+        Only products whose name or SKU changed, or that were created or
+        deleted, are recorded, so stock and price writes cost one lookup.
+        """
+        if self._thread is None or self._bind is None:
+            return
+        if product_ids is None:
+            self._wakeup.set()
+            return
+        ids = sorted(product_ids)
+        found: Dict[int, Suggestion] = {}
+        with self._bind.connect() as conn:
+            for start in range(0, len(ids), 500):
+                found.update(
+                    (row.id, (row.id, row.name, row.sku))
+                    for row in conn.execute(
+                        select(Product.id, Product.name, Product.sku).where(Product.id.in_(ids[start:start + 500]))
+                    )
+                )
+        for product_id in ids:
+            with self._lock:
+                changed = self._current(product_id) != found.get(product_id)
+            if changed:
+                self._record(product_id, found.get(product_id))
+
+    def search(self, prefix: str, limit: int = 10) -> Optional[List[Suggestion]]:
+        """
+        Products whose name or SKU starts with a prefix, most popular first.
+
+        Returns:
+            Up to `limit` (id, name, sku), or None until the first index is built
+        """
+        key = prefix.encode().lower()
+        with self._lock:
+            index = self._index
+            if index is None:
+                return None
+            pending = dict(self._pending)
+            popularity = self._popularity
+
+        results: List[Tuple[float, Suggestion]] = []
+        seen = set()
+        for score, slot in index.matches(key):
+            product_id = index.ids[slot]
+            if product_id in seen or product_id in pending:
+                continue
+            seen.add(product_id)
+            results.append((score, index.product(slot)))
+            if len(results) == limit:
+                break
+        for suggestion, _ in pending.values():
+            if suggestion is not None and (
+                suggestion[1].encode().lower().startswith(key) or suggestion[2].encode().lower().startswith(key)
+            ):
+                results.append((popularity.get(suggestion[0], 0), suggestion))
+        results.sort(key=lambda result: (-result[0], result[1][1].lower()))
+        return [suggestion for _, suggestion in results[:limit]]
+
+
+autocomplete_index = AutocompleteIndex(
+    rebuild_interval=settings.AUTOCOMPLETE_REBUILD_SECONDS,
+    max_pending=settings.AUTOCOMPLETE_MAX_PENDING,
+    recent_orders=settings.AUTOCOMPLETE_RECENT_ORDERS,
+)
+invalidation_bus.subscribe(autocomplete_index.refresh)
@@ -1,3 +1,7 @@
 from app.db.base_class import Base
 from app.db.models.product import Product 
-from app.db.models.order import Order
\ No newline at end of file
+from app.db.models.order import Order
+from app.db.models.product_change import ProductChange
+from app.db.models.inventory import InventoryMovement, InventorySnapshot
+from app.db.models.product_facet import ProductFacet
+from app.db.models.order_archive import OrderArchive
@@ -0,0 +1,134 @@
+"""
+Pruning of the productchange log.
+
+Triggers append a productchange row for every write to the product table,
+stock changes included, so the log grows with every order line. Its
+readers only need its recent past: the invalidation bus and the catalog
+snapshot follow it within seconds, and sync clients of GET
+/products/changes come back within a retention period. A pruner deletes
+changes older than that period, oldest first and in batches.
+
+Only a prefix of the log is ever deleted, so every change after the
+retention watermark, the ID just before the oldest change left, is still
+there. A reader that has seen the log up to the watermark or later can
+follow it; one behind it may have missed pruned changes and has to start
+over. The newest change is never deleted, so max(id), the catalog version,
+never goes back.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.db.models.product_change import ProductChange
+
+logger = logging.getLogger(__name__)
+
+
+def retention_watermark(conn: Connection) -> int:
+    """ID of the last pruned change; every change after it is still in the log."""
+    return conn.execute(select(func.coalesce(func.min(ProductChange.id) - 1, 0))).scalar()
+
+
+def prune_batch(conn: Connection, *, before: datetime, batch_size: int = 10_000) -> int:
+    """
+    Delete the oldest changes made before a cutoff.
+
+    Runs in the connection's transaction; commit it to keep the deletion.
+
+    Args:
+        conn: Connection to the database
+        before: Only changes made before this are deleted
+        batch_size: Maximum number of changes deleted
+
+    Returns:
+        Number of changes deleted
+    """
+    changes = ProductChange.__table__
+    if conn.dialect.name == "sqlite":
+        # Take the write lock before reading the log, so pruners do not race
+        conn.execute(text("UPDATE productchange SET op = op WHERE 0"))
+    rows = conn.execute(
+        select(changes.c.id, changes.c.created_at)
+        .where(changes.c.id < select(func.max(changes.c.id)).scalar_subquery())
+        .order_by(changes.c.id)
+        .limit(batch_size)
+    ).all()
+    # Stop at the first change that is still recent, so only a prefix goes
+    last_id = None
+    for change_id, created_at in rows:
+        if created_at >= before:
+            break
+        last_id = change_id
+    if last_id is None:
+        return 0
+    return conn.execute(delete(changes).where(changes.c.id <= last_id)).rowcount
+
+
+class ChangeLogPruner:
+    """
+    Thread that keeps deleting changes older than the retention period.
+
+    **Parameters**
+
+    * `retention_hours`: Age in hours after which changes are deleted
+    * `interval`: Seconds between pruning rounds
+    * `batch_size`: Changes deleted per transaction; a round deletes batches until caught up
+    """
+
+    def __init__(self, retention_hours: float = 168.0, interval: float = 600.0, batch_size: int = 10_000):
+        self.retention_hours = retention_hours
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pruned = 0
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-log-pruner", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.prune(self._bind)
+            except Exception:
+                logger.exception("Change log pruning failed")
+
+    def prune(self, bind: Engine, now: Optional[datetime] = None) -> int:
+        """
+        Delete batches until no change older than the retention period is left or the pruner is stopped.
+
+        Returns:
+            Number of changes deleted
+        """
+        before = (now or datetime.utcnow()) - timedelta(hours=self.retention_hours)
+        total = 0
+        while not self._stop.is_set():
+            with bind.begin() as conn:
+                pruned = prune_batch(conn, before=before, batch_size=self.batch_size)
+            total += pruned
+            if pruned < self.batch_size:
+                break
+        self.pruned += total
+        return total
+
+
+change_log_pruner = ChangeLogPruner(
+    retention_hours=settings.PRODUCT_CHANGE_RETENTION_HOURS,
+    interval=settings.PRODUCT_CHANGE_PRUNE_SECONDS,
+    batch_size=settings.PRODUCT_CHANGE_PRUNE_BATCH,
+)
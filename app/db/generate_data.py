@@ -0,0 +1,286 @@
+"""
+Synthetic data generator for production-scale catalogs and order histories.
+
+Examples:
+
+    python -m app.db.generate_data --products 1000000 --orders 10000000 --seed 42
+    python -m app.db.generate_data --products 5000 --orders 50000 --database-url sqlite:///./bench.db
+
+Products get a skewed category distribution, log-normal description sizes
+and prices, and a long-tailed stock level. Orders pick products with
+Zipf-distributed popularity and are spread over the months before `--end`.
+Rows are written with executemany in chunked transactions. The same seed,
+sizes and end date always produce the same rows.
+"""
+import argparse
+import itertools
+import json
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.models.inventory import REASON_INITIAL, InventoryMovement
+from app.db.models.order import Order
+from app.db.models.product import Product
+
+CATEGORIES = [
+    "Electronics", "Home Goods", "Clothing", "Books", "Toys", "Sports", "Beauty", "Garden",
+    "Grocery", "Automotive", "Office", "Pet Supplies", "Music", "Jewelry", "Tools", "Baby",
+    "Health", "Outdoors", "Crafts", "Luggage",
+]
+ADJECTIVES = [
+    "Classic", "Compact", "Deluxe", "Ergonomic", "Lightweight", "Portable", "Premium", "Rugged",
+    "Sleek", "Smart", "Vintage", "Wireless", "Organic", "Modular", "Heavy-Duty", "Eco",
+]
+NOUNS = [
+    "Lamp", "Backpack", "Headphones", "Kettle", "Jacket", "Notebook", "Blender", "Drone",
+    "Chair", "Speaker", "Watch", "Tent", "Sneakers", "Camera", "Puzzle", "Mixer", "Router",
+]
+WORDS = (
+    "quality durable design comfortable everyday use perfect gift modern finish easy clean "
+    "long lasting battery premium material lightweight travel friendly warranty included"
+).split()
+
+# SQLite's default DATETIME storage format used by SQLAlchemy
+_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+DEFAULT_END = datetime(2024, 1, 1)
+
+ProductRow = Tuple[int, str, str, str, Optional[str], float, int]
+OrderRow = Tuple[int, str, float, str, str]
+
+
+class DataGenerator:
+    """
+    Deterministic generator of product and order rows.
+
+    **Parameters**
+
+    * `seed`: Random seed
+    * `months`: Number of months the order history is spread over
+    * `end`: Timestamp of the most recent order
+    * `zipf_s`: Exponent of the product popularity distribution
+    """
+
+    def __init__(self, seed: int = 0, months: int = 6, end: datetime = DEFAULT_END, zipf_s: float = 1.1):
+        self.seed = seed
+        self.months = months
+        self.end = end
+        self.zipf_s = zipf_s
+
+    def products(self, count: int, start_id: int = 1) -> Iterator[ProductRow]:
+        """
+        Generate product rows.
+
+        Args:
+            count: Number of products
+            start_id: Id of the first product
+
+        Returns:
+            Iterator of (id, name, sku, category, description, price, stock)
+        """
+        rng = random.Random(f"{self.seed}:products")
+        category_weights = list(itertools.accumulate(1 / (rank + 1) ** 1.2 for rank in range(len(CATEGORIES))))
+        base_price = {category: rng.uniform(5, 150) for category in CATEGORIES}
+        for product_id in range(start_id, start_id + count):
+            category = rng.choices(CATEGORIES, cum_weights=category_weights)[0]
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {product_id}"
+            sku = f"{category[:3].upper()}-{product_id:08d}"
+            description = None
+            if rng.random() > 0.1:
+                words = max(int(rng.lognormvariate(3, 0.8)), 3)
+                description = " ".join(rng.choice(WORDS) for _ in range(words))[:1000]
+            price = round(min(max(base_price[category] * rng.lognormvariate(0, 0.6), 0.5), 99_999), 2)
+            stock = 0 if rng.random() < 0.05 else int(rng.paretovariate(1.2) * 20)
+            yield product_id, name, sku, category, description, price, stock
+
+    def orders(self, count: int, prices: Sequence[float], first_product_id: int = 1,
+               start_id: int = 1) -> Iterator[OrderRow]:
+        """
+        Generate order rows over an existing catalog.
+
+        Args:
+            count: Number of orders
+            prices: Product prices, indexed by product id minus `first_product_id`
+            first_product_id: Id of the product at prices[0]
+            start_id: Id of the first order
+
+        Returns:
+            Iterator of (id, products_json, total_price, status, created_at)
+        """
+        rng = random.Random(f"{self.seed}:orders")
+        # Popularity rank is a random permutation of the catalog, so popular
+        # products are not simply the lowest ids
+        ranked = list(range(len(prices)))
+        rng.shuffle(ranked)
+        cum_weights = list(itertools.accumulate(1 / (rank + 1) ** self.zipf_s for rank in range(len(ranked))))
+
+        start = self.end - timedelta(days=30 * self.months)
+        step = (self.end - start).total_seconds() / max(count, 1)
+        for i in range(count):
+            lines = min(1 + int(rng.expovariate(0.9)), 10)
+            picked = dict.fromkeys(rng.choices(ranked, cum_weights=cum_weights, k=lines))
+            items, total = [], 0.0
+            for index in picked:
+                quantity = 1 if rng.random() < 0.7 else rng.randint(2, 5)
+                items.append({"product_id": index + first_product_id, "quantity": quantity})
+                total += prices[index] * quantity
+            created_at = start + timedelta(seconds=(i + rng.random()) * step)
+            status = "pending" if rng.random() < 0.02 else "completed"
+            yield start_id + i, json.dumps(items), round(total, 2), status, created_at.strftime(_DATETIME_FORMAT)
+
+
+def _chunks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    iterator = iter(rows)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bulk_insert(conn: Connection, table, columns: Sequence[str], rows: Iterable[tuple],
+                 chunk_size: int, on_chunk=None) -> int:
+    """Insert rows with executemany, committing one transaction per chunk."""
+    preparer = conn.dialect.identifier_preparer
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(column) for column in columns),
+        ", ".join("?" for _ in columns),
+    )
+    written = 0
+    for chunk in _chunks(rows, chunk_size):
+        with conn.begin():
+            conn.exec_driver_sql(sql, chunk)
+        written += len(chunk)
+        if on_chunk:
+            on_chunk(written)
+    return written
+
+
+def generate(engine: Engine, *, products: int, orders: int, seed: int = 0, months: int = 6,
+             end: datetime = DEFAULT_END, chunk_size: int = 50_000, progress: bool = False) -> dict:
+    """
+    Generate products and orders into an existing schema.
+
+    Products are appended after the current highest product id; orders are
+    generated over the whole catalog, including pre-existing products.
+
+    Args:
+        engine: Engine to write through
+        products: Number of products to create
+        orders: Number of orders to create
+        seed: Random seed
+        months: Number of months the orders are spread over
+        end: Timestamp of the most recent order
+        chunk_size: Rows per transaction
+        progress: Print progress to stderr
+
+    Returns:
+        Dict with the number of rows written and the elapsed seconds
+    """
+    generator = DataGenerator(seed=seed, months=months, end=end)
+    product_table, order_table = Product.__table__, Order.__table__
+    preparer = engine.dialect.identifier_preparer
+    started = time.perf_counter()
+
+    def report(kind):
+        if not progress:
+            return None
+        return lambda written: print(
+            f"{kind}: {written:,} rows ({written / (time.perf_counter() - started):,.0f}/s)", file=sys.stderr
+        )
+
+    with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            synchronous = conn.exec_driver_sql("PRAGMA synchronous").scalar()
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        next_product_id = conn.execute(
+            text(f"SELECT coalesce(max(id), 0) FROM {preparer.format_table(product_table)}")
+        ).scalar() + 1
+        next_order_id = conn.execute(
+            text(f"SELECT coalesce(max(id), 0) FROM {preparer.format_table(order_table)}")
+        ).scalar() + 1
+        conn.commit()
+
+        try:
+            product_count = _bulk_insert(
+                conn, product_table, ["id", "name", "sku", "category", "description", "price", "stock"],
+                generator.products(products, start_id=next_product_id), chunk_size, report("products"),
+            )
+            # Opening stock goes to the inventory ledger, dated before the order history
+            with conn.begin():
+                conn.execute(
+                    text(
+                        f"INSERT INTO {preparer.format_table(InventoryMovement.__table__)} "
+                        "(product_id, delta, reason, created_at) "
+                        f"SELECT id, stock, :reason, :created_at FROM {preparer.format_table(product_table)} "
+                        "WHERE id >= :first_id AND stock != 0 ORDER BY id"
+                    ),
+                    {
+                        "reason": REASON_INITIAL,
+                        "created_at": (end - timedelta(days=30 * months)).strftime(_DATETIME_FORMAT),
+                        "first_id": next_product_id,
+                    },
+                )
+
+            order_count = 0
+            rows = conn.execute(
+                text(f"SELECT id, price FROM {preparer.format_table(product_table)} ORDER BY id")
+            ).all() if orders else []
+            conn.commit()
+            if rows:
+                # Ids are dense for generated catalogs; gaps get price 0 so indexing stays valid
+                first_id = rows[0][0]
+                prices = array("d", [0.0]) * (rows[-1][0] - first_id + 1)
+                for product_id, price in rows:
+                    prices[product_id - first_id] = price
+                order_count = _bulk_insert(
+                    conn, order_table, ["id", "products", "total_price", "status", "created_at"],
+                    generator.orders(orders, prices, first_product_id=first_id, start_id=next_order_id),
+                    chunk_size, report("orders"),
+                )
+        finally:
+            if sqlite:
+                conn.exec_driver_sql(f"PRAGMA synchronous={synchronous}")
+
+    return {
+        "products": product_count,
+        "orders": order_count,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from app.core.config import settings
+    from app.db.init_db import ensure_schema
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--months", type=int, default=6)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=DEFAULT_END,
+                        help="Timestamp of the most recent order (ISO format)")
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    ensure_schema(engine)
+    stats = generate(
+        engine, products=args.products, orders=args.orders, seed=args.seed, months=args.months,
+        end=args.end, chunk_size=args.chunk_size, progress=True,
+    )
+    print(f"Wrote {stats['products']:,} products and {stats['orders']:,} orders in {stats['elapsed_s']}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,131 @@
-from sqlalchemy.exc import IntegrityError
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
 
 from app.db.base import Base
+from app.db.generate_data import generate
 from app.db.session import engine
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Head revision of app/db/migrations; bump it with every new migration.
+# Kept as a constant so the startup check does not have to import alembic.
+SCHEMA_REVISION = "0008"
+
+# Revision matching the schema that create_all() produced before migrations existed
+INITIAL_REVISION = "0001"
+
+
+def _unversioned_revision(connection: Connection) -> Optional[str]:
+    """
+    Revision of a database that has tables but no alembic_version.
+
+    create_all() of the current models builds the head schema, triggers
+    included; a database with only some of their tables predates migrations.
+
+    Returns:
+        The revision to stamp, or None for an empty database
+    """
+    tables = set(inspect(connection).get_table_names())
+    if set(Base.metadata.tables) <= tables:
+        return SCHEMA_REVISION
+    if "product" in tables:
+        return INITIAL_REVISION
+    return None
+
+
+def _alembic_config(connection: Optional[Connection] = None):
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", MIGRATIONS_DIR)
+    config.attributes["connection"] = connection
+    return config
+
+
+def schema_head() -> str:
+    """Head revision according to the migration scripts."""
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(_alembic_config()).get_current_head()
+
+
+def current_revision(connection: Connection) -> Optional[str]:
+    """Revision stored in the database, or None if it was never migrated."""
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+
+@contextmanager
+def _migration_lock(bind: Engine) -> Iterator[None]:
+    """Serialize migrations between workers booting at once against the same SQLite file."""
+    database = bind.url.database
+    if fcntl is None or bind.dialect.name != "sqlite" or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.migrate.lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def ensure_schema(bind: Engine = engine) -> bool:
+    """
+    Bring the database schema up to date.
+    
+    The common case, a database already at SCHEMA_REVISION, costs one read
+    of the alembic_version table and runs no DDL. Databases created by
+    create_all() before migrations existed are stamped with the initial
+    revision before upgrading; those created by create_all() of the current
+    models are stamped with the head revision.
+    
+    Args:
+        bind: Engine of the database to migrate
+        
+    Returns:
+        True if migrations were applied, False if the schema was current
+    """
+    with bind.connect() as conn:
+        if current_revision(conn) == SCHEMA_REVISION:
+            return False
+
+    from alembic import command
 
-def create_tables() -> None:
-    """Create all database tables."""
-    Base.metadata.create_all(bind=engine)
+    with _migration_lock(bind):
+        with bind.begin() as conn:
+            current = current_revision(conn)
+            if current == SCHEMA_REVISION:
+                # Another worker migrated while we waited for the lock
+                return False
+            config = _alembic_config(conn)
+            if current is None:
+                revision = _unversioned_revision(conn)
+                if revision is not None:
+                    command.stamp(config, revision)
+            command.upgrade(config, "head")
+    return True
 
 
-def init_db() -> None:
-    """Initialize database with seed data if needed."""
-    create_tables()
+def init_db(products: int = 0, orders: int = 0, seed: int = 0) -> None:
+    """
+    Initialize database with seed data if needed.
+    
+    Args:
+        products: Number of synthetic products to generate
+        orders: Number of synthetic orders to generate
+        seed: Random seed for the generated data
+    """
+    ensure_schema()
+    if products or orders:
+        generate(engine, products=products, orders=orders, seed=seed)
@@ -0,0 +1,153 @@
+"""
+Cross-worker invalidation of in-process caches, with no broker.
+
+Every write to the product table is appended to productchange by a trigger,
+whichever worker or tool made it. Each worker runs an InvalidationBus that
+follows that log: it checks `PRAGMA data_version`, which changes only when
+another connection commits, and reads the new changes only when it moved.
+Handlers receive the changed product ids, or None for a catalog-wide
+invalidation, within one poll interval of the commit. A bus that fell behind
+changes since pruned from the log invalidates the whole catalog.
+"""
+import logging
+import threading
+from typing import Callable, FrozenSet, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from app.core.cache import product_cache
+from app.core.config import settings
+from app.db.change_log import retention_watermark
+from app.db.models.product_change import ProductChange
+
+logger = logging.getLogger(__name__)
+
+# op of a productchange row that invalidates every product
+CATALOG_OP = "catalog"
+
+Handler = Callable[[Optional[FrozenSet[int]]], None]
+
+
+def publish_catalog_invalidation(db: Session) -> None:
+    """Ask every worker to drop everything it caches about products."""
+    db.add(ProductChange(product_id=0, op=CATALOG_OP))
+    db.commit()
+
+
+class InvalidationBus:
+    """
+    Follows the productchange log and dispatches invalidations to handlers.
+
+    **Parameters**
+
+    * `poll_interval`: Seconds between checks, the bound on invalidation delay
+    * `batch_size`: Changes read per poll; a larger backlog is treated as catalog-wide
+    """
+
+    def __init__(self, poll_interval: float = 0.5, batch_size: int = 10_000):
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.last_change_id: Optional[int] = None
+        self._handlers: List[Handler] = []
+        self._data_version: Optional[int] = None
+        self._conn: Optional[Connection] = None
+        self._engine: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def start(self, bind: Engine) -> None:
+        """Start following the log from its current end."""
+        # A connection of its own: data_version ignores commits made on the
+        # polling connection, and it should not hold a slot of the app's pool
+        self._engine = create_engine(bind.url, poolclass=NullPool)
+        self._conn = self._engine.connect()
+        self.last_change_id = self._max_change_id()
+        self._data_version = self._read_data_version()
+        self._conn.rollback()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._conn is not None:
+            self._conn.close()
+            self._engine.dispose()
+            self._conn = self._engine = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Invalidation poll failed")
+
+    def _read_data_version(self) -> Optional[int]:
+        if self._conn.dialect.name != "sqlite":
+            return None
+        return self._conn.exec_driver_sql("PRAGMA data_version").scalar()
+
+    def _max_change_id(self) -> int:
+        return self._conn.execute(text("SELECT coalesce(max(id), 0) FROM productchange")).scalar()
+
+    def poll(self) -> int:
+        """
+        Dispatch the changes committed since the last poll.
+
+        Returns:
+            Number of changes read
+        """
+        try:
+            data_version = self._read_data_version()
+            if data_version is not None and data_version == self._data_version:
+                return 0
+            changes = self._conn.execute(
+                text("SELECT id, product_id, op FROM productchange WHERE id > :last ORDER BY id LIMIT :limit"),
+                {"last": self.last_change_id, "limit": self.batch_size + 1},
+            ).all()
+            if len(changes) > self.batch_size or self.last_change_id < retention_watermark(self._conn):
+                # Too far behind to replay, or changes were pruned unread; start again from the end of the log
+                changes, last_change_id = None, self._max_change_id()
+            elif changes:
+                last_change_id = changes[-1].id
+            else:
+                last_change_id = self.last_change_id
+        finally:
+            self._conn.rollback()
+
+        self._data_version = data_version
+        if changes == []:
+            return 0
+        product_ids = None
+        if changes is not None and not any(change.op == CATALOG_OP for change in changes):
+            product_ids = frozenset(change.product_id for change in changes)
+        self.last_change_id = last_change_id
+        self._dispatch(product_ids)
+        return self.batch_size + 1 if changes is None else len(changes)
+
+    def _dispatch(self, product_ids: Optional[FrozenSet[int]]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(product_ids)
+            except Exception:
+                logger.exception("Invalidation handler %r failed", handler)
+
+
+def invalidate_product_cache(product_ids: Optional[FrozenSet[int]]) -> None:
+    if product_ids is None:
+        product_cache.clear()
+    else:
+        product_cache.invalidate_many(product_ids)
+
+
+invalidation_bus = InvalidationBus(poll_interval=settings.INVALIDATION_POLL_SECONDS)
+invalidation_bus.subscribe(invalidate_product_cache)
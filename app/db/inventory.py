@@ -0,0 +1,146 @@
+"""
+Background compaction of the inventory ledger into snapshots.
+
+Every stock change appends an InventoryMovement. Reading a product's stock
+from the ledger alone would sum its whole history, so a compactor folds
+the ledger, in order and in batches, into InventorySnapshot rows: the stock
+of each product touched by the batch after its last movement in the batch.
+CRUDInventory.stock_at then reads one snapshot and the short tail of
+movements after it. Snapshots are kept, so past stock stays answerable.
+
+Any number of workers can run a compactor against one database: a batch is
+folded in a single write transaction that starts by taking the write lock,
+so each movement is folded exactly once.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.db.models.inventory import InventoryMovement, InventorySnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def compact_batch(conn: Connection, batch_size: int = 10_000, chunk_size: int = 500) -> int:
+    """
+    Fold the next movements after the last snapshot into new snapshots.
+
+    Runs in the connection's transaction; commit it to keep the snapshots.
+
+    Args:
+        conn: Connection to the database
+        batch_size: Maximum number of movements folded
+        chunk_size: Maximum number of product IDs per snapshot lookup
+
+    Returns:
+        Number of movements folded
+    """
+    movements, snapshots = InventoryMovement.__table__, InventorySnapshot.__table__
+    if conn.dialect.name == "sqlite":
+        # Take the write lock before reading the watermark, so two
+        # compactors never fold the same movements
+        conn.execute(text("UPDATE inventorysnapshot SET stock = stock WHERE 0"))
+    watermark = conn.execute(select(func.coalesce(func.max(snapshots.c.movement_id), 0))).scalar()
+    rows = conn.execute(
+        select(movements.c.id, movements.c.product_id, movements.c.delta, movements.c.created_at)
+        .where(movements.c.id > watermark)
+        .order_by(movements.c.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    # product_id -> [stock change, last movement id, its created_at]
+    folded: Dict[int, list] = OrderedDict()
+    for movement_id, product_id, delta, created_at in rows:
+        entry = folded.setdefault(product_id, [0, 0, None])
+        entry[0] += delta
+        entry[1], entry[2] = movement_id, created_at
+
+    previous: Dict[int, int] = {}
+    product_ids = list(folded)
+    latest = (
+        select(snapshots.c.product_id, func.max(snapshots.c.movement_id).label("movement_id"))
+        .group_by(snapshots.c.product_id)
+    )
+    for start in range(0, len(product_ids), chunk_size):
+        chunk = latest.where(snapshots.c.product_id.in_(product_ids[start:start + chunk_size])).subquery()
+        previous.update(conn.execute(
+            select(snapshots.c.product_id, snapshots.c.stock).join(
+                chunk,
+                (snapshots.c.product_id == chunk.c.product_id)
+                & (snapshots.c.movement_id == chunk.c.movement_id),
+            )
+        ).all())
+
+    conn.execute(insert(snapshots), [
+        {"product_id": product_id, "stock": previous.get(product_id, 0) + delta,
+         "movement_id": movement_id, "taken_at": taken_at}
+        for product_id, (delta, movement_id, taken_at) in folded.items()
+    ])
+    return len(rows)
+
+
+class InventoryCompactor:
+    """
+    Thread that keeps folding the inventory ledger into snapshots.
+
+    **Parameters**
+
+    * `interval`: Seconds between compaction rounds
+    * `batch_size`: Movements folded per transaction; a round folds batches until caught up
+    """
+
+    def __init__(self, interval: float = 60.0, batch_size: int = 10_000):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.folded = 0
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="inventory-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.compact(self._bind)
+            except Exception:
+                logger.exception("Inventory compaction failed")
+
+    def compact(self, bind: Engine) -> int:
+        """
+        Fold batches until the ledger is caught up or the compactor is stopped.
+
+        Returns:
+            Number of movements folded
+        """
+        total = 0
+        while not self._stop.is_set():
+            with bind.begin() as conn:
+                folded = compact_batch(conn, self.batch_size)
+            total += folded
+            if folded < self.batch_size:
+                break
+        self.folded += total
+        return total
+
+
+inventory_compactor = InventoryCompactor(
+    interval=settings.INVENTORY_COMPACTION_SECONDS, batch_size=settings.INVENTORY_COMPACTION_BATCH
+)
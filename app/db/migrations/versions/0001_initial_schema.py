@@ -0,0 +1,65 @@
+"""initial schema
+
+Product and order tables as they were created by create_all() before migrations.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-19 01:26:14.760768
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('order',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('products', sa.JSON(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_id'), ['id'], unique=False)
+
+    op.create_table('product',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('sku', sa.String(length=50), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name', name='uq_product_name'),
+    sa.UniqueConstraint('sku', name='uq_product_sku')
+    )
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_product_category'), ['category'], unique=False)
+        batch_op.create_index(batch_op.f('ix_product_id'), ['id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_product_name'), ['name'], unique=True)
+        batch_op.create_index(batch_op.f('ix_product_sku'), ['sku'], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_product_sku'))
+        batch_op.drop_index(batch_op.f('ix_product_name'))
+        batch_op.drop_index(batch_op.f('ix_product_id'))
+        batch_op.drop_index(batch_op.f('ix_product_category'))
+
+    op.drop_table('product')
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_id'))
+
+    op.drop_table('order')
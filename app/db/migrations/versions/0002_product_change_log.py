@@ -0,0 +1,61 @@
+"""product change log
+
+Table of product writes filled by triggers; its highest id is the catalog version.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 09:12:41.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the triggers as of this revision; change them in a new migration
+PRODUCT_CHANGE_TRIGGERS = [
+    """
+    CREATE TRIGGER product_change_insert AFTER INSERT ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (NEW.id, 'insert');
+    END
+    """,
+    """
+    CREATE TRIGGER product_change_update AFTER UPDATE ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (NEW.id, 'update');
+    END
+    """,
+    """
+    CREATE TRIGGER product_change_delete AFTER DELETE ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (OLD.id, 'delete');
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    op.create_table('productchange',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=10), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    for trigger in PRODUCT_CHANGE_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    for name in ('product_change_delete', 'product_change_update', 'product_change_insert'):
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('productchange')
@@ -0,0 +1,67 @@
+"""inventory ledger
+
+Append-only table of stock movements and the snapshots the compactor folds
+it into. Existing stock is recorded as one initial movement per product.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 13:40:22.508113
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('inventorymovement',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('delta', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=20), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    with op.batch_alter_table('inventorymovement', schema=None) as batch_op:
+        batch_op.create_index('ix_inventorymovement_product_id_id', ['product_id', 'id'], unique=False)
+
+    op.create_table('inventorysnapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.Column('movement_id', sa.Integer(), nullable=False),
+    sa.Column('taken_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('product_id', 'movement_id', name='uq_inventorysnapshot_product_movement')
+    )
+    with op.batch_alter_table('inventorysnapshot', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_inventorysnapshot_movement_id'), ['movement_id'], unique=False)
+
+    op.execute(
+        sa.text(
+            "INSERT INTO inventorymovement (product_id, delta, reason, created_at) "
+            "SELECT id, stock, 'initial', :now FROM product WHERE stock != 0 ORDER BY id"
+        ).bindparams(sa.bindparam('now', datetime.utcnow(), type_=sa.DateTime()))
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('inventorysnapshot', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_inventorysnapshot_movement_id'))
+
+    op.drop_table('inventorysnapshot')
+    with op.batch_alter_table('inventorymovement', schema=None) as batch_op:
+        batch_op.drop_index('ix_inventorymovement_product_id_id')
+
+    op.drop_table('inventorymovement')
@@ -0,0 +1,33 @@
+"""backfill product changes
+
+Record an insert in productchange for products created before the change
+log existed, so syncing changes from version 0 returns the whole catalog.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 15:02:57.114630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "INSERT INTO productchange (product_id, op) "
+        "SELECT id, 'insert' FROM product "
+        "WHERE id NOT IN (SELECT product_id FROM productchange) "
+        "ORDER BY id"
+    )
+
+
+def downgrade() -> None:
+    pass
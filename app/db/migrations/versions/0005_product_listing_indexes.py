@@ -0,0 +1,40 @@
+"""product listing indexes
+
+Composite indexes for listings filtered by category and price and sorted
+by price or name, and a partial index of in-stock products by price.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 17:12:40.318205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_category_price', ['category', 'price', 'id'], unique=False)
+        batch_op.create_index('ix_product_category_name', ['category', 'name'], unique=False)
+        batch_op.create_index('ix_product_price_id', ['price', 'id'], unique=False)
+        batch_op.create_index(
+            'ix_product_in_stock_price', ['price', 'id'], unique=False,
+            sqlite_where=sa.text('stock > 0'), postgresql_where=sa.text('stock > 0'),
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_in_stock_price')
+        batch_op.drop_index('ix_product_price_id')
+        batch_op.drop_index('ix_product_category_name')
+        batch_op.drop_index('ix_product_category_price')
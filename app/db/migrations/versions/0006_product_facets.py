@@ -0,0 +1,90 @@
+"""product facets
+
+Product counts per category and price bucket, kept current by triggers and
+filled from the existing catalog.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 18:03:26.740215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Frozen copy of the trigger and backfill SQL as of this revision; change them in a new migration
+_BUCKET = (
+    "(CASE WHEN {price} < 10 THEN 0 WHEN {price} < 25 THEN 1 WHEN {price} < 50 THEN 2 "
+    "WHEN {price} < 100 THEN 3 WHEN {price} < 250 THEN 4 WHEN {price} < 500 THEN 5 "
+    "WHEN {price} < 1000 THEN 6 ELSE 7 END)"
+)
+_COUNT = (
+    "INSERT INTO productfacet (category, price_bucket, products, in_stock) "
+    "VALUES ({row}.category, {bucket}, {sign}1, {sign}({row}.stock > 0)) "
+    "ON CONFLICT (category, price_bucket) DO UPDATE SET "
+    "products = products + excluded.products, in_stock = in_stock + excluded.in_stock;"
+)
+
+
+def _count(row: str, sign: str) -> str:
+    return _COUNT.format(row=row, sign=sign, bucket=_BUCKET.format(price=f"{row}.price"))
+
+
+PRODUCT_FACET_TRIGGERS = [
+    f"""
+    CREATE TRIGGER product_facet_insert AFTER INSERT ON product
+    BEGIN
+        {_count("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_facet_update AFTER UPDATE OF category, price, stock ON product
+    WHEN OLD.category IS NOT NEW.category
+        OR {_BUCKET.format(price="OLD.price")} != {_BUCKET.format(price="NEW.price")}
+        OR (OLD.stock > 0) != (NEW.stock > 0)
+    BEGIN
+        {_count("OLD", "-")}
+        {_count("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_facet_delete AFTER DELETE ON product
+    BEGIN
+        {_count("OLD", "-")}
+    END
+    """,
+]
+
+PRODUCT_FACET_BACKFILL = f"""
+    INSERT INTO productfacet (category, price_bucket, products, in_stock)
+    SELECT category, {_BUCKET.format(price="price")} AS bucket, count(*), coalesce(sum(stock > 0), 0)
+    FROM product
+    GROUP BY category, bucket
+"""
+
+
+def upgrade() -> None:
+    op.create_table('productfacet',
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('price_bucket', sa.Integer(), nullable=False),
+    sa.Column('products', sa.Integer(), nullable=False),
+    sa.Column('in_stock', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('category', 'price_bucket')
+    )
+    for trigger in PRODUCT_FACET_TRIGGERS:
+        op.execute(trigger)
+    op.execute(PRODUCT_FACET_BACKFILL)
+
+
+def downgrade() -> None:
+    for name in ('product_facet_delete', 'product_facet_update', 'product_facet_insert'):
+        op.execute(f'DROP TRIGGER IF EXISTS {name}')
+    op.drop_table('productfacet')
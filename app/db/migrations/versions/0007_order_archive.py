@@ -0,0 +1,45 @@
+"""order archive
+
+Compressed chunks of cold orders moved out of the order table by the
+archiver.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 21:12:48.301467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('orderarchive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('month', sa.String(length=7), nullable=False),
+    sa.Column('min_order_id', sa.Integer(), nullable=False),
+    sa.Column('max_order_id', sa.Integer(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('orderarchive', schema=None) as batch_op:
+        batch_op.create_index('ix_orderarchive_min_order_id', ['min_order_id'], unique=True)
+        batch_op.create_index(batch_op.f('ix_orderarchive_month'), ['month'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('orderarchive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_orderarchive_month'))
+        batch_op.drop_index('ix_orderarchive_min_order_id')
+
+    op.drop_table('orderarchive')
@@ -0,0 +1,30 @@
+"""product version
+
+Row version of products, incremented by every write, for optimistic
+concurrency. Existing products start at version 1.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 23:04:51.662180
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('product', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    # Native DROP COLUMN (SQLite 3.35+): a batch rebuild of product would drop its triggers
+    op.drop_column('product', 'version')
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, UniqueConstraint
+
+from app.db.base_class import Base
+
+# Reasons of inventory movements
+REASON_INITIAL = "initial"
+REASON_ORDER = "order"
+REASON_ADJUSTMENT = "adjustment"
+
+
+class InventoryMovement(Base):
+    """Append-only record of a stock change; never updated or deleted."""
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+    reason = Column(String(20), nullable=False)
+    order_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_inventorymovement_product_id_id", "product_id", "id"),
+        # AUTOINCREMENT keeps ids increasing, so a movement id is a position in the ledger
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<InventoryMovement {self.id} {self.product_id} {self.delta:+d}>"
+
+
+class InventorySnapshot(Base):
+    """Stock of a product after every movement up to `movement_id`, written by the compactor."""
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    stock = Column(Integer, nullable=False)
+    movement_id = Column(Integer, nullable=False, index=True)
+    taken_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("product_id", "movement_id", name="uq_inventorysnapshot_product_movement"),
+    )
+
+    def __repr__(self):
+        return f"<InventorySnapshot {self.product_id}@{self.movement_id} {self.stock}>"
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String
+
+from app.db.base_class import Base
+
+
+class OrderArchive(Base):
+    """
+    Cold orders moved out of the order table by the archiver, compressed in chunks.
+
+    A chunk holds orders of one month with consecutive IDs among the
+    archived ones, so chunks' ID ranges never overlap.
+    """
+    id = Column(Integer, primary_key=True)
+    # Month the orders were created in, "YYYY-MM"
+    month = Column(String(7), nullable=False, index=True)
+    min_order_id = Column(Integer, nullable=False)
+    max_order_id = Column(Integer, nullable=False)
+    orders = Column(Integer, nullable=False)
+    # zlib-compressed JSON list of [id, products, total_price, status, created_at]
+    data = Column(LargeBinary, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_orderarchive_min_order_id", "min_order_id", unique=True),
+    )
+
+    def __repr__(self):
+        return f"<OrderArchive {self.month} {self.min_order_id}..{self.max_order_id}>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Text, UniqueConstraint, Index, text
 
 from app.db.base_class import Base
 
@@ -11,10 +11,22 @@ class Product(Base):
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
     stock = Column(Integer, nullable=False, default=0)
+    # Incremented explicitly by every CRUD write, for optimistic concurrency:
+    # PATCH /products/{id} takes it as If-Match. It is not the mapper's
+    # version_id_col, so stock updates of concurrent orders never conflict.
+    version = Column(Integer, nullable=False, server_default=text("1"))
     
     __table_args__ = (
         UniqueConstraint('name', name='uq_product_name'),
         UniqueConstraint('sku', name='uq_product_sku'),
+        # Filtered and sorted listings; each ends in a unique column so keyset cursors are exact
+        Index('ix_product_category_price', 'category', 'price', 'id'),
+        Index('ix_product_category_name', 'category', 'name'),
+        Index('ix_product_price_id', 'price', 'id'),
+        Index(
+            'ix_product_in_stock_price', 'price', 'id',
+            sqlite_where=text('stock > 0'), postgresql_where=text('stock > 0'),
+        ),
     )
     
     def __repr__(self):
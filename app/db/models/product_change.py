@@ -0,0 +1,46 @@
+from sqlalchemy import DDL, Column, DateTime, Integer, String, event, func
+
+from app.db.base_class import Base
+from app.db.models.product import Product
+
+# Every write to the product table, including raw SQL and bulk loads, is
+# recorded by these triggers, so max(productchange.id) is the catalog version.
+PRODUCT_CHANGE_TRIGGERS = [
+    """
+    CREATE TRIGGER product_change_insert AFTER INSERT ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (NEW.id, 'insert');
+    END
+    """,
+    """
+    CREATE TRIGGER product_change_update AFTER UPDATE ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (NEW.id, 'update');
+    END
+    """,
+    """
+    CREATE TRIGGER product_change_delete AFTER DELETE ON product
+    BEGIN
+        INSERT INTO productchange (product_id, op) VALUES (OLD.id, 'delete');
+    END
+    """,
+]
+
+
+class ProductChange(Base):
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, nullable=False)
+    op = Column(String(10), nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.current_timestamp())
+
+    # AUTOINCREMENT keeps ids increasing even after old changes are pruned
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    def __repr__(self):
+        return f"<ProductChange {self.id} {self.op} {self.product_id}>"
+
+
+# The triggers are created with this table and need the product table to exist
+ProductChange.__table__.add_is_dependent_on(Product.__table__)
+for _trigger in PRODUCT_CHANGE_TRIGGERS:
+    event.listen(ProductChange.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
@@ -0,0 +1,79 @@
+from sqlalchemy import DDL, Column, Integer, PrimaryKeyConstraint, String, event
+
+from app.db.base_class import Base
+from app.db.models.product import Product
+
+# Upper bounds of the price histogram buckets; the last bucket has none
+PRICE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000)
+
+
+def price_bucket_sql(price: str) -> str:
+    """SQL expression of the histogram bucket of a price."""
+    cases = " ".join(f"WHEN {price} < {bound} THEN {i}" for i, bound in enumerate(PRICE_BUCKETS))
+    return f"(CASE {cases} ELSE {len(PRICE_BUCKETS)} END)"
+
+
+def _count(row: str, sign: str) -> str:
+    return (
+        "INSERT INTO productfacet (category, price_bucket, products, in_stock) "
+        f"VALUES ({row}.category, {price_bucket_sql(row + '.price')}, {sign}1, {sign}({row}.stock > 0)) "
+        "ON CONFLICT (category, price_bucket) DO UPDATE SET "
+        "products = products + excluded.products, in_stock = in_stock + excluded.in_stock;"
+    )
+
+
+# Product counts per category and price bucket follow every write to the
+# product table, including bulk stock updates and raw SQL, one row at a time
+PRODUCT_FACET_TRIGGERS = [
+    f"""
+    CREATE TRIGGER product_facet_insert AFTER INSERT ON product
+    BEGIN
+        {_count("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_facet_update AFTER UPDATE OF category, price, stock ON product
+    WHEN OLD.category IS NOT NEW.category
+        OR {price_bucket_sql("OLD.price")} != {price_bucket_sql("NEW.price")}
+        OR (OLD.stock > 0) != (NEW.stock > 0)
+    BEGIN
+        {_count("OLD", "-")}
+        {_count("NEW", "+")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER product_facet_delete AFTER DELETE ON product
+    BEGIN
+        {_count("OLD", "-")}
+    END
+    """,
+]
+
+
+# Counts computed from scratch, into an empty productfacet table
+PRODUCT_FACET_BACKFILL = f"""
+    INSERT INTO productfacet (category, price_bucket, products, in_stock)
+    SELECT category, {price_bucket_sql("price")} AS bucket, count(*), coalesce(sum(stock > 0), 0)
+    FROM product
+    GROUP BY category, bucket
+"""
+
+
+class ProductFacet(Base):
+    category = Column(String(100), nullable=False)
+    price_bucket = Column(Integer, nullable=False)
+    products = Column(Integer, nullable=False, default=0)
+    in_stock = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("category", "price_bucket"),
+    )
+
+    def __repr__(self):
+        return f"<ProductFacet {self.category} {self.price_bucket}: {self.products}>"
+
+
+# The triggers are created with this table and need the product table to exist
+ProductFacet.__table__.add_is_dependent_on(Product.__table__)
+for _trigger in PRODUCT_FACET_TRIGGERS:
+    event.listen(ProductFacet.__table__, "after_create", DDL(_trigger).execute_if(dialect="sqlite"))
@@ -0,0 +1,218 @@
+"""
+Archival of cold orders out of the order table into compressed chunks.
+
+Nearly all order reads are of recent orders, but the order table and its
+indexes keep every order ever placed. An archiver moves completed orders
+older than a configurable age, in ID order and in batches, into
+OrderArchive rows: chunks of up to `chunk_size` orders of one month,
+stored as zlib-compressed JSON. The hot table then holds roughly the
+archival age worth of orders, whatever the history.
+
+Chunks are rows of an ordinary table rather than per-month tables or
+attached database files, so archiving a batch is one transaction on any
+database: orders are inserted into chunks and deleted from the hot table
+together, and a crash leaves them in exactly one of the two. Chunks cover
+disjoint, increasing ID ranges, so an order is found with one index
+lookup of the chunk starting at or before its ID.
+
+Orders are archived in ID order: an order still pending, or younger than
+the cutoff, when later orders are archived stays in the hot table. The
+newest order is never archived, so SQLite, which numbers orders from the
+largest ID in the table, does not hand out an archived order's ID again.
+On SQLite the freed pages are reused by new orders; the file itself only
+shrinks with VACUUM.
+"""
+import bisect
+import json
+import logging
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Iterator, List, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.models.order import Order
+from app.db.models.order_archive import OrderArchive
+
+logger = logging.getLogger(__name__)
+
+
+def pack(rows: List[List[Any]]) -> bytes:
+    """Compress [id, products, total_price, status, created_at] rows of one chunk, one JSON array per line."""
+    return zlib.compress("\n".join(json.dumps(row, separators=(",", ":")) for row in rows).encode())
+
+
+def unpack(data: bytes) -> List[List[Any]]:
+    """[id, products, total_price, status, created_at] rows of a chunk, in ID order."""
+    return [json.loads(line) for line in zlib.decompress(data).split(b"\n")]
+
+
+def _order(row: List[Any]) -> Order:
+    order_id, products, total_price, status, created_at = row
+    return Order(id=order_id, products=products, total_price=total_price, status=status,
+                 created_at=datetime.fromisoformat(created_at))
+
+
+def archive_batch(conn: Connection, *, before: datetime, batch_size: int = 10_000, chunk_size: int = 1_000) -> int:
+    """
+    Move the next completed orders created before a cutoff into archive chunks.
+
+    Runs in the connection's transaction; commit it to keep the move.
+
+    Args:
+        conn: Connection to the database
+        before: Only orders created before this are archived
+        batch_size: Maximum number of orders archived
+        chunk_size: Maximum number of orders per chunk
+
+    Returns:
+        Number of orders archived
+    """
+    orders, archive = Order.__table__, OrderArchive.__table__
+    if conn.dialect.name == "sqlite":
+        # Take the write lock before reading the watermark, so two
+        # archivers never archive the same orders
+        conn.execute(text("UPDATE orderarchive SET orders = orders WHERE 0"))
+    watermark = conn.execute(select(func.coalesce(func.max(archive.c.max_order_id), 0))).scalar()
+    rows = conn.execute(
+        select(orders.c.id, orders.c.products, orders.c.total_price, orders.c.status, orders.c.created_at)
+        .where(
+            orders.c.id > watermark,
+            orders.c.id < select(func.max(orders.c.id)).scalar_subquery(),
+            orders.c.status == "completed",
+            orders.c.created_at < before,
+        )
+        .order_by(orders.c.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    chunks: List[List[Any]] = []
+    for row in rows:
+        month = row.created_at.strftime("%Y-%m")
+        if not chunks or chunks[-1][0] != month or len(chunks[-1][1]) == chunk_size:
+            chunks.append([month, []])
+        chunks[-1][1].append([row.id, row.products, row.total_price, row.status, row.created_at.isoformat()])
+
+    archived_at = datetime.utcnow()
+    conn.execute(insert(archive), [
+        {"month": month, "min_order_id": chunk[0][0], "max_order_id": chunk[-1][0], "orders": len(chunk),
+         "data": pack(chunk), "archived_at": archived_at}
+        for month, chunk in chunks
+    ])
+    for _, chunk in chunks:
+        conn.execute(delete(orders).where(orders.c.id.in_([order[0] for order in chunk])))
+    return len(rows)
+
+
+def get_archived(db: Session, order_id: int) -> Optional[Order]:
+    """
+    Read an archived order.
+
+    Returns:
+        The order as a transient Order object, not attached to the session, or None if it is not archived
+    """
+    chunk = db.execute(
+        select(OrderArchive.max_order_id, OrderArchive.data)
+        .where(OrderArchive.min_order_id <= order_id)
+        .order_by(OrderArchive.min_order_id.desc())
+        .limit(1)
+    ).first()
+    if chunk is None or chunk.max_order_id < order_id:
+        return None
+    # Lines start with "[<id>,": find the order's line without parsing the others
+    lines = zlib.decompress(chunk.data).split(b"\n")
+    index = bisect.bisect_left(lines, order_id, key=lambda line: int(line[1:line.index(b",")]))
+    if index < len(lines) and int(lines[index][1:lines[index].index(b",")]) == order_id:
+        return _order(json.loads(lines[index]))
+    return None
+
+
+def iter_archived(db: Session) -> Iterator[List[Any]]:
+    """[id, products, total_price, status, created_at] of every archived order, in ID order, a chunk at a time."""
+    last_id = 0
+    while True:
+        chunk = db.execute(
+            select(OrderArchive.min_order_id, OrderArchive.data)
+            .where(OrderArchive.min_order_id > last_id)
+            .order_by(OrderArchive.min_order_id)
+            .limit(1)
+        ).first()
+        if chunk is None:
+            return
+        last_id = chunk.min_order_id
+        yield from unpack(chunk.data)
+
+
+class OrderArchiver:
+    """
+    Thread that keeps moving cold orders into the archive.
+
+    **Parameters**
+
+    * `after_days`: Age in days after which completed orders are archived
+    * `interval`: Seconds between archival rounds
+    * `batch_size`: Orders archived per transaction; a round archives batches until caught up
+    * `chunk_size`: Orders per compressed chunk
+    """
+
+    def __init__(self, after_days: float = 90.0, interval: float = 3600.0, batch_size: int = 10_000,
+                 chunk_size: int = 1_000):
+        self.after_days = after_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.archived = 0
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, bind: Engine) -> None:
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="order-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.archive(self._bind)
+            except Exception:
+                logger.exception("Order archival failed")
+
+    def archive(self, bind: Engine, now: Optional[datetime] = None) -> int:
+        """
+        Archive batches until no cold order is left or the archiver is stopped.
+
+        Returns:
+            Number of orders archived
+        """
+        before = (now or datetime.utcnow()) - timedelta(days=self.after_days)
+        total = 0
+        while not self._stop.is_set():
+            with bind.begin() as conn:
+                archived = archive_batch(conn, before=before, batch_size=self.batch_size, chunk_size=self.chunk_size)
+            total += archived
+            if archived < self.batch_size:
+                break
+        self.archived += total
+        return total
+
+
+order_archiver = OrderArchiver(
+    after_days=settings.ORDER_ARCHIVE_AFTER_DAYS,
+    interval=settings.ORDER_ARCHIVE_SECONDS,
+    batch_size=settings.ORDER_ARCHIVE_BATCH,
+    chunk_size=settings.ORDER_ARCHIVE_CHUNK,
+)
@@ -0,0 +1,206 @@
+"""
+"Frequently bought together" recommendations from a product co-occurrence matrix.
+
+Order.products is the only record of baskets, so the matrix is built by
+reading every order, archived chunks first and then the order table in ID
+order and in batches, and counting for each pair of products the orders
+containing both. The matrix is sparse: a row holds the
+neighbours of one product, and only products that were ordered have one.
+
+Memory is bounded by pruning. A row that grows past twice `top_k`
+neighbours is cut back to its `top_k` most frequent ones, so a popular
+product costs at most 2 * `top_k` entries however many baskets it is in.
+Counts of a neighbour that was pruned and came back restart from zero;
+the top of a row, which is all that is served, is rarely affected.
+
+RecommendationEngine keeps a worker's matrix current: orders placed
+through this worker are counted as they are placed, and a background
+thread rebuilds the matrix every `rebuild_interval` seconds, picking up
+orders placed through other workers.
+"""
+import heapq
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.models.order import Order
+from app.db.order_archive import iter_archived
+
+logger = logging.getLogger(__name__)
+
+# Products of a basket that are paired; larger baskets are rare and cost
+# quadratic time while telling little about any one pair
+MAX_BASKET = 50
+
+
+def basket(lines: Iterable[Dict]) -> List[int]:
+    """Distinct product IDs of an order's lines, in order."""
+    return list(dict.fromkeys(line["product_id"] for line in lines))[:MAX_BASKET]
+
+
+class CoOccurrenceMatrix:
+    """
+    Sparse product x product matrix of the number of orders containing both.
+
+    **Parameters**
+
+    * `top_k`: Neighbours kept per product after pruning
+    """
+
+    def __init__(self, top_k: int = 20):
+        self.top_k = top_k
+        self.rows: Dict[int, Dict[int, int]] = {}
+        self.orders = 0
+
+    def add(self, product_ids: List[int]) -> None:
+        """Count one order of distinct products."""
+        self.orders += 1
+        if len(product_ids) < 2:
+            return
+        limit = 2 * self.top_k
+        rows = self.rows
+        for product_id in product_ids:
+            row = rows.get(product_id)
+            if row is None:
+                row = rows[product_id] = {}
+            for other in product_ids:
+                if other != product_id:
+                    row[other] = row.get(other, 0) + 1
+            if len(row) > limit:
+                rows[product_id] = dict(heapq.nlargest(self.top_k, row.items(), key=lambda item: item[1]))
+
+    def related(self, product_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Up to `limit` (product ID, orders containing both), most frequent first."""
+        row = self.rows.get(product_id)
+        if not row:
+            return []
+        return heapq.nlargest(limit, row.items(), key=lambda item: (item[1], -item[0]))
+
+    def entries(self) -> int:
+        return sum(len(row) for row in self.rows.values())
+
+
+class RecommendationEngine:
+    """
+    Keeps a worker's co-occurrence matrix current and answers related product queries.
+
+    **Parameters**
+
+    * `top_k`: Neighbours kept per product
+    * `rebuild_interval`: Seconds between rebuilds from the order table
+    * `batch_size`: Orders read per query while building
+    """
+
+    def __init__(self, top_k: int = 20, rebuild_interval: float = 3600.0, batch_size: int = 10_000):
+        self.top_k = top_k
+        self.rebuild_interval = rebuild_interval
+        self.batch_size = batch_size
+        self.builds = 0
+        self._matrix: Optional[CoOccurrenceMatrix] = None
+        # Orders placed while a build runs, replayed into it unless it read them
+        self._placed_during_build: Optional[List[Tuple[int, List[int]]]] = None
+        self._lock = threading.Lock()
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._matrix is not None
+
+    def start(self, bind: Engine) -> None:
+        """Build the first matrix in the background and keep rebuilding it."""
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="recommendations", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._matrix = None
+        self._bind = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rebuild(self._bind)
+            except Exception:
+                logger.exception("Recommendation matrix build failed")
+            self._stop.wait(self.rebuild_interval)
+
+    def rebuild(self, bind: Engine) -> CoOccurrenceMatrix:
+        """Build a matrix from every order, in batches, and serve it."""
+        matrix = CoOccurrenceMatrix(self.top_k)
+        with self._lock:
+            self._placed_during_build = []
+        last_id = 0
+        try:
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+            with session_factory() as db:
+                for _, products, *_ in iter_archived(db):
+                    matrix.add(basket(products))
+                db.commit()
+                while True:
+                    rows = db.execute(
+                        select(Order.id, Order.products).where(Order.id > last_id)
+                        .order_by(Order.id).limit(self.batch_size)
+                    ).all()
+                    for row in rows:
+                        matrix.add(basket(row.products))
+                    if rows:
+                        last_id = rows[-1].id
+                    if len(rows) < self.batch_size:
+                        break
+                    # End the read transaction between batches so writers are not held up
+                    db.commit()
+        except BaseException:
+            with self._lock:
+                self._placed_during_build = None
+            raise
+        with self._lock:
+            for order_id, product_ids in self._placed_during_build:
+                if order_id > last_id:
+                    matrix.add(product_ids)
+            self._placed_during_build = None
+            self._matrix = matrix
+            self.builds += 1
+        return matrix
+
+    def record_order(self, order_id: int, lines: Iterable[Dict]) -> None:
+        """Count an order placed through this worker."""
+        if self._thread is None and self._matrix is None:
+            return
+        product_ids = basket(lines)
+        with self._lock:
+            if self._matrix is not None:
+                self._matrix.add(product_ids)
+            if self._placed_during_build is not None:
+                self._placed_during_build.append((order_id, product_ids))
+
+    def related(self, product_id: int, limit: int = 10) -> Optional[List[Tuple[int, int]]]:
+        """
+        Products most often ordered with a product.
+
+        Returns:
+            Up to `limit` (product ID, orders containing both), or None until the first matrix is built
+        """
+        with self._lock:
+            if self._matrix is None:
+                return None
+            return self._matrix.related(product_id, limit)
+
+
+recommendations = RecommendationEngine(
+    top_k=settings.RECOMMENDATIONS_TOP_K,
+    rebuild_interval=settings.RECOMMENDATIONS_REBUILD_SECONDS,
+    batch_size=settings.RECOMMENDATIONS_BATCH_SIZE,
+)
@@ -1,19 +1,127 @@
-from sqlalchemy import create_engine
+from typing import Optional
+
+from fastapi import Request, Response
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 
+from app.core.admission import check_deadline
 from app.core.config import settings
+from app.db.slow_query import SlowQueryLog
+
+# Cookie set on responses to writes, sending the client's reads to the write
+# engine while it lasts (DB_READ_YOUR_WRITES_SECONDS)
+STICKY_COOKIE = "db-sticky"
+
+
+def _query_only(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only = ON")
+    cursor.close()
+
+
+def create_read_engine(bind: Engine, url: Optional[str] = None, **kwargs) -> Engine:
+    """
+    Create an engine for read-only sessions alongside a write engine.
+
+    Args:
+        bind: Write engine
+        url: Database to read from, e.g. a replica; the write engine's database when None
+        **kwargs: Passed to create_engine, e.g. pool sizes
+
+    Returns:
+        An engine whose SQLite connections refuse writes, or `bind` itself
+        for an in-memory database, which another connection would not see
+    """
+    if url is None:
+        if bind.dialect.name == "sqlite" and bind.url.database in (None, "", ":memory:"):
+            return bind
+        url = bind.url
+    read_engine = create_engine(url, **kwargs)
+    if read_engine.dialect.name == "sqlite":
+        event.listen(read_engine, "connect", _query_only)
+    return read_engine
+
 
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI, 
-    connect_args={"check_same_thread": False}
+    connect_args={"check_same_thread": False},
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
 )
+read_engine = engine
+if settings.DB_READ_ENGINE_ENABLED:
+    read_engine = create_read_engine(
+        engine,
+        settings.READ_DATABASE_URL or None,
+        connect_args={"check_same_thread": False},
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+    )
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_THRESHOLD_MS,
+    sample_rate=settings.SLOW_QUERY_SAMPLE_RATE,
+    maxlen=settings.SLOW_QUERY_LOG_SIZE,
+)
+if settings.SLOW_QUERY_LOG_ENABLED:
+    slow_query_log.install(engine)
+    if read_engine is not engine:
+        slow_query_log.install(read_engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 
-def get_db():
-    """Database dependency to be used in FastAPI endpoints."""
+def warm_pool(bind=engine) -> int:
+    """
+    Open the connection pool up to its target size.
+    
+    Returns:
+        Number of connections opened
+    """
+    size = bind.pool.size() if hasattr(bind.pool, "size") else 1
+    connections = [bind.connect() for _ in range(size)]
+    for connection in connections:
+        connection.close()
+    return len(connections)
+
+
+def get_db(response: Response):
+    """
+    Database dependency to be used in FastAPI endpoints that write.
+
+    With DB_READ_YOUR_WRITES_SECONDS, a commit sets the sticky cookie on the
+    response. FastAPI only copies it to the response the endpoint returns, so
+    errors raised by the endpoint, before or after a commit, carry no cookie.
+    """
+    # Requests can wait in the threadpool after admission; skip them if the client gave up
+    check_deadline()
     db = SessionLocal()
+    if settings.DB_READ_YOUR_WRITES_SECONDS > 0:
+        def set_sticky_cookie(session) -> None:
+            response.set_cookie(
+                STICKY_COOKIE, "1", max_age=max(int(settings.DB_READ_YOUR_WRITES_SECONDS), 1), httponly=True
+            )
+
+        event.listen(db, "after_commit", set_sticky_cookie, once=True)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    """
+    Database dependency for endpoints that only read.
+
+    Sessions use the read engine, unless the client wrote within the last
+    DB_READ_YOUR_WRITES_SECONDS, in which case they use the write engine so
+    the client sees its writes even from a lagging replica.
+    """
+    check_deadline()
+    sticky = settings.DB_READ_YOUR_WRITES_SECONDS > 0 and STICKY_COOKIE in request.cookies
+    db = (SessionLocal if sticky else ReadSessionLocal)()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
@@ -0,0 +1,148 @@
+import logging
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.request_context import current_route
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+@dataclass
+class SlowQuery:
+    """A statement that took longer than the configured threshold."""
+    statement: str
+    parameters: Any
+    duration_ms: float
+    route: Optional[str]
+    plan: Optional[List[str]] = None
+    recorded_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def _loggable(parameters: Any) -> Any:
+    """Make DBAPI parameters safe to log and serialize."""
+    def convert(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return repr(value)
+
+    if isinstance(parameters, dict):
+        return {key: convert(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [convert(value) for value in parameters]
+    return convert(parameters)
+
+
+class SlowQueryLog:
+    """
+    Times every statement executed on an engine and keeps the slow ones.
+
+    Timing a statement is two `perf_counter` calls. The expensive part,
+    running `EXPLAIN QUERY PLAN` and recording the entry, only happens for
+    statements over the threshold, and only for a `sample_rate` fraction of
+    them, so a burst of slow queries cannot turn the logger into a hot path.
+
+    **Parameters**
+
+    * `threshold_ms`: Statements slower than this are recorded
+    * `sample_rate`: Fraction of slow statements to record (0.0 - 1.0)
+    * `maxlen`: Number of entries kept in the ring buffer
+    """
+
+    def __init__(self, threshold_ms: float, sample_rate: float = 1.0, maxlen: int = 100):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self._entries: deque = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def install(self, engine: Engine) -> None:
+        """Start timing statements executed on `engine`."""
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self, engine: Engine) -> None:
+        """Stop timing statements executed on `engine`."""
+        event.remove(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def entries(self, limit: Optional[int] = None) -> List[SlowQuery]:
+        """
+        Get recorded slow queries, newest first.
+
+        Args:
+            limit: Maximum number of entries to return
+
+        Returns:
+            List of slow queries
+        """
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit is not None else entries
+
+    def clear(self) -> None:
+        """Drop all recorded entries."""
+        with self._lock:
+            self._entries.clear()
+
+    # The start time lives on the statement's execution context rather than the
+    # connection: after_cursor_execute does not run for a statement that raises,
+    # and the context goes away with it instead of leaving a stale start behind
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._slow_query_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_slow_query_start", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            return
+
+        plan = None
+        if not executemany and conn.dialect.name == "sqlite":
+            plan = self._explain(cursor, statement, parameters)
+
+        entry = SlowQuery(
+            statement=statement,
+            parameters=_loggable(parameters),
+            duration_ms=round(duration_ms, 3),
+            route=current_route(),
+            plan=plan,
+        )
+        with self._lock:
+            self._entries.append(entry)
+        logger.warning(
+            "Slow query (%.1f ms) on %s: %s %r plan=%s",
+            entry.duration_ms, entry.route, statement, entry.parameters, plan,
+        )
+
+    @staticmethod
+    def _explain(cursor, statement: str, parameters: Any) -> Optional[List[str]]:
+        """Run EXPLAIN QUERY PLAN on the raw DBAPI connection, bypassing the engine events."""
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+        try:
+            rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        except sqlite3.Error:
+            return None
+        # Rows are (id, parent, notused, detail); indent children under their parent
+        depth: Dict[int, int] = {0: 0}
+        plan = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, 0) + 1
+            plan.append("  " * (depth[node_id] - 1) + detail)
+        return plan
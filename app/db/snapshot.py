@@ -0,0 +1,388 @@
+"""
+Memory-mapped, read-only snapshot of the product catalog.
+
+Examples:
+
+    python -m app.db.snapshot --output ./catalog.snapshot
+
+The snapshot is a single little-endian file, every section 8-byte aligned:
+
+    header        magic "CATSNAP2", catalog version (u64), row count n (u64)
+    id            i64[n], ascending, so it doubles as the id index
+    price         f64[n]
+    stock         i64[n]
+    version       i64[n], the products' row versions
+    offsets       u64[n + 1] for each of name, sku, category, description
+    null flags    u8[n], 1 where description is NULL
+    heaps         UTF-8 bytes of name, sku, category and description
+
+Row i of a string column is heap[offsets[i]:offsets[i + 1]]. Workers map
+the file read-only, so its pages are shared between processes through the
+OS page cache, and serve reads without database queries. A new snapshot is
+written next to the old one and swapped in with os.replace(); workers notice
+the new inode and remap.
+
+The catalog version is the highest productchange id. Changes made after the
+snapshot was built are read back as a set of dirty product ids, which are
+served from the database until the next rebuild. A snapshot older than the
+change log's retention watermark is not used and is rebuilt at once.
+"""
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.db.change_log import retention_watermark
+from app.db.models.product import Product
+from app.schemas.product import Product as ProductSchema
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"CATSNAP2"
+_HEADER = struct.Struct("<8sQQ")
+STRING_COLUMNS = ("name", "sku", "category", "description")
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def catalog_version(conn: Connection) -> int:
+    """Highest productchange id; changes with every write to the product table."""
+    return conn.execute(text("SELECT coalesce(max(id), 0) FROM productchange")).scalar()
+
+
+def build_snapshot(bind: Engine, path: str) -> int:
+    """
+    Serialize the product table into a snapshot file and swap it into place.
+
+    The version is read before the rows, so a write racing with the build
+    can only make the snapshot newer than its version, never older.
+
+    Args:
+        bind: Engine to read the catalog from
+        path: Destination of the snapshot
+
+    Returns:
+        Catalog version of the snapshot
+    """
+    ids, prices, stock, versions = array("q"), array("d"), array("q"), array("q")
+    offsets = {column: array("Q", [0]) for column in STRING_COLUMNS}
+    heaps = {column: bytearray() for column in STRING_COLUMNS}
+    nulls = bytearray()
+
+    with bind.connect() as conn:
+        version = catalog_version(conn)
+        rows = conn.execution_options(yield_per=10_000).execute(
+            select(Product.id, Product.price, Product.stock, Product.version,
+                   *(getattr(Product, c) for c in STRING_COLUMNS))
+            .order_by(Product.id)
+        )
+        for row in rows:
+            ids.append(row.id)
+            prices.append(row.price)
+            stock.append(row.stock)
+            versions.append(row.version)
+            nulls.append(row.description is None)
+            for column in STRING_COLUMNS:
+                heaps[column] += (getattr(row, column) or "").encode()
+                offsets[column].append(len(heaps[column]))
+
+    count = len(ids)
+    sections = [ids.tobytes(), prices.tobytes(), stock.tobytes(), versions.tobytes()]
+    sections += [offsets[column].tobytes() for column in STRING_COLUMNS]
+    sections.append(bytes(nulls))
+    sections += [bytes(heaps[column]) for column in STRING_COLUMNS]
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, version, count))
+        for section in sections:
+            f.write(section)
+            f.write(b"\0" * (_padded(len(section)) - len(section)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+
+def read_version(path: str) -> Optional[int]:
+    """Catalog version stored in a snapshot file, or None if there is none."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, _ = _HEADER.unpack(f.read(_HEADER.size))
+    except (FileNotFoundError, struct.error):
+        return None
+    return version if magic == MAGIC else None
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a mapped snapshot file.
+
+    **Parameters**
+
+    * `path`: Snapshot file written by build_snapshot
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, self.version, self.count = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+
+        position = _HEADER.size
+
+        def take(size: int) -> memoryview:
+            nonlocal position
+            section = view[position:position + size]
+            position += _padded(size)
+            return section
+
+        count = self.count
+        self.ids = take(8 * count).cast("q")
+        self.prices = take(8 * count).cast("d")
+        self.stock = take(8 * count).cast("q")
+        self.versions = take(8 * count).cast("q")
+        self.offsets = {column: take(8 * (count + 1)).cast("Q") for column in STRING_COLUMNS}
+        self.nulls = take(count)
+        self.heaps = {column: take(self.offsets[column][count]) for column in STRING_COLUMNS}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def index(self, product_id: int) -> Optional[int]:
+        """Row number of a product id, or None if it is not in the snapshot."""
+        i = bisect_left(self.ids, product_id)
+        if i < self.count and self.ids[i] == product_id:
+            return i
+        return None
+
+    def _string(self, column: str, i: int) -> str:
+        offsets = self.offsets[column]
+        return str(self.heaps[column][offsets[i]:offsets[i + 1]], "utf-8")
+
+    def row(self, i: int) -> ProductSchema:
+        """Materialize row i; values come from the database, so validation is skipped."""
+        return ProductSchema.model_construct(
+            id=self.ids[i],
+            name=self._string("name", i),
+            sku=self._string("sku", i),
+            category=self._string("category", i),
+            description=None if self.nulls[i] else self._string("description", i),
+            price=self.prices[i],
+            stock=self.stock[i],
+            version=self.versions[i],
+        )
+
+    def get(self, product_id: int) -> Optional[ProductSchema]:
+        i = self.index(product_id)
+        return None if i is None else self.row(i)
+
+    def page(self, skip: int, limit: int) -> List[ProductSchema]:
+        """Rows in id order, like an offset/limit query on the product table."""
+        return [self.row(i) for i in range(min(skip, self.count), min(skip + limit, self.count))]
+
+
+class CatalogSnapshotManager:
+    """
+    Keeps a worker's mapped snapshot current and decides which reads it can serve.
+
+    A background thread polls every `poll_interval` seconds. It rebuilds the
+    snapshot when the catalog version moved and the file is older than
+    `rebuild_interval` (one worker at a time, under a file lock), remaps the
+    file when another worker swapped it, and reloads the set of products
+    changed since the mapped version. Reads of changed products, and listings
+    while products were inserted or deleted, return None so the caller falls
+    back to the database.
+
+    **Parameters**
+
+    * `path`: Snapshot file shared by the workers
+    * `poll_interval`: Seconds between polls
+    * `rebuild_interval`: Minimum age of the snapshot before it is rebuilt
+    * `max_changes`: Above this many pending changes the snapshot is not used at all
+    """
+
+    def __init__(self, path: str, poll_interval: float = 1.0, rebuild_interval: float = 30.0,
+                 max_changes: int = 10_000):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.rebuild_interval = rebuild_interval
+        self.max_changes = max_changes
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._dirty: frozenset = frozenset()
+        self._structural = False
+        self._overflow = False
+        # Writes made by this worker since the last poll, with the time they were marked
+        self._local: Dict[int, float] = {}
+        self._local_structural_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        return self._snapshot
+
+    def start(self, bind: Engine) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(bind,), name="catalog-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, bind: Engine) -> None:
+        while True:
+            try:
+                self.refresh(bind)
+            except Exception:
+                logger.exception("Catalog snapshot refresh failed")
+            if self._stop.wait(self.poll_interval):
+                return
+
+    def refresh(self, bind: Engine) -> None:
+        """Rebuild if due, remap if swapped, and reload the changes since the mapped version."""
+        started = time.monotonic()
+        self._rebuild_if_due(bind)
+        self._remap_if_swapped()
+        snapshot = self._snapshot
+        if snapshot is None:
+            return
+        with bind.connect() as conn:
+            changes = conn.execute(
+                text("SELECT product_id, op FROM productchange WHERE id > :version ORDER BY id LIMIT :limit"),
+                {"version": snapshot.version, "limit": self.max_changes + 1},
+            ).all()
+            # Changes since the snapshot may have been pruned
+            pruned = snapshot.version < retention_watermark(conn)
+        with self._lock:
+            self._dirty = frozenset(change.product_id for change in changes)
+            self._structural = any(change.op != "update" for change in changes)
+            self._overflow = len(changes) > self.max_changes or pruned
+            # Local marks older than this poll are now covered by the change log
+            self._local = {product_id: at for product_id, at in self._local.items() if at >= started}
+            if self._local_structural_at is not None and self._local_structural_at < started:
+                self._local_structural_at = None
+
+    def _rebuild_if_due(self, bind: Engine) -> None:
+        with bind.connect() as conn:
+            version = catalog_version(conn)
+            watermark = retention_watermark(conn)
+        if not self._rebuild_due(version, watermark):
+            return
+        if fcntl is None:
+            build_snapshot(bind, self.path)
+            return
+        with open(f"{self.path}.lock", "w") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # Another worker is rebuilding
+            try:
+                # The snapshot may have been rebuilt while we waited for the lock
+                if self._rebuild_due(version, watermark):
+                    started = time.perf_counter()
+                    built = build_snapshot(bind, self.path)
+                    logger.info("Built catalog snapshot version %s in %.0fms", built,
+                                (time.perf_counter() - started) * 1000)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _rebuild_due(self, version: int, watermark: int = 0) -> bool:
+        file_version = read_version(self.path)
+        if file_version is None or file_version < watermark:
+            return True
+        if file_version >= version:
+            return False
+        return time.time() - os.stat(self.path).st_mtime >= self.rebuild_interval
+
+    def _remap_if_swapped(self) -> None:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        current = self._snapshot
+        if current is not None and current.identity == (stat.st_ino, stat.st_mtime_ns):
+            return
+        snapshot = CatalogSnapshot(self.path)
+        # The old mapping is released once no request uses it any more. The
+        # dirty set still refers to the older version, a superset of what is
+        # stale now, until refresh() reloads it.
+        with self._lock:
+            self._snapshot = snapshot
+
+    def mark_dirty(self, product_id: int, structural: bool = False) -> None:
+        """Record a write made by this worker so it is not served stale before the next poll."""
+        now = time.monotonic()
+        with self._lock:
+            self._local[product_id] = now
+            if structural:
+                self._local_structural_at = now
+
+    def get(self, product_id: int) -> Optional[ProductSchema]:
+        """Product from the snapshot, or None if it has to be read from the database."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._overflow or product_id in self._dirty or product_id in self._local:
+                return None
+        return snapshot.get(product_id)
+
+    def page(self, skip: int, limit: int) -> Optional[List[ProductSchema]]:
+        """A page of products from the snapshot, or None if it has to be read from the database."""
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or self._overflow or self._structural or self._local_structural_at is not None:
+                return None
+        products = snapshot.page(skip, limit)
+        with self._lock:
+            if any(product.id in self._dirty or product.id in self._local for product in products):
+                return None
+        return products
+
+
+catalog_snapshot = CatalogSnapshotManager(
+    settings.CATALOG_SNAPSHOT_PATH,
+    poll_interval=settings.CATALOG_SNAPSHOT_POLL_SECONDS,
+    rebuild_interval=settings.CATALOG_SNAPSHOT_REBUILD_SECONDS,
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.CATALOG_SNAPSHOT_PATH)
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    version = build_snapshot(create_engine(args.database_url), args.output)
+    print(f"Wrote catalog snapshot version {version} to {args.output} in {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Stock events for writes made by other workers.
+
+A CRUD write publishes its stock events to the streams of its own worker
+only. Every write to the product table also reaches every worker through
+the invalidation bus, whichever worker or tool made it, so StockEventFeed
+re-reads the stock and category of the products the bus reports and
+publishes them. The writing worker hears about its own write again; the
+broker drops that stock event, since it repeats the stock already sent.
+
+A catalog-wide invalidation does not say what changed, so every stream is
+dropped and its client reloads.
+"""
+from typing import FrozenSet, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from app.core.events import Event, event_broker, stock_event
+from app.db.invalidation import invalidation_bus
+from app.db.models.product import Product
+
+
+class StockEventFeed:
+    """
+    Publishes the stock of products changed anywhere; an invalidation bus handler.
+
+    **Parameters**
+
+    * `chunk_size`: Maximum number of IDs per lookup query
+    """
+
+    def __init__(self, chunk_size: int = 500):
+        self.chunk_size = chunk_size
+        self._bind: Optional[Engine] = None
+
+    def start(self, bind: Engine) -> None:
+        self._bind = bind
+
+    def stop(self) -> None:
+        self._bind = None
+
+    def refresh(self, product_ids: Optional[FrozenSet[int]]) -> None:
+        """Publish the current stock of changed products; deleted ones are skipped."""
+        bind = self._bind
+        if bind is None or not event_broker.has_subscribers:
+            return
+        if product_ids is None:
+            event_broker.drop_all("catalog changed")
+            return
+        ids = sorted(product_ids)
+        events: List[Event] = []
+        with bind.connect() as conn:
+            for start in range(0, len(ids), self.chunk_size):
+                events.extend(
+                    stock_event(row.id, row.stock, row.category)
+                    for row in conn.execute(
+                        select(Product.id, Product.stock, Product.category)
+                        .where(Product.id.in_(ids[start:start + self.chunk_size]))
+                    )
+                )
+        event_broker.publish(events)
+
+
+stock_event_feed = StockEventFeed()
+invalidation_bus.subscribe(stock_event_feed.refresh)
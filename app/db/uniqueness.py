@@ -0,0 +1,215 @@
+"""
+In-memory filter of existing product names and SKUs, to skip uniqueness queries on create.
+
+Product creation checks that the name and SKU are unused before inserting.
+During catalog onboarding nearly every check misses, so the two queries
+are mostly wasted. ProductKeyFilter answers "definitely unused" without a
+query for almost all new keys; a key it reports as possibly used is checked
+with the exact query as before.
+
+The filter only needs to be right when it says "definitely unused" most of
+the time, not always: the unique constraints on the product table reject a
+duplicate that slips past it, and CRUDProduct.create reports that as the
+same 400 error. So products written by other workers, or during a rebuild,
+need not be added; they only cost a rejected insert instead of a query.
+
+The filter is a counting Bloom filter, so deleted and renamed products can
+be taken out of it. It is rebuilt from the database once the keys added
+since the last build exceed its capacity, which would raise its false
+positive rate.
+"""
+import hashlib
+import logging
+import math
+import threading
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+class CountingBloomFilter:
+    """
+    Bloom filter with a saturating 8-bit counter per slot, supporting removal.
+
+    **Parameters**
+
+    * `capacity`: Number of keys the filter is sized for
+    * `error_rate`: False positive rate at `capacity` keys
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.capacity = capacity
+        self.counters = bytearray(self.size)
+
+    def _slots(self, key: str) -> Iterable[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        # Double hashing: k slots from two independent 64-bit hashes
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, key: str) -> None:
+        counters = self.counters
+        for slot in self._slots(key):
+            if counters[slot] < 255:
+                counters[slot] += 1
+
+    def remove(self, key: str) -> None:
+        """Remove a key that was added; a saturated counter is left as it is."""
+        counters = self.counters
+        for slot in self._slots(key):
+            if 0 < counters[slot] < 255:
+                counters[slot] -= 1
+
+    def __contains__(self, key: str) -> bool:
+        counters = self.counters
+        return all(counters[slot] for slot in self._slots(key))
+
+
+class ProductKeyFilter:
+    """
+    Keeps a worker's filter of product names and SKUs current.
+
+    **Parameters**
+
+    * `capacity`: Minimum number of keys the filter is sized for; it is
+      sized for twice the catalog's keys when that is larger
+    * `error_rate`: False positive rate at capacity
+    """
+
+    def __init__(self, capacity: int = 100_000, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.builds = 0
+        self.checks = 0
+        self.probable_hits = 0
+        self.false_positives = 0
+        self._filter: Optional[CountingBloomFilter] = None
+        self._added = 0
+        self._lock = threading.Lock()
+        self._bind: Optional[Engine] = None
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def start(self, bind: Engine) -> None:
+        """Build the filter in the background, and rebuild it when it fills up."""
+        self._bind = bind
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="product-key-filter", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._filter = None
+        self._bind = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.rebuild(self._bind)
+            except Exception:
+                logger.exception("Product key filter build failed")
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+    def rebuild(self, bind: Engine) -> CountingBloomFilter:
+        """Build a filter of every product's name and SKU and serve it."""
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+        with session_factory() as db:
+            products = db.execute(select(Product.name, Product.sku)).all()
+        bloom = CountingBloomFilter(max(self.capacity, 4 * len(products)), self.error_rate)
+        for name, sku in products:
+            bloom.add(_name_key(name))
+            bloom.add(_sku_key(sku))
+        with self._lock:
+            self._filter = bloom
+            self._added = 2 * len(products)
+            self.builds += 1
+        return bloom
+
+    def might_exist(self, *, name: str, sku: str) -> bool:
+        """
+        Whether a product may already use the name or SKU.
+
+        False means neither is in use as far as this worker knows, so the
+        exact checks can be skipped; True until the filter is built.
+        """
+        bloom = self._filter
+        if bloom is None:
+            return True
+        hit = _name_key(name) in bloom or _sku_key(sku) in bloom
+        with self._lock:
+            self.checks += 1
+            self.probable_hits += hit
+        return hit
+
+    def record_false_positive(self) -> None:
+        """Count a probable hit that the exact checks found unused."""
+        with self._lock:
+            self.false_positives += 1
+
+    def add(self, *, name: str, sku: str) -> None:
+        """Record a created product, or the new keys of a renamed one."""
+        with self._lock:
+            bloom = self._filter
+            if bloom is None:
+                return
+            bloom.add(_name_key(name))
+            bloom.add(_sku_key(sku))
+            self._added += 2
+            if self._added > bloom.capacity and self._thread is not None:
+                self._wakeup.set()
+
+    def remove(self, *, name: str, sku: str) -> None:
+        """Record a deleted product, or the old keys of a renamed one."""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.remove(_name_key(name))
+                self._filter.remove(_sku_key(sku))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            negatives = self.checks - self.probable_hits + self.false_positives
+            return {
+                "checks": self.checks,
+                "probable_hits": self.probable_hits,
+                "false_positives": self.false_positives,
+                # Share of unused keys the filter sent to the exact checks anyway
+                "false_positive_rate": self.false_positives / negatives if negatives else 0.0,
+                "bytes": self._filter.size if self._filter is not None else 0,
+            }
+
+
+def _name_key(name: str) -> str:
+    return "n:" + name
+
+
+def _sku_key(sku: str) -> str:
+    return "s:" + sku
+
+
+product_key_filter = ProductKeyFilter(
+    capacity=settings.PRODUCT_KEY_FILTER_CAPACITY,
+    error_rate=settings.PRODUCT_KEY_FILTER_ERROR_RATE,
+)
@@ -0,0 +1,133 @@
+"""
+Startup warm-up of the caches a freshly started worker serves from.
+
+A new worker starts with cold SQLAlchemy compiled-statement caches, a cold
+product cache and, after a deploy, database pages that are not in the OS page
+cache. `warm_up` runs the steps below in order within a time budget; a step
+that would start after the budget is spent is skipped.
+
+* `statements`: runs the read queries issued by CRUDProduct and CRUDOrder
+  once, on the write and the read engine, so their compiled forms are
+  cached. Writes are not primed: warm-up never writes, so it takes no write
+  lock, fires no trigger, uses up no ID and runs on a query_only engine.
+* `indexes`: scans the product indexes so their pages are read into the OS
+  page cache.
+* `products`: loads the most ordered products into the product cache.
+"""
+import logging
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.readiness import Readiness
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.models.product import Product
+
+logger = logging.getLogger(__name__)
+
+
+def prime_statements(bind: Engine) -> None:
+    """Execute every CRUD read query once."""
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    with session_factory() as db:
+        product_crud.get(db, id=0)
+        product_crud.get_by_name(db, name="")
+        product_crud.get_by_sku(db, sku="")
+        product_crud.get_multi(db, skip=0, limit=1)
+        order_crud.get(db, id=0)
+
+
+def touch_indexes(bind: Engine, deadline: float) -> List[str]:
+    """
+    Scan the product indexes end to end.
+
+    SQLite keeps a small page cache per connection, so the lasting effect is
+    on the OS page cache shared by every connection and worker.
+
+    Returns:
+        Names of the indexes scanned
+    """
+    if bind.dialect.name != "sqlite":
+        return []
+    preparer = bind.dialect.identifier_preparer
+    table = Product.__table__
+    touched = []
+    with bind.connect() as conn:
+        for index in inspect(conn).get_indexes(table.name):
+            if time.monotonic() >= deadline:
+                break
+            conn.exec_driver_sql(
+                f"SELECT count(*) FROM {preparer.format_table(table)} INDEXED BY {preparer.quote(index['name'])}"
+            ).scalar()
+            touched.append(index["name"])
+    return touched
+
+
+def preload_products(bind: Engine, top_n: int) -> int:
+    """
+    Load the most ordered products into the product cache.
+
+    Returns:
+        Number of products cached
+    """
+    if top_n <= 0:
+        return 0
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+    with session_factory() as db:
+        ids = order_crud.get_popular_product_ids(db, limit=top_n)
+        return product_crud.preload(db, ids=ids)
+
+
+def warm_up(
+    bind: Engine,
+    readiness: Readiness,
+    *,
+    budget_seconds: float,
+    top_products: int,
+    read_bind: Optional[Engine] = None,
+) -> Dict[str, str]:
+    """
+    Run the warm-up steps within a time budget.
+
+    Args:
+        bind: Engine to warm up
+        readiness: Readiness tracker the completed steps are recorded on
+        budget_seconds: Time after which no further step is started
+        top_products: Number of popular products loaded into the product cache
+        read_bind: Read engine whose statements are primed too, if separate from `bind`
+
+    Returns:
+        Outcome of each step: "done", "skipped" or "failed"
+    """
+    deadline = time.monotonic() + budget_seconds
+
+    def statements() -> None:
+        prime_statements(bind)
+        if read_bind is not None and read_bind is not bind:
+            prime_statements(read_bind)
+
+    steps: Dict[str, Callable[[], object]] = {
+        "statements": statements,
+        "indexes": lambda: touch_indexes(bind, deadline),
+        "products": lambda: preload_products(bind, top_products),
+    }
+    outcome = {}
+    for name, run in steps.items():
+        if time.monotonic() >= deadline:
+            outcome[name] = "skipped"
+            continue
+        try:
+            with readiness.step(name):
+                run()
+        except Exception:
+            # A cold cache is slower, not broken; never keep a worker out of rotation over it
+            logger.exception("Warm-up step %s failed", name)
+            outcome[name] = "failed"
+        else:
+            outcome[name] = "done"
+    logger.info("Warm-up finished: %s", outcome)
+    return outcome
@@ -1,9 +1,32 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
-from app.api.routes import products, orders
-from app.db.init_db import create_tables
+from app.api.routes import admin, events, products, orders
+from app.core.admission import AdmissionLimiter, AdmissionMiddleware
+from app.core.config import settings
+from app.core.events import event_broker
+from app.core.pricing import pricing_engine
+from app.core.profiling import ProfileSpool, ProfilingMiddleware
+from app.core.readiness import readiness
+from app.core.request_context import RequestContextMiddleware
+from app.db.autocomplete import autocomplete_index
+from app.db.change_log import change_log_pruner
+from app.db.init_db import ensure_schema
+from app.db.inventory import inventory_compactor
+from app.db.invalidation import invalidation_bus
+from app.db.order_archive import order_archiver
+from app.db.session import engine, read_engine, warm_pool
+from app.db.recommendations import recommendations
+from app.db.snapshot import catalog_snapshot
+from app.db.stock_events import stock_event_feed
+from app.db.uniqueness import product_key_filter
+from app.db.warmup import warm_up
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title="E-Commerce API",
@@ -19,6 +42,42 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.PROFILING_ENABLED:
+    app.add_middleware(
+        ProfilingMiddleware,
+        spool=ProfileSpool(settings.PROFILING_SPOOL_DIR, settings.PROFILING_SPOOL_MAX_FILES),
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        mode=settings.PROFILING_MODE,
+        interval=settings.PROFILING_SAMPLE_INTERVAL_MS / 1000,
+    )
+if settings.ADMISSION_ENABLED:
+    if read_engine is engine:
+        pools_exceeded = (settings.ADMISSION_READ_LIMIT + settings.ADMISSION_WRITE_LIMIT
+                          > settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    else:
+        pools_exceeded = (settings.ADMISSION_READ_LIMIT > settings.DB_READ_POOL_SIZE + settings.DB_READ_MAX_OVERFLOW
+                          or settings.ADMISSION_WRITE_LIMIT > settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    if pools_exceeded:
+        logger.warning("Admission limits exceed the connection pools; requests may stall waiting for connections")
+    app.add_middleware(
+        AdmissionMiddleware,
+        read=AdmissionLimiter(
+            "read",
+            limit=settings.ADMISSION_READ_LIMIT,
+            max_queue=settings.ADMISSION_READ_QUEUE,
+            max_wait=settings.ADMISSION_READ_MAX_WAIT_MS / 1000,
+        ),
+        write=AdmissionLimiter(
+            "write",
+            limit=settings.ADMISSION_WRITE_LIMIT,
+            max_queue=settings.ADMISSION_WRITE_QUEUE,
+            max_wait=settings.ADMISSION_WRITE_MAX_WAIT_MS / 1000,
+        ),
+        default_timeout=settings.ADMISSION_DEFAULT_TIMEOUT_SECONDS,
+        exempt_paths=("/", "/ready", events.STREAM_PATH),
+        read_paths=(products.LOOKUP_PATH, orders.QUOTE_PATH),
+    )
+app.add_middleware(RequestContextMiddleware)
 
 # Exception handlers
 @app.exception_handler(Exception)
@@ -31,11 +90,80 @@ async def global_exception_handler(request, exc):
 # Include routers
 app.include_router(products.router, prefix="/products", tags=["products"])
 app.include_router(orders.router, prefix="/orders", tags=["orders"])
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(events.router, prefix="/events", tags=["events"])
 
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    readiness.reset()
+    event_broker.start(asyncio.get_running_loop())
+    with readiness.step("schema"):
+        ensure_schema()
+    with readiness.step("pool"):
+        warm_pool()
+        if read_engine is not engine:
+            warm_pool(read_engine)
+    if settings.PRICING_RULES_PATH:
+        # Orders are not taken with missing promotions: a bad rule file stops startup
+        with readiness.step("pricing"):
+            pricing_engine.load_file(settings.PRICING_RULES_PATH)
+    if settings.INVALIDATION_BUS_ENABLED:
+        stock_event_feed.start(engine)
+        invalidation_bus.start(engine)
+    if settings.CATALOG_SNAPSHOT_ENABLED:
+        catalog_snapshot.start(engine)
+    if settings.PRODUCT_CHANGE_PRUNE_ENABLED:
+        change_log_pruner.start(engine)
+    if settings.INVENTORY_COMPACTION_ENABLED:
+        inventory_compactor.start(engine)
+    if settings.ORDER_ARCHIVE_ENABLED:
+        order_archiver.start(engine)
+    if settings.AUTOCOMPLETE_ENABLED:
+        autocomplete_index.start(engine)
+    if settings.PRODUCT_KEY_FILTER_ENABLED:
+        product_key_filter.start(engine)
+    if settings.RECOMMENDATIONS_ENABLED:
+        recommendations.start(engine)
+    if not settings.WARMUP_ENABLED:
+        readiness.mark_ready()
+        return
+    # Warm up in the background so liveness answers while /ready reports 503
+    asyncio.get_running_loop().run_in_executor(None, warm_up_and_mark_ready)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    event_broker.stop()
+    invalidation_bus.stop()
+    stock_event_feed.stop()
+    catalog_snapshot.stop()
+    change_log_pruner.stop()
+    inventory_compactor.stop()
+    order_archiver.stop()
+    autocomplete_index.stop()
+    product_key_filter.stop()
+    recommendations.stop()
+
+def warm_up_and_mark_ready():
+    try:
+        warm_up(
+            engine,
+            readiness,
+            budget_seconds=settings.WARMUP_BUDGET_SECONDS,
+            top_products=settings.WARMUP_TOP_PRODUCTS,
+            read_bind=read_engine,
+        )
+    finally:
+        readiness.mark_ready()
 
 @app.get("/", tags=["health"])
 async def health_check():
-    return {"status": "healthy", "message": "E-Commerce API is running"} 
\ No newline at end of file
+    return {"status": "healthy", "message": "E-Commerce API is running"}
+
+@app.get("/ready", tags=["health"])
+async def readiness_check():
+    if not readiness.ready:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "starting", "steps": readiness.steps},
+        )
+    return {"status": "ready", "steps": readiness.steps}
@@ -0,0 +1,27 @@
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class SlowQuery(BaseModel):
+    """A statement recorded by the slow-query log."""
+    statement: str
+    parameters: Any
+    duration_ms: float
+    route: Optional[str]
+    plan: Optional[List[str]]
+    recorded_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+
+class SingleFlightKey(BaseModel):
+    """Counters of coalesced calls for one key."""
+    key: str
+    calls: int
+    executions: int
+    shared: int
+    errors: int
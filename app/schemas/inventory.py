@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class InventoryMovementCreate(BaseModel):
+    product_id: int
+    delta: int
+    reason: str
+    order_id: Optional[int] = None
+
+
+class InventoryMovement(InventoryMovementCreate):
+    id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class StockLevel(BaseModel):
+    product_id: int
+    stock: int
+    at: datetime
@@ -60,6 +60,26 @@ class OrderResponseWithDetails(BaseModel):
     message: str = "Order placed successfully"
 
 
+class QuoteLine(BaseModel):
+    product_id: int
+    quantity: int
+    unit_price: float
+    # unit_price * quantity, then the promotion's discount, and what remains
+    subtotal: float
+    discount: float
+    total: float
+    promotion: Optional[str] = None
+    in_stock: bool
+
+
+class OrderQuote(BaseModel):
+    """Price of a cart as placing it now would charge, line by line."""
+    lines: List[QuoteLine]
+    subtotal: float
+    discount: float
+    total_price: float
+
+
 class OrderResponse(BaseModel):
     """Response model for order creation."""
     id: int
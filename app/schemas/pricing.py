@@ -0,0 +1,46 @@
+from typing import Annotated, List, Literal, Optional, Union
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class PromotionBase(BaseModel):
+    """Promotion applying to the products of a `category`, or to the listed `product_ids`."""
+    name: str = Field(..., min_length=1, max_length=100)
+    category: Optional[str] = None
+    product_ids: List[int] = []
+
+    @model_validator(mode='after')
+    def one_target(self):
+        if (self.category is None) == (not self.product_ids):
+            raise ValueError('Exactly one of category and product_ids is required')
+        return self
+
+
+class PercentOff(PromotionBase):
+    type: Literal["percent_off"]
+    percent: float = Field(..., gt=0, le=100)
+
+
+class BuyXGetY(PromotionBase):
+    """Of every `buy` + `get` units of a line, `get` are free."""
+    type: Literal["buy_x_get_y"]
+    buy: int = Field(..., gt=0)
+    get: int = Field(..., gt=0)
+
+
+class QuantityTier(BaseModel):
+    min_quantity: int = Field(..., gt=1)
+    percent: float = Field(..., gt=0, le=100)
+
+
+class TieredDiscount(PromotionBase):
+    """Percentage off a line by its quantity: the largest of the tiers its quantity reaches."""
+    type: Literal["tiered"]
+    tiers: List[QuantityTier] = Field(..., min_length=1)
+
+
+Promotion = Annotated[Union[PercentOff, BuyXGetY, TieredDiscount], Field(discriminator="type")]
+
+
+class PromotionSet(BaseModel):
+    promotions: List[Promotion] = []
@@ -1,7 +1,7 @@
-from typing import Optional
+from typing import List, Literal, Optional
 import re
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, model_validator, validator
 
 
 class ProductBase(BaseModel):
@@ -40,12 +40,166 @@ class ProductCreate(ProductBase):
     pass
 
 
+class ProductUpdate(ProductBase):
+    """
+    Changed fields of a product; fields left out keep their value.
+
+    Stock is not updated here but through PATCH /products/stock, which
+    records the change in the inventory ledger. `version`, if given, is the
+    version the change was made against, as If-Match would give it.
+    """
+    name: Optional[str] = Field(None, min_length=3, max_length=255)
+    sku: Optional[str] = Field(None, min_length=3, max_length=50)
+    category: Optional[str] = Field(None, min_length=2, max_length=100)
+    price: Optional[float] = Field(None, gt=0)
+    stock: Optional[int] = Field(None, exclude=True)
+    version: Optional[int] = Field(None, ge=1, exclude=True)
+
+    @model_validator(mode='before')
+    @classmethod
+    def required_fields_not_null(cls, data):
+        if isinstance(data, dict):
+            nulls = [field for field in ('name', 'sku', 'category', 'price') if field in data and data[field] is None]
+            if nulls:
+                raise ValueError(f"{', '.join(nulls)} cannot be null")
+            if 'stock' in data:
+                raise ValueError('Stock is changed through PATCH /products/stock')
+        return data
+
+    @model_validator(mode='after')
+    def some_field_changed(self):
+        if not self.model_fields_set - {'version'}:
+            raise ValueError('At least one field to update is required')
+        return self
+
+
 class ProductInDB(ProductBase):
     id: int
+    version: int
     
     class Config:
         from_attributes = True
 
 
 class Product(ProductInDB):
-    pass 
\ No newline at end of file
+    pass 
+
+
+class StockAdjustment(BaseModel):
+    """Stock change for one product, given by `id` or `sku`, as a `delta` or an absolute `stock`."""
+    id: Optional[int] = Field(None, gt=0)
+    sku: Optional[str] = Field(None, min_length=3, max_length=50)
+    delta: Optional[int] = None
+    stock: Optional[int] = Field(None, ge=0)
+    
+    @validator('sku')
+    def sku_must_be_upper(cls, v):
+        return v.upper() if v is not None else v
+    
+    @model_validator(mode='after')
+    def one_key_and_one_change(self):
+        if (self.id is None) == (self.sku is None):
+            raise ValueError('Exactly one of id and sku is required')
+        if (self.delta is None) == (self.stock is None):
+            raise ValueError('Exactly one of delta and stock is required')
+        return self
+
+
+class StockAdjustmentBatch(BaseModel):
+    adjustments: List[StockAdjustment] = Field(..., min_length=1, max_length=100_000)
+    # clamp: stock that would go negative is set to 0; reject: the adjustment is skipped
+    policy: Literal["clamp", "reject"] = "clamp"
+
+
+class StockAdjustmentResult(BaseModel):
+    index: int
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    status: Literal["updated", "clamped", "rejected", "not_found"]
+    stock: Optional[int] = None
+
+
+class StockAdjustmentReport(BaseModel):
+    applied: int
+    rejected: int
+    not_found: int
+    results: List[StockAdjustmentResult]
+
+
+class ProductChangeEntry(BaseModel):
+    """Latest change of one product; `product` is None for a deleted product (tombstone)."""
+    id: int
+    version: int
+    deleted: bool
+    product: Optional[Product] = None
+
+
+class ProductLookup(BaseModel):
+    """Products to look up by `ids` and by `skus`, up to 1000 keys in all."""
+    ids: List[int] = []
+    skus: List[str] = []
+    
+    @validator('skus')
+    def skus_must_be_upper(cls, v):
+        return [sku.upper() for sku in v]
+    
+    @model_validator(mode='after')
+    def between_one_and_1000_keys(self):
+        keys = len(self.ids) + len(self.skus)
+        if keys == 0:
+            raise ValueError('At least one id or sku is required')
+        if keys > 1000:
+            raise ValueError('At most 1000 ids and skus can be looked up at once')
+        return self
+
+
+class ProductLookupEntry(BaseModel):
+    """Outcome of one key; `product` is None when no product matches it."""
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    found: bool
+    product: Optional[Product] = None
+
+
+class ProductLookupResult(BaseModel):
+    # Entries of `ids`, then of `skus`, in request order
+    results: List[ProductLookupEntry]
+    not_found: int
+
+
+class ProductSuggestion(BaseModel):
+    id: int
+    name: str
+    sku: str
+
+
+class RelatedProduct(BaseModel):
+    product: Product
+    # Orders containing both this product and the one asked about
+    orders: int
+
+
+class CategoryFacet(BaseModel):
+    category: str
+    products: int
+    in_stock: int
+
+
+class PriceBucket(BaseModel):
+    min_price: float
+    # None for the open-ended top bucket
+    max_price: Optional[float] = None
+    products: int
+    in_stock: int
+
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_histogram: List[PriceBucket]
+
+
+class ProductChangePage(BaseModel):
+    changes: List[ProductChangeEntry]
+    # Pass as `since` to get the next page; once has_more is false, to poll for later changes
+    next_since: int
+    has_more: bool
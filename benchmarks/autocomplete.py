@@ -0,0 +1,124 @@
+"""
+Autocomplete benchmark: memory and latency of the prefix index on a large catalog.
+
+Examples:
+
+    python -m benchmarks.autocomplete
+    python -m benchmarks.autocomplete --products 100000 --orders 50000
+
+Generates a catalog and order history, builds the autocomplete index from
+it and reports build time, memory (the index's arrays, and resident memory
+growth of the process), and the latency of searches replaying keystrokes:
+every prefix of 1 to --max-prefix characters of sampled product names and
+SKUs. The same keystrokes are timed against the LIKE query used before
+the index is built, on a sample.
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.product import product as product_crud
+from app.db.autocomplete import AutocompleteIndex
+from app.db.base import Base
+from app.db.generate_data import generate
+from benchmarks.common import percentile, write_results
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def keystrokes(names: List[str], max_prefix: int) -> List[str]:
+    return [name[:length] for name in names for length in range(1, min(len(name), max_prefix) + 1)]
+
+
+def time_searches(search, prefixes: List[str]) -> Dict[str, float]:
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        search(prefix)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "searches": len(timings),
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "max_ms": round(timings[-1], 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--samples", type=int, default=2_000, help="Names and SKUs whose prefixes are typed")
+    parser.add_argument("--max-prefix", type=int, default=8)
+    parser.add_argument("--like-samples", type=int, default=20, help="Names typed against the LIKE query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/autocomplete-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"products": args.products}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'autocomplete.db')}")
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=args.orders, seed=args.seed)
+        rng = random.Random(args.seed)
+        with engine.connect() as conn:
+            ids = rng.sample(range(1, args.products + 1), args.samples)
+            rows = conn.execute(
+                text(f"SELECT name, sku FROM product WHERE id IN ({','.join(map(str, ids))})")
+            ).all()
+        typed = [row.name if i % 2 else row.sku for i, row in enumerate(rows)]
+
+        gc.collect()
+        rss_before = rss_mb()
+        index = AutocompleteIndex()
+        started = time.perf_counter()
+        prefix_index = index.rebuild(engine)
+        build_s = time.perf_counter() - started
+        gc.collect()
+        rss_growth = rss_mb() - rss_before
+        results["build_s"] = round(build_s, 2)
+        results["index_mb"] = round(prefix_index.nbytes() / 2**20, 1)
+        results["rss_growth_mb"] = round(rss_growth, 1)
+        results["bytes_per_product"] = round(prefix_index.nbytes() / args.products, 1)
+        print(f"built index of {args.products:,} products in {build_s:.1f}s: arrays {results['index_mb']} MB "
+              f"({results['bytes_per_product']} bytes/product), RSS +{rss_growth:.0f} MB")
+
+        results["index"] = time_searches(
+            lambda prefix: index.search(prefix, args.limit), keystrokes(typed, args.max_prefix)
+        )
+        settings.AUTOCOMPLETE_ENABLED = False
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with session_factory() as db:
+            results["like"] = time_searches(
+                lambda prefix: product_crud.autocomplete(db, prefix=prefix, limit=args.limit),
+                keystrokes(typed[:args.like_samples], args.max_prefix),
+            )
+        for path in ("index", "like"):
+            result = results[path]
+            print(f"{path:6} {result['searches']:>6} searches p50={result['p50_ms']:.3f}ms "
+                  f"p99={result['p99_ms']:.3f}ms max={result['max_ms']:.3f}ms")
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'autocomplete', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
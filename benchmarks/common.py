@@ -0,0 +1,38 @@
+import json
+import os
+from datetime import datetime
+from typing import Any, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def write_results(results: Any, name: str, output: Optional[str] = None) -> str:
+    """
+    Write benchmark results as JSON.
+
+    Args:
+        results: JSON-serializable results
+        name: Benchmark name, used for the default file name
+        output: Explicit output path
+
+    Returns:
+        Path the results were written to
+    """
+    output = output or os.path.join(RESULTS_DIR, f"{name}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    return output
+
+
+def load_results(path: str) -> Any:
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,253 @@
+"""
+Micro-benchmarks for the CRUD layer.
+
+Examples:
+
+    python -m benchmarks.crud
+    python -m benchmarks.crud --sizes 1000,100000 --backends file --iterations 500
+    python -m benchmarks.crud --compare benchmarks/results/crud-baseline.json --threshold 0.2
+
+Each operation runs against file-backed and in-memory SQLite databases
+seeded by the synthetic data generator at several table sizes. For every
+operation the benchmark records the time per call, the number of SQL
+statements per call and the peak Python memory allocated per call.
+--compare exits non-zero when an operation got slower than the baseline by
+more than --threshold or issues more statements.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.cache import product_cache
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.schemas.order import OrderCreate, OrderProductItem
+from app.schemas.product import ProductCreate
+from benchmarks.common import load_results, percentile, write_results
+
+Operation = Callable[[Session, random.Random, int], Any]
+
+
+class QueryCounter:
+    """Counts statements executed on an engine."""
+
+    def __init__(self, engine: Engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+@contextmanager
+def bench_engine(backend: str, size: int, seed: int) -> Iterator[Engine]:
+    """Engine on a fresh database seeded with `size` products and as many orders."""
+    with tempfile.TemporaryDirectory() as tmp:
+        if backend == "memory":
+            engine = create_engine(
+                "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+            )
+        else:
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp, 'crud.db')}", connect_args={"check_same_thread": False}
+            )
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=size, orders=size, seed=seed)
+        with engine.begin() as conn:
+            # Products used by order placement never run out of stock
+            conn.execute(text("UPDATE product SET stock = 1000000000 WHERE id <= 100"))
+        try:
+            yield engine
+        finally:
+            engine.dispose()
+
+
+def operations(engine: Engine, size: int) -> Dict[str, Operation]:
+    """Benchmarked operations; each call gets a fresh session, an RNG and the iteration number."""
+    with engine.connect() as conn:
+        skus = conn.execute(text("SELECT sku FROM product ORDER BY id")).scalars().all()
+        version = conn.execute(text("SELECT coalesce(max(id), 0) FROM productchange")).scalar()
+
+    def create(db, rng, i):
+        return product_crud.create(db, obj_in=ProductCreate(
+            name=f"Micro Bench Product {size} {i}",
+            sku=f"MICRO-{size}-{i}",
+            category="Electronics",
+            description="Product created by the CRUD micro-benchmark",
+            price=9.99,
+            stock=10,
+        ))
+
+    def place_order(db, rng, i):
+        try:
+            return order_crud.create_with_stock_validation(db, obj_in=OrderCreate(products=[
+                OrderProductItem(product_id=product_id, quantity=1)
+                for product_id in rng.sample(range(1, min(size, 100) + 1), 3)
+            ]))
+        except HTTPException:
+            return None
+
+    def get_many(db, rng, i):
+        # Measure the query, not the product cache warmed by earlier iterations
+        product_cache.clear()
+        return product_crud.get_many_cached(db, ids=rng.sample(range(1, size + 1), min(50, size)))
+
+    ops: Dict[str, Operation] = {
+        "product.create": create,
+        "product.get": lambda db, rng, i: product_crud.get(db, id=rng.randint(1, size)),
+        "product.get_by_sku": lambda db, rng, i: product_crud.get_by_sku(db, sku=rng.choice(skus)),
+        "product.update_stock": lambda db, rng, i: product_crud.update_stock(
+            db, product_id=rng.randint(1, size), quantity_change=1
+        ),
+        # A price edit read then written through the ORM, and as one conditional UPDATE ... RETURNING
+        "product.update": lambda db, rng, i: product_crud.update(
+            db, db_obj=product_crud.get(db, id=rng.randint(1, size)), obj_in={"price": rng.randint(100, 9999) / 100}
+        ),
+        "product.patch": lambda db, rng, i: product_crud.patch(
+            db, id=rng.randint(1, size), obj_in={"price": rng.randint(100, 9999) / 100}
+        ),
+        # Incremental sync of the last 100 changes made before the run
+        "product.get_changes": lambda db, rng, i: product_crud.get_changes(db, since=max(version - 100, 0)),
+        # A cart page of 50 products, one query per product and one chunked IN query
+        "product.get@50": lambda db, rng, i: [
+            product_crud.get(db, id=id) for id in rng.sample(range(1, size + 1), min(50, size))
+        ],
+        "product.get_many_cached@50": get_many,
+        "product.get_facets": lambda db, rng, i: product_crud.get_facets(db),
+        # What facets cost without the facet table
+        "product.facets_group_by": lambda db, rng, i: db.execute(text(
+            "SELECT category, count(*), sum(stock > 0), min(price), max(price) FROM product GROUP BY category"
+        )).all(),
+        "order.create_with_stock_validation": place_order,
+        "order.get_order_with_product_details": lambda db, rng, i: order_crud.get_order_with_product_details(
+            db, order_id=rng.randint(1, size)
+        ),
+    }
+    for offset in sorted({0, size // 2, max(size - 100, 0)}):
+        ops[f"base.get_multi@{offset}"] = (
+            lambda db, rng, i, offset=offset: product_crud.get_multi(db, skip=offset, limit=100)
+        )
+    return ops
+
+
+def measure(engine: Engine, name: str, operation: Operation, iterations: int, seed: int) -> Dict[str, Any]:
+    """Time, count statements and trace allocations of one operation."""
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)
+
+    timings: List[float] = []
+    rng = random.Random(f"{seed}:{name}")
+    for i in range(iterations):
+        with session_factory() as db:
+            started = time.perf_counter()
+            operation(db, rng, i)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    queries = counter.count / iterations
+
+    # Allocation pass, separate so tracing does not distort the timings
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations, iterations + min(iterations, 50)):
+            with session_factory() as db:
+                tracemalloc.reset_peak()
+                baseline, _ = tracemalloc.get_traced_memory()
+                operation(db, rng, i)
+                peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+        event.remove(engine, "before_cursor_execute", counter._count)
+
+    timings.sort()
+    return {
+        "mean_us": round(sum(timings) / len(timings), 1),
+        "p50_us": round(percentile(timings, 50), 1),
+        "p95_us": round(percentile(timings, 95), 1),
+        "queries": round(queries, 2),
+        "alloc_peak_kb": round(sum(peaks) / len(peaks) / 1024, 1),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], threshold: float) -> List[str]:
+    """
+    Compare results against a baseline run.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        threshold: Allowed relative slowdown, e.g. 0.2 for 20%
+
+    Returns:
+        Human-readable regressions; empty if none
+    """
+    def key(entry) -> Tuple[str, int, str]:
+        return entry["backend"], entry["size"], entry["operation"]
+
+    regressions = []
+    baseline_by_key = {key(entry): entry for entry in baseline}
+    for result in results:
+        base = baseline_by_key.get(key(result))
+        if base is None:
+            continue
+        label = "{} size={} {}".format(*key(result))
+        if result["p50_us"] > base["p50_us"] * (1 + threshold):
+            regressions.append(f"{label}: p50 {result['p50_us']}us > {base['p50_us']}us")
+        if result["queries"] > base["queries"]:
+            regressions.append(f"{label}: {result['queries']} queries > {base['queries']}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated table sizes")
+    parser.add_argument("--backends", default="file,memory", help="Comma-separated: file, memory")
+    parser.add_argument("--operations", help="Comma-separated operation names (default: all)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/crud-<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    selected = set(args.operations.split(",")) if args.operations else None
+    results = []
+    for backend in args.backends.split(","):
+        for size in (int(value) for value in args.sizes.split(",")):
+            with bench_engine(backend, size, args.seed) as engine:
+                for name, operation in operations(engine, size).items():
+                    if selected and name not in selected and name.split("@")[0] not in selected:
+                        continue
+                    result = {"backend": backend, "size": size, "operation": name}
+                    result.update(measure(engine, name, operation, args.iterations, args.seed))
+                    results.append(result)
+                    print(
+                        f"{backend:6} {size:>9} {name:40} p50={result['p50_us']:>9.1f}us "
+                        f"p95={result['p95_us']:>9.1f}us queries={result['queries']:<5} "
+                        f"alloc={result['alloc_peak_kb']}KB"
+                    )
+
+    print(f"Results written to {write_results(results, 'crud', args.output)}")
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Flash-sale benchmark: order placement overload with concurrent catalog browsing.
+
+Examples:
+
+    python -m benchmarks.flash_sale
+    python -m benchmarks.flash_sale --buyers 128 --browsers 8 --duration 20 --client-timeout 2
+
+Runs the app under a local uvicorn twice, with ADMISSION_ENABLED off and on.
+--buyers clients place orders in a closed loop and give up after
+--client-timeout seconds, sending the same value as X-Request-Timeout, while
+--browsers clients read products. Reported per run: orders completed within
+the client timeout (goodput), orders shed with 503, client timeouts, and
+browsing latency.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import percentile, write_results
+from benchmarks.load import seed_catalog, uvicorn_client
+from benchmarks.workload import WorkloadGenerator
+
+
+async def run(admission: bool, args: argparse.Namespace) -> Dict[str, Any]:
+    generator = WorkloadGenerator(seed=args.seed, catalog_size=args.catalog_size, hot_products=0)
+    env = {"ADMISSION_ENABLED": str(admission).lower()}
+    with tempfile.TemporaryDirectory() as tmp:
+        async with uvicorn_client(os.path.join(tmp, "flash.db"), args.port, env) as client:
+            # Catalog stock is in the thousands, so orders fail on capacity rather than stock
+            product_ids = list(await seed_catalog(client, generator))
+            outcomes: Counter = Counter()
+            browse_latencies: List[float] = []
+            order_latencies: List[float] = []
+            stop_at = time.perf_counter() + args.duration
+            limits = httpx.Limits(max_connections=args.buyers + args.browsers)
+
+            async with httpx.AsyncClient(base_url=client.base_url, limits=limits) as http:
+                async def buyer(rng: random.Random):
+                    while time.perf_counter() < stop_at:
+                        payload = {"products": [{"product_id": rng.choice(product_ids), "quantity": 1}]}
+                        started = time.perf_counter()
+                        try:
+                            response = await http.post(
+                                "/orders/", json=payload, timeout=args.client_timeout,
+                                headers={"X-Request-Timeout": str(args.client_timeout)},
+                            )
+                        except httpx.TimeoutException:
+                            outcomes["timeout"] += 1
+                            continue
+                        outcomes[str(response.status_code)] += 1
+                        if response.status_code == 200:
+                            order_latencies.append((time.perf_counter() - started) * 1000)
+                        elif response.status_code == 503:
+                            await asyncio.sleep(min(float(response.headers.get("retry-after", 1)), 0.2))
+
+                async def browser(rng: random.Random):
+                    while time.perf_counter() < stop_at:
+                        started = time.perf_counter()
+                        try:
+                            await http.get(f"/products/{rng.choice(product_ids)}", timeout=30)
+                        except httpx.TimeoutException:
+                            outcomes["browse_timeout"] += 1
+                            continue
+                        browse_latencies.append((time.perf_counter() - started) * 1000)
+
+                await asyncio.gather(
+                    *(buyer(random.Random(f"{args.seed}:buyer:{i}")) for i in range(args.buyers)),
+                    *(browser(random.Random(f"{args.seed}:browser:{i}")) for i in range(args.browsers)),
+                )
+
+    browse_latencies.sort()
+    order_latencies.sort()
+    return {
+        "admission": admission,
+        "goodput_orders_per_s": round(outcomes["200"] / args.duration, 1),
+        "outcomes": dict(outcomes),
+        "order_p50_ms": round(percentile(order_latencies, 50), 1),
+        "order_p99_ms": round(percentile(order_latencies, 99), 1),
+        "browse_p50_ms": round(percentile(browse_latencies, 50), 1),
+        "browse_p99_ms": round(percentile(browse_latencies, 99), 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=128)
+    parser.add_argument("--browsers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--client-timeout", type=float, default=2.0)
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/flash_sale-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for admission in (False, True):
+        result = asyncio.run(run(admission, args))
+        results.append(result)
+        print(
+            f"admission {'on ' if admission else 'off'}: goodput={result['goodput_orders_per_s']} orders/s "
+            f"order p99={result['order_p99_ms']}ms browse p50={result['browse_p50_ms']}ms "
+            f"p99={result['browse_p99_ms']}ms outcomes={result['outcomes']}"
+        )
+    print(f"Results written to {write_results(results, 'flash_sale', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""
+Thundering-herd benchmark for product reads, with and without single-flight.
+
+Examples:
+
+    python -m benchmarks.herd
+    python -m benchmarks.herd --clients 500 --rounds 20 --hot-products 1
+
+Each round drops the product cache (as a write or a deploy would) and
+releases --clients threads at once, each reading one of --hot-products
+products through CRUDProduct.get_cached. The benchmark reports the database
+statements per round and the request latency, with SINGLEFLIGHT_ENABLED off
+and on.
+
+A herd forms when requests arrive while the first load is still running.
+--query-delay-ms adds latency to every statement to model a loaded database,
+and --no-cache runs with the product cache disabled, so every request misses.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import product_cache
+from app.core.config import settings
+from app.core.singleflight import product_reads
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from benchmarks.common import percentile, write_results
+from benchmarks.crud import QueryCounter
+
+
+def run(engine, singleflight: bool, args: argparse.Namespace) -> Dict[str, Any]:
+    settings.SINGLEFLIGHT_ENABLED = singleflight
+    product_reads.metrics.clear()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    counter = QueryCounter(engine)
+    latencies: List[float] = []
+    lock = threading.Lock()
+
+    def client(i, barrier):
+        with session_factory() as db:
+            barrier.wait()
+            started = time.perf_counter()
+            product_crud.get_cached(db, id=1 + i % args.hot_products)
+            elapsed = (time.perf_counter() - started) * 1000
+        with lock:
+            latencies.append(elapsed)
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        product_cache.clear()
+        barrier = threading.Barrier(args.clients)
+        threads = [threading.Thread(target=client, args=(i, barrier)) for i in range(args.clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "singleflight": singleflight,
+        "queries_per_round": round(counter.count / args.rounds, 1),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "elapsed_s": round(elapsed, 3),
+        "top_keys": product_reads.metrics.top(args.hot_products),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--hot-products", type=int, default=1)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--query-delay-ms", type=float, default=5.0)
+    parser.add_argument("--no-cache", action="store_true", help="Disable the product cache")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/herd-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'herd.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.clients,
+        )
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0)
+        if args.query_delay_ms:
+            event.listen(engine, "after_cursor_execute", lambda *_: time.sleep(args.query_delay_ms / 1000))
+        if args.no_cache:
+            product_cache.maxsize = 0
+
+        results = []
+        for singleflight in (False, True):
+            result = run(engine, singleflight, args)
+            results.append(result)
+            print(
+                f"single-flight {'on ' if singleflight else 'off'}: {result['queries_per_round']} queries/round "
+                f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms elapsed={result['elapsed_s']}s"
+            )
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'herd', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
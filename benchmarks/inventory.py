@@ -0,0 +1,167 @@
+"""
+Inventory ledger benchmark: stock writes with and without the ledger, and ledger reads.
+
+Examples:
+
+    python -m benchmarks.inventory
+    python -m benchmarks.inventory --products 100000 --changes 20000 --threads 8
+
+Writes: --threads threads apply --changes single-product stock changes, one
+transaction each, on a file-backed database, in three ways:
+
+* inplace: ORM update of Product.stock only, as update_stock did before the ledger
+* inplace+ledger: CRUDProduct.update_stock, which also appends a movement
+* ledger-only: an INSERT into the ledger alone, with no product row write
+
+Reads: stock of hot products through CRUDInventory.stock_at with the whole
+ledger uncompacted, and after the compactor folded it into snapshots,
+against reading Product.stock. Compaction throughput is reported too.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.crud.inventory import inventory
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.inventory import InventoryCompactor
+from benchmarks.common import percentile, write_results
+
+
+def run_writes(session_factory, write: Callable[[Session, int], Any], changes: int, threads: int,
+               products: int, seed: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    lock = threading.Lock()
+    per_thread = changes // threads
+
+    def worker(index):
+        rng = random.Random(f"{seed}:{index}")
+        timings = []
+        for _ in range(per_thread):
+            product_id = rng.randint(1, products)
+            started = time.perf_counter()
+            with session_factory() as db:
+                write(db, product_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        with lock:
+            latencies.extend(timings)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "changes_per_s": round(len(latencies) / elapsed),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+    }
+
+
+def inplace(db: Session, product_id: int) -> None:
+    # CRUDProduct.update_stock as it was before the ledger
+    product = product_crud.get(db, id=product_id)
+    product.stock += 1
+    db.commit()
+    db.refresh(product)
+
+
+def inplace_and_ledger(db: Session, product_id: int) -> None:
+    product_crud.update_stock(db, product_id=product_id, quantity_change=1)
+
+
+def ledger_only(db: Session, product_id: int) -> None:
+    inventory.record(db, product_id=product_id, delta=1, reason="adjustment")
+    db.commit()
+
+
+def time_reads(session_factory, read: Callable[[Session, int], Any], ids: List[int]) -> Dict[str, float]:
+    timings = []
+    with session_factory() as db:
+        for product_id in ids:
+            started = time.perf_counter()
+            read(db, product_id)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    return {"p50_us": round(percentile(timings, 50), 1), "p99_us": round(percentile(timings, 99), 1)}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--changes", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--hot-products", type=int, default=20)
+    parser.add_argument("--hot-changes", type=int, default=50_000,
+                        help="Extra movements spread over the hot products before the read test")
+    parser.add_argument("--reads", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/inventory-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"writes": [], "reads": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'inventory.db')}",
+            connect_args={"check_same_thread": False},
+            pool_size=args.threads,
+        )
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0, seed=args.seed)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        for mode, write in (("inplace", inplace), ("inplace+ledger", inplace_and_ledger), ("ledger-only", ledger_only)):
+            result = dict(mode=mode, **run_writes(
+                session_factory, write, args.changes, args.threads, args.products, args.seed
+            ))
+            results["writes"].append(result)
+            print(f"write {mode:15} {result['changes_per_s']:>7,}/s p50={result['p50_ms']:.3f}ms p99={result['p99_ms']:.3f}ms")
+
+        rng = random.Random(args.seed)
+        hot = list(range(1, args.hot_products + 1))
+        with engine.begin() as conn:
+            inventory.record_many(
+                Session(bind=conn),
+                movements=[{"product_id": rng.choice(hot), "delta": 1, "reason": "adjustment"}
+                           for _ in range(args.hot_changes)],
+            )
+        ids = [rng.choice(hot) for _ in range(args.reads)]
+        for label, read in (
+            ("product.stock", lambda db, product_id: product_crud.get(db, id=product_id).stock),
+            ("ledger uncompacted", lambda db, product_id: inventory.stock_at(db, product_id=product_id)),
+        ):
+            results["reads"].append(dict(path=label, **time_reads(session_factory, read, ids)))
+
+        with engine.connect() as conn:
+            movements = conn.execute(text("SELECT count(*) FROM inventorymovement")).scalar()
+        started = time.perf_counter()
+        InventoryCompactor().compact(engine)
+        compact_s = time.perf_counter() - started
+        results["compaction"] = {"movements": movements, "seconds": round(compact_s, 2)}
+        print(f"compaction: {movements:,} movements in {compact_s:.2f}s ({movements / compact_s:,.0f}/s)")
+
+        results["reads"].append(dict(path="ledger compacted", **time_reads(
+            session_factory, lambda db, product_id: inventory.stock_at(db, product_id=product_id), ids
+        )))
+        for result in results["reads"]:
+            print(f"read  {result['path']:18} p50={result['p50_us']:>9.1f}us p99={result['p99_us']:>9.1f}us")
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'inventory', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
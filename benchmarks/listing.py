@@ -0,0 +1,149 @@
+"""
+Product listing benchmark: filtered and sorted pages on a large catalog, with and without the listing indexes.
+
+Examples:
+
+    python -m benchmarks.listing
+    python -m benchmarks.listing --products 100000 --runs 5
+
+Generates a --products catalog in a file-backed SQLite database and, with
+the listing indexes dropped and then created, times
+CRUDProduct.get_listing for every filter and sort combination: the first
+page, and a page --depth products deep read with a cursor and with `skip`.
+The cost of --writes stock updates through CRUDProduct.update_stock is
+measured in both modes too, as the partial in-stock index is maintained on
+stock changes.
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.crud.product import LISTING_SORTS
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.models.product import Product
+from benchmarks.common import write_results
+
+LISTING_INDEXES = ("ix_product_category_price", "ix_product_category_name", "ix_product_price_id",
+                   "ix_product_in_stock_price")
+
+
+def cases() -> List[Dict[str, Any]]:
+    """Every combination of the listing filters and sorts."""
+    return [
+        {"category": category, "min_price": 10.0 if priced else None, "max_price": 50.0 if priced else None,
+         "in_stock": in_stock, "sort": sort}
+        for category, priced, in_stock, sort in itertools.product(
+            (None, "Books"), (False, True), (None, True), LISTING_SORTS
+        )
+    ]
+
+
+def label(case: Dict[str, Any]) -> str:
+    parts = [f"category={case['category']}" if case["category"] else "",
+             "price=10..50" if case["min_price"] is not None else "",
+             "in_stock" if case["in_stock"] else "", f"sort={case['sort']}"]
+    return " ".join(part for part in parts if part)
+
+
+def timed(fn: Callable[[], Any], runs: int) -> float:
+    """Median milliseconds of `runs` calls."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run_cases(db: Session, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    for case in cases():
+        first_ms = timed(lambda: product_crud.get_listing(db, limit=args.limit, **case), args.runs)
+        # Cursor of the product just before the deep page
+        _, cursor = product_crud.get_listing(db, skip=args.depth - 1, limit=1, **case)
+        cursor_ms = skip_ms = None
+        if cursor is not None:
+            cursor_ms = timed(lambda: product_crud.get_listing(db, cursor=cursor, limit=args.limit, **case), args.runs)
+            skip_ms = timed(lambda: product_crud.get_listing(db, skip=args.depth, limit=args.limit, **case), args.runs)
+        results.append({"case": label(case), "first_ms": round(first_ms, 2),
+                        "deep_cursor_ms": cursor_ms and round(cursor_ms, 2),
+                        "deep_skip_ms": skip_ms and round(skip_ms, 2)})
+    return results
+
+
+def time_writes(session_factory, products: int, writes: int, seed: int) -> float:
+    """Stock updates per second, half of them moving a product in or out of stock."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    with session_factory() as db:
+        for _ in range(writes // 2):
+            product_id = rng.randint(1, products)
+            stock = db.get(Product, product_id).stock
+            product_crud.update_stock(db, product_id=product_id, quantity_change=-stock)
+            product_crud.update_stock(db, product_id=product_id, quantity_change=stock or 1)
+    return writes / (time.perf_counter() - started)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=10_000, help="Position of the deep page")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--writes", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/listing-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'listing.db')}")
+        Base.metadata.create_all(bind=engine)
+        started = time.perf_counter()
+        generate(engine, products=args.products, orders=0, seed=args.seed)
+        print(f"generated {args.products:,} products in {time.perf_counter() - started:.0f}s")
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        indexes = [index for index in Product.__table__.indexes if index.name in LISTING_INDEXES]
+
+        for mode in ("without", "with"):
+            for index in indexes:
+                if mode == "without":
+                    index.drop(bind=engine, checkfirst=True)
+                else:
+                    index.create(bind=engine, checkfirst=True)
+            with session_factory() as db:
+                mode_results = run_cases(db, args)
+            writes_per_s = time_writes(session_factory, args.products, args.writes, args.seed)
+            results[mode] = {"cases": mode_results, "stock_updates_per_s": round(writes_per_s)}
+
+        print(f"{'case':50} {'first page (ms)':>22} {'cursor page (ms)':>22} {'skip page (ms)':>22}")
+        print(f"{'':50} {'without':>11}{'with':>11} {'without':>11}{'with':>11} {'without':>11}{'with':>11}")
+        for before, after in zip(results["without"]["cases"], results["with"]["cases"]):
+            cells = []
+            for key in ("first_ms", "deep_cursor_ms", "deep_skip_ms"):
+                cells += [before[key], after[key]]
+            print(f"{after['case']:50} " + " ".join(
+                f"{cells[i] if cells[i] is not None else '-':>10}{cells[i + 1] if cells[i + 1] is not None else '-':>11}"
+                for i in range(0, 6, 2)
+            ))
+        print(f"stock updates/s: without {results['without']['stock_updates_per_s']:,}, "
+              f"with {results['with']['stock_updates_per_s']:,}")
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'listing', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
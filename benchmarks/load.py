@@ -0,0 +1,269 @@
+"""
+Load-test benchmark for order placement under contention.
+
+Examples:
+
+    python -m benchmarks.load --scenario hot_sku_storm --requests 2000 --concurrency 32
+    python -m benchmarks.load --all --serve
+    python -m benchmarks.load --all --compare benchmarks/results/baseline.json
+
+Every scenario runs against a fresh SQLite database, either in-process through
+the ASGI app or against a local uvicorn server (--serve). Results are printed
+and written as JSON so runs can be compared for regressions.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import load_results, percentile, write_results
+from benchmarks.workload import SCENARIOS, Request, WorkloadGenerator
+
+
+@asynccontextmanager
+async def in_process_client(db_path: str) -> AsyncIterator[httpx.AsyncClient]:
+    """Client that calls the ASGI app directly, backed by a fresh database file."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app.db.base import Base
+    from app.db.session import create_read_engine, get_db, get_read_db
+    from app.main import app
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    read_engine = create_read_engine(engine, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+
+    def override(bind):
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=bind)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+        return override_get_db
+
+    app.dependency_overrides[get_db] = override(engine)
+    app.dependency_overrides[get_read_db] = override(read_engine)
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench", timeout=60) as client:
+            yield client
+    finally:
+        app.dependency_overrides = {}
+        read_engine.dispose()
+        engine.dispose()
+
+
+@asynccontextmanager
+async def uvicorn_client(db_path: str, port: int,
+                         env_overrides: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.AsyncClient]:
+    """Client for a local uvicorn server started on a fresh database file."""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", **(env_overrides or {}))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            for _ in range(100):
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not start")
+            yield client
+    finally:
+        server.terminate()
+        try:
+            # An overloaded server finishes its backlog before exiting
+            server.wait(10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+            server.wait()
+
+
+async def seed_catalog(client: httpx.AsyncClient, generator: WorkloadGenerator) -> Dict[int, int]:
+    """Create the catalog through the API; returns {product_id: initial_stock} in catalog order."""
+    initial_stock = {}
+    for payload in generator.catalog():
+        response = await client.post("/products/", json=payload)
+        response.raise_for_status()
+        initial_stock[response.json()["id"]] = payload["stock"]
+    return initial_stock
+
+
+async def fetch_stock(client: httpx.AsyncClient) -> Dict[int, int]:
+    """Read the stock of every product through the API."""
+    stock, skip = {}, 0
+    while True:
+        page = (await client.get(f"/products/?skip={skip}&limit=100")).json()
+        if not page:
+            return stock
+        stock.update({product["id"]: product["stock"] for product in page})
+        skip += len(page)
+
+
+async def drive(client: httpx.AsyncClient, requests: List[Request], concurrency: int) -> Dict[str, Any]:
+    """Issue requests from `concurrency` workers; returns latencies, statuses and units sold."""
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    sold: Dict[int, int] = defaultdict(int)
+    queue = iter(requests)
+
+    async def worker():
+        for request in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(request.method, request.path, json=request.json)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "error"
+            latencies.append((time.perf_counter() - started) * 1000)
+            statuses[str(status)] += 1
+            if request.is_order and status == 200:
+                for item in request.json["products"]:
+                    sold[item["product_id"]] += item["quantity"]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {"elapsed": time.perf_counter() - started, "latencies": latencies, "statuses": statuses, "sold": sold}
+
+
+async def run_scenario(scenario: str, args: argparse.Namespace) -> Dict[str, Any]:
+    generator = WorkloadGenerator(
+        seed=args.seed, catalog_size=args.catalog_size, hot_products=args.hot_products, hot_stock=args.hot_stock
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        client_factory = uvicorn_client(db_path, args.port) if args.serve else in_process_client(db_path)
+        async with client_factory as client:
+            initial_stock = await seed_catalog(client, generator)
+            requests = list(generator.requests(scenario, args.requests, list(initial_stock)))
+            outcome = await drive(client, requests, args.concurrency)
+            final_stock = await fetch_stock(client)
+
+    oversold = {
+        product_id: outcome["sold"][product_id] - stock
+        for product_id, stock in initial_stock.items()
+        if outcome["sold"][product_id] > stock
+    }
+    lost_updates = [
+        product_id for product_id, stock in initial_stock.items()
+        if final_stock.get(product_id) != max(stock - outcome["sold"][product_id], 0)
+    ]
+    latencies = sorted(outcome["latencies"])
+    return {
+        "scenario": scenario,
+        "mode": "uvicorn" if args.serve else "in-process",
+        "seed": args.seed,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "catalog_size": args.catalog_size,
+        "duration_s": round(outcome["elapsed"], 3),
+        "throughput_rps": round(len(latencies) / outcome["elapsed"], 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(latencies[-1], 3) if latencies else 0.0,
+        },
+        "status_counts": dict(outcome["statuses"]),
+        "oversell_count": sum(oversold.values()),
+        "oversold_products": len(oversold),
+        "lost_updates": len(lost_updates),
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Compare results against a baseline run.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        tolerance: Allowed relative regression, e.g. 0.1 for 10%
+
+    Returns:
+        Human-readable regressions; empty if none
+    """
+    regressions = []
+    baseline_by_scenario = {entry["scenario"]: entry for entry in baseline}
+    for result in results:
+        base = baseline_by_scenario.get(result["scenario"])
+        if base is None:
+            continue
+        name = result["scenario"]
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput_rps']} < {base['throughput_rps']} req/s")
+        for key in ("p50", "p95", "p99"):
+            if result["latency_ms"][key] > base["latency_ms"][key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} {result['latency_ms'][key]} > {base['latency_ms'][key]} ms"
+                )
+        if result["oversell_count"] > base["oversell_count"]:
+            regressions.append(f"{name}: oversell {result['oversell_count']} > {base['oversell_count']}")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="Scenario to run (repeatable)")
+    parser.add_argument("--all", action="store_true", help="Run every scenario")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--hot-products", type=int, default=3)
+    parser.add_argument("--hot-stock", type=int, default=50)
+    parser.add_argument("--serve", action="store_true", help="Run the app under a local uvicorn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/load-<timestamp>.json)")
+    parser.add_argument("--compare", help="Baseline result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+    if not args.all and not args.scenario:
+        parser.error("pass --scenario or --all")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = SCENARIOS if args.all else args.scenario
+    results = []
+    for scenario in scenarios:
+        result = asyncio.run(run_scenario(scenario, args))
+        results.append(result)
+        latency = result["latency_ms"]
+        print(
+            f"{scenario:18} {result['throughput_rps']:>9.1f} req/s  "
+            f"p50={latency['p50']:.1f}ms p95={latency['p95']:.1f}ms p99={latency['p99']:.1f}ms  "
+            f"oversell={result['oversell_count']} lost_updates={result['lost_updates']} "
+            f"statuses={result['status_counts']}"
+        )
+
+    print(f"Results written to {write_results(results, 'load', args.output)}")
+
+    if args.compare:
+        regressions = compare(results, load_results(args.compare), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
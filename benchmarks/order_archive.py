@@ -0,0 +1,110 @@
+"""
+Order archive benchmark: hot table size, compression and order lookup latency.
+
+Examples:
+
+    python -m benchmarks.order_archive
+    python -m benchmarks.order_archive --orders 1000000 --months 24 --after-days 90
+
+Generates --orders orders spread over --months months and archives those
+older than --after-days with the order archiver, reporting archival
+throughput, the hot table's row count and size (table and indexes) before
+and after, the archive's size and compression ratio, and the latency of
+get_order_with_product_details for sampled hot and archived orders.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.order import order as order_crud
+from app.db.base import Base
+from app.db.generate_data import DEFAULT_END, generate
+from app.db.models.order import Order
+from app.db.models.order_archive import OrderArchive
+from app.db.order_archive import OrderArchiver
+from benchmarks.common import write_results
+from benchmarks.recommendations import time_calls
+
+
+def table_mb(conn, *names: str) -> float:
+    """Pages of tables and their indexes, from SQLite's dbstat table."""
+    tables = ", ".join(f"'{name}'" for name in names)
+    size = conn.execute(text(
+        "SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name IN "
+        f"(SELECT name FROM sqlite_master WHERE name IN ({tables}) OR tbl_name IN ({tables}))"
+    )).scalar()
+    return round(size / 2 ** 20, 1)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--after-days", type=float, default=90)
+    parser.add_argument("--chunk-size", type=int, default=1_000)
+    parser.add_argument("--lookups", type=int, default=2_000, help="Orders read from each of hot and archive")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/order_archive-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"orders": args.orders, "months": args.months, "after_days": args.after_days,
+                               "chunk_size": args.chunk_size}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'order_archive.db')}")
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=args.orders, seed=args.seed, months=args.months)
+        with engine.connect() as conn:
+            results["hot_mb_before"] = table_mb(conn, "order")
+
+        archiver = OrderArchiver(after_days=args.after_days, chunk_size=args.chunk_size)
+        started = time.perf_counter()
+        archived = archiver.archive(engine, now=DEFAULT_END)
+        archive_s = time.perf_counter() - started
+        with engine.begin() as conn:
+            conn.execute(text("VACUUM"))
+        with engine.connect() as conn:
+            results["archived"] = archived
+            results["archive_s"] = round(archive_s, 1)
+            results["hot_orders"] = conn.execute(select(func.count()).select_from(Order)).scalar()
+            results["hot_mb_after"] = table_mb(conn, "order")
+            results["archive_mb"] = table_mb(conn, "orderarchive")
+            results["chunks"] = conn.execute(select(func.count()).select_from(OrderArchive)).scalar()
+            hot_ids = conn.execute(select(Order.id)).scalars().all()
+        results["compression"] = round(
+            (results["hot_mb_before"] - results["hot_mb_after"]) / max(results["archive_mb"], 0.1), 1
+        )
+        print(f"archived {archived:,} of {args.orders:,} orders in {archive_s:.1f}s into {results['chunks']:,} "
+              f"chunks: hot table {results['hot_mb_before']} MB -> {results['hot_mb_after']} MB, "
+              f"archive {results['archive_mb']} MB ({results['compression']}x smaller)")
+
+        rng = random.Random(args.seed)
+        archived_ids = sorted(set(range(1, args.orders + 1)) - set(hot_ids))
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with session_factory() as db:
+            def lookup(order_id):
+                db.expunge_all()
+                return order_crud.get_order_with_product_details(db, order_id=order_id)
+
+            for path, ids in (("hot", hot_ids), ("archived", archived_ids)):
+                if not ids:
+                    continue
+                results[path] = time_calls(lookup, [rng.choice(ids) for _ in range(args.lookups)])
+                result = results[path]
+                print(f"{path:8} lookups p50={result['p50_ms']:.4f}ms p99={result['p99_ms']:.4f}ms "
+                      f"max={result['max_ms']:.4f}ms")
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'order_archive', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
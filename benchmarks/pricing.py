@@ -0,0 +1,87 @@
+"""
+Pricing benchmark: quote latency by cart size and number of loaded promotions.
+
+Examples:
+
+    python -m benchmarks.pricing
+    python -m benchmarks.pricing --promotions 0,1000,100000 --lines 1,10,50
+
+Loads --promotions random promotions (percentage off a category or of
+products, buy-X-get-Y and quantity tiers) over a catalog of --products
+products into the pricing engine, reporting how long compiling them takes,
+then times PricingEngine.quote for carts of every --lines size. Quote
+latency should grow with the cart, not with the number of promotions.
+"""
+import argparse
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from app.core.pricing import PricingEngine
+from app.db.generate_data import CATEGORIES
+from app.schemas.pricing import PromotionSet
+from benchmarks.common import percentile, write_results
+
+
+def random_promotions(rng: random.Random, count: int, products: int) -> List[Dict[str, Any]]:
+    promotions = []
+    for i in range(count):
+        target: Dict[str, Any] = (
+            {"category": rng.choice(CATEGORIES)} if rng.random() < 0.01
+            else {"product_ids": rng.sample(range(1, products + 1), rng.randint(1, 20))}
+        )
+        kind = rng.choice(("percent_off", "buy_x_get_y", "tiered"))
+        if kind == "percent_off":
+            rule = {"percent": rng.choice((5, 10, 20))}
+        elif kind == "buy_x_get_y":
+            rule = {"buy": rng.randint(1, 3), "get": 1}
+        else:
+            rule = {"tiers": [{"min_quantity": 5, "percent": 5}, {"min_quantity": 20, "percent": 10}]}
+        promotions.append({"type": kind, "name": f"Promotion {i}", **target, **rule})
+    return promotions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--promotions", default="0,1000,100000", help="Comma-separated promotion counts")
+    parser.add_argument("--lines", default="1,10,50", help="Comma-separated cart sizes")
+    parser.add_argument("--quotes", type=int, default=2_000, help="Quotes timed per cart size")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/pricing-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    catalog = [
+        SimpleNamespace(id=i, category=rng.choice(CATEGORIES), price=round(rng.uniform(1, 500), 2), stock=100)
+        for i in range(1, args.products + 1)
+    ]
+    results = []
+    for count in (int(n) for n in args.promotions.split(",")):
+        promotions = PromotionSet.model_validate({"promotions": random_promotions(rng, count, args.products)})
+        engine = PricingEngine()
+        started = time.perf_counter()
+        engine.load(promotions.promotions)
+        load_ms = (time.perf_counter() - started) * 1000
+        for lines in (int(n) for n in args.lines.split(",")):
+            carts = [[(rng.choice(catalog), rng.randint(1, 25)) for _ in range(lines)] for _ in range(args.quotes)]
+            timings = []
+            for cart in carts:
+                started = time.perf_counter()
+                engine.quote(cart)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            result = {"promotions": count, "load_ms": round(load_ms, 1), "lines": lines,
+                      "p50_ms": round(percentile(timings, 50), 4), "p99_ms": round(percentile(timings, 99), 4)}
+            results.append(result)
+            print(f"{count:>7} promotions (compiled in {load_ms:8.1f}ms) {lines:>3} lines: "
+                  f"p50={result['p50_ms']:.4f}ms p99={result['p99_ms']:.4f}ms")
+
+    print(f"Results written to {write_results(results, 'pricing', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Read/write routing benchmark: read latency under a sustained order-write load.
+
+Examples:
+
+    python -m benchmarks.read_routing
+    python -m benchmarks.read_routing --writers 8 --readers 24 --seconds 20 --modes shared,split,split-wal
+
+For every mode, a fresh SQLite database gets a catalog of --products, then
+--writers threads place orders back to back for --seconds while --readers
+threads read products and orders, as GET /products/{id} (uncached) and
+GET /orders/{id} do. Modes:
+
+* shared: reads and writes share one engine and pool, as before the read engine
+* split: reads use the query_only read engine and its own pool
+* split-wal: as split, with the database in WAL mode, where readers and the writer do not block each other
+
+Reports read latency percentiles, reads and orders per second, and errors.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.session import create_read_engine
+from app.schemas.order import OrderCreate, OrderProductItem
+from benchmarks.common import percentile, write_results
+
+
+def run(mode: str, path: str, args: argparse.Namespace) -> Dict[str, Any]:
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False},
+        pool_size=settings.DB_POOL_SIZE, max_overflow=settings.DB_MAX_OVERFLOW,
+    )
+    Base.metadata.create_all(bind=engine)
+    generate(engine, products=args.products, orders=args.products, seed=args.seed)
+    if mode == "split-wal":
+        with engine.connect() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+    read_engine = engine if mode == "shared" else create_read_engine(
+        engine, connect_args={"check_same_thread": False},
+        pool_size=settings.DB_READ_POOL_SIZE, max_overflow=settings.DB_READ_MAX_OVERFLOW,
+    )
+    write_sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    read_sessions = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    with engine.connect() as conn:
+        max_order = conn.execute(text('SELECT max(id) FROM "order"')).scalar()
+
+    stop = threading.Event()
+    latencies: List[float] = []
+    counts = {"reads": 0, "orders": 0, "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+
+    def writer(seed: int) -> None:
+        rng = random.Random(seed)
+        while not stop.is_set():
+            order = OrderCreate(products=[
+                OrderProductItem(product_id=rng.randint(1, args.products), quantity=1)
+                for _ in range(rng.randint(1, 3))
+            ])
+            try:
+                with write_sessions() as db:
+                    order_crud.create_with_stock_validation(db, obj_in=order)
+                key = "orders"
+            except Exception:
+                key = "write_errors"
+            with lock:
+                counts[key] += 1
+
+    def reader(seed: int) -> None:
+        rng = random.Random(seed)
+        timings = []
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with read_sessions() as db:
+                    product_crud.get(db, id=rng.randint(1, args.products))
+                    order_crud.get_order_with_product_details(db, order_id=rng.randint(1, max_order))
+                timings.append((time.perf_counter() - started) * 1000)
+                key = "reads"
+            except Exception:
+                key = "read_errors"
+            with lock:
+                counts[key] += 1
+        with lock:
+            latencies.extend(timings)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(1000 + i,)) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if read_engine is not engine:
+        read_engine.dispose()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "reads_per_s": round(counts["reads"] / args.seconds, 1),
+        "orders_per_s": round(counts["orders"] / args.seconds, 1),
+        "read_errors": counts["read_errors"],
+        "write_errors": counts["write_errors"],
+        "read_p50_ms": round(percentile(latencies, 50), 2),
+        "read_p99_ms": round(percentile(latencies, 99), 2),
+        "read_p999_ms": round(percentile(latencies, 99.9), 2),
+        "read_max_ms": round(latencies[-1], 2) if latencies else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--modes", default="shared,split,split-wal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/read_routing-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for mode in args.modes.split(","):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run(mode, os.path.join(tmp, "routing.db"), args)
+        results.append(result)
+        print(f"{mode:10} reads {result['reads_per_s']:>8.1f}/s p50={result['read_p50_ms']:.2f}ms "
+              f"p99={result['read_p99_ms']:.2f}ms p99.9={result['read_p999_ms']:.2f}ms "
+              f"max={result['read_max_ms']:.2f}ms | orders {result['orders_per_s']:>6.1f}/s | errors {result['read_errors']} read, "
+              f"{result['write_errors']} write")
+
+    print(f"Results written to {write_results(results, 'read_routing', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
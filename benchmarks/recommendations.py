@@ -0,0 +1,120 @@
+"""
+Recommendations benchmark: build time, memory and latency of the co-occurrence matrix.
+
+Examples:
+
+    python -m benchmarks.recommendations
+    python -m benchmarks.recommendations --products 100000 --orders 200000 --top-k 10
+
+Generates a catalog and order history, builds the co-occurrence matrix
+from it and reports build time, memory (matrix entries, and resident
+memory growth of the process), the latency of related product queries for
+sampled ordered products, from the matrix alone and with the related
+products read through the product cache as the endpoint does, and the
+cost of counting an order as it is placed. The same queries are timed
+against the order table query used before the matrix is built, on a
+sample.
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.order import order as order_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.recommendations import recommendations
+from benchmarks.autocomplete import rss_mb
+from benchmarks.common import percentile, write_results
+
+
+def time_calls(fn, args: List[Any]) -> Dict[str, float]:
+    timings = []
+    for arg in args:
+        started = time.perf_counter()
+        fn(arg)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "calls": len(timings),
+        "p50_ms": round(percentile(timings, 50), 4),
+        "p99_ms": round(percentile(timings, 99), 4),
+        "max_ms": round(timings[-1], 4),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=10_000, help="Products whose related products are read")
+    parser.add_argument("--sql-samples", type=int, default=20, help="Products read with the order table query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/recommendations-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"products": args.products, "orders": args.orders, "top_k": args.top_k}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'recommendations.db')}")
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=args.orders, seed=args.seed)
+        rng = random.Random(args.seed)
+        with engine.connect() as conn:
+            baskets = [json.loads(row.products) for row in conn.execute(
+                text('SELECT products FROM "order" ORDER BY random() LIMIT :n'), {"n": args.samples}
+            )]
+        sampled = [rng.choice(lines)["product_id"] for lines in baskets]
+
+        gc.collect()
+        rss_before = rss_mb()
+        recommendations.top_k = args.top_k
+        started = time.perf_counter()
+        matrix = recommendations.rebuild(engine)
+        build_s = time.perf_counter() - started
+        gc.collect()
+        results["build_s"] = round(build_s, 1)
+        results["rows"] = len(matrix.rows)
+        results["entries"] = matrix.entries()
+        results["rss_growth_mb"] = round(rss_mb() - rss_before, 1)
+        print(f"built matrix of {args.orders:,} orders in {build_s:.1f}s: {results['rows']:,} products, "
+              f"{results['entries']:,} entries, RSS +{results['rss_growth_mb']:.0f} MB")
+
+        results["matrix"] = time_calls(lambda product_id: recommendations.related(product_id, args.limit), sampled)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with session_factory() as db:
+            def bought_together(product_id):
+                return order_crud.get_bought_together(db, product_id=product_id, limit=args.limit)
+
+            # With the related products in the product cache, as for repeat views
+            for product_id in sampled:
+                bought_together(product_id)
+            results["cached_products"] = time_calls(bought_together, sampled)
+        results["record_order"] = time_calls(lambda lines: recommendations.record_order(0, lines), baskets)
+        recommendations.stop()
+        with session_factory() as db:
+            results["sql"] = time_calls(
+                lambda product_id: order_crud.get_bought_together(db, product_id=product_id, limit=args.limit),
+                sampled[:args.sql_samples],
+            )
+        for path in ("matrix", "cached_products", "record_order", "sql"):
+            result = results[path]
+            print(f"{path:16} {result['calls']:>6} calls p50={result['p50_ms']:.4f}ms "
+                  f"p99={result['p99_ms']:.4f}ms max={result['max_ms']:.4f}ms")
+        engine.dispose()
+
+    print(f"Results written to {write_results(results, 'recommendations', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
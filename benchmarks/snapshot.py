@@ -0,0 +1,173 @@
+"""
+Catalog snapshot benchmark: memory per worker and read latency against the database.
+
+Examples:
+
+    python -m benchmarks.snapshot
+    python -m benchmarks.snapshot --products 1000000 --workers 4 --iterations 20000
+
+Memory: --workers processes each read every product at the same time, either
+from the shared snapshot mapping or by loading the catalog from the database
+into a dict. Each reports RSS and PSS (resident memory with shared pages
+divided between the processes that map them) from /proc/self/smaps_rollup.
+
+Latency: product by id and listing pages, through the snapshot and through
+CRUDProduct on the database.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.models.product import Product
+from app.db.snapshot import CatalogSnapshot, build_snapshot
+from app.schemas.product import Product as ProductSchema
+from benchmarks.common import percentile, write_results
+
+
+def memory_kb() -> Dict[str, int]:
+    """Rss and Pss of this process in kB (Linux only)."""
+    usage = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("Rss", "Pss"):
+                usage[key.lower() + "_kb"] = int(value.split()[0])
+    return usage
+
+
+def _worker(mode: str, db_url: str, snapshot_path: str, barrier, results) -> None:
+    if mode == "snapshot":
+        snapshot = CatalogSnapshot(snapshot_path)
+        rows = sum(1 for i in range(len(snapshot)) if snapshot.row(i).id)
+        keep: Any = snapshot
+    else:
+        engine = create_engine(db_url)
+        with sessionmaker(bind=engine)() as db:
+            keep = {p.id: ProductSchema.model_validate(p) for p in db.query(Product)}
+        rows = len(keep)
+    barrier.wait()
+    results.put(dict(memory_kb(), mode=mode, rows=rows))
+    barrier.wait()
+    del keep
+
+
+def measure_memory(mode: str, workers: int, db_url: str, snapshot_path: str) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    barrier, results = context.Barrier(workers), context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(mode, db_url, snapshot_path, barrier, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        "mode": mode,
+        "workers": workers,
+        "rss_kb_per_worker": round(sum(r["rss_kb"] for r in reports) / workers),
+        "pss_kb_per_worker": round(sum(r["pss_kb"] for r in reports) / workers),
+    }
+
+
+def time_calls(call: Callable[[int], Any], iterations: int) -> Dict[str, float]:
+    timings = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        call(i)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    return {"p50_us": round(percentile(timings, 50), 1), "p99_us": round(percentile(timings, 99), 1)}
+
+
+def measure_latency(db_url: str, snapshot_path: str, products: int, iterations: int,
+                    seed: int) -> List[Dict[str, Any]]:
+    engine = create_engine(db_url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    snapshot = CatalogSnapshot(snapshot_path)
+    rng = random.Random(seed)
+    ids = [rng.randint(1, products) for _ in range(iterations)]
+    offsets = [rng.randint(0, max(products - 100, 0)) for _ in range(iterations)]
+
+    def db_get(i):
+        with session_factory() as db:
+            return ProductSchema.model_validate(product_crud.get(db, id=ids[i]))
+
+    def db_page(i):
+        with session_factory() as db:
+            return [ProductSchema.model_validate(p) for p in product_crud.get_multi(db, skip=offsets[i], limit=100)]
+
+    results = []
+    for operation, path, call in (
+        ("get", "db", db_get),
+        ("get", "snapshot", lambda i: snapshot.get(ids[i])),
+        ("page", "db", db_page),
+        ("page", "snapshot", lambda i: snapshot.page(offsets[i], 100)),
+    ):
+        count = iterations if operation == "get" else max(iterations // 10, 1)
+        results.append(dict(operation=operation, path=path, **time_calls(call, count)))
+    engine.dispose()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--iterations", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/snapshot-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'catalog.db')}"
+        snapshot_path = os.path.join(tmp, "catalog.snapshot")
+        engine = create_engine(db_url)
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0, seed=args.seed)
+        started = time.perf_counter()
+        build_snapshot(engine, snapshot_path)
+        build_s = time.perf_counter() - started
+        engine.dispose()
+        size_kb = os.path.getsize(snapshot_path) // 1024
+        print(f"snapshot: {args.products:,} products, {size_kb:,} kB, built in {build_s:.2f}s")
+
+        latency = measure_latency(db_url, snapshot_path, args.products, args.iterations, args.seed)
+        for result in latency:
+            print(f"{result['operation']:5} {result['path']:9} p50={result['p50_us']:>9.1f}us p99={result['p99_us']:>9.1f}us")
+
+        memory = []
+        if sys.platform.startswith("linux"):
+            for mode in ("db", "snapshot"):
+                result = measure_memory(mode, args.workers, db_url, snapshot_path)
+                memory.append(result)
+                print(
+                    f"{mode:9} x{args.workers}: rss={result['rss_kb_per_worker']:,} kB "
+                    f"pss={result['pss_kb_per_worker']:,} kB per worker"
+                )
+
+    summary = {
+        "products": args.products,
+        "snapshot_kb": size_kb,
+        "build_s": round(build_s, 2),
+        "latency": latency,
+        "memory": memory,
+    }
+    print(f"Results written to {write_results(summary, 'snapshot', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Event stream benchmark: many idle Server-Sent Events streams on one worker.
+
+Examples:
+
+    python -m benchmarks.sse
+    python -m benchmarks.sse --streams 10000 --watchers 100 --writes 50
+
+Starts the app under a local uvicorn and opens --streams streams to
+/events/stream. --watchers of them filter on the product that is written;
+the rest filter on other products and stay idle. Reported: server memory
+per stream, then, for --writes stock adjustments of the watched product
+through PATCH /products/stock, the time from sending the write to every
+watcher receiving its event (fan-out latency), and the write latency itself.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import percentile, write_results
+from benchmarks.load import seed_catalog, uvicorn_client
+from benchmarks.workload import WorkloadGenerator
+
+
+def server_rss_mb(port: int) -> float:
+    """Resident memory of the uvicorn process serving the port."""
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmdline = f.read().split(b"\0")
+            if b"uvicorn" not in cmdline or str(port).encode() not in cmdline:
+                continue
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            continue
+    raise RuntimeError("uvicorn process not found")
+
+
+class Stream:
+    """One raw SSE connection; cheaper than an HTTP client per stream at this count."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, port: int, product_id: int) -> Optional["Stream"]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(
+            f"GET /events/stream?product_id={product_id} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n".encode()
+        )
+        status_line = await reader.readline()
+        await reader.readuntil(b"\r\n\r\n")
+        if b" 200 " not in status_line:
+            writer.close()
+            return None
+        return cls(reader, writer)
+
+    async def next_event(self) -> bytes:
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                raise ConnectionError("stream closed")
+            if line.startswith(b"event:"):
+                return line
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def open_streams(port: int, product_ids: List[int], concurrency: int = 200) -> List[Optional[Stream]]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(product_id):
+        async with semaphore:
+            try:
+                return await Stream.open(port, product_id)
+            except OSError:
+                return None
+
+    return await asyncio.gather(*(one(product_id) for product_id in product_ids))
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    generator = WorkloadGenerator(seed=args.seed, catalog_size=args.catalog_size, hot_products=0)
+    env = {"EVENTS_MAX_SUBSCRIBERS": str(args.streams), "ADMISSION_ENABLED": "false"}
+    with tempfile.TemporaryDirectory() as tmp:
+        async with uvicorn_client(os.path.join(tmp, "sse.db"), args.port, env) as client:
+            product_ids = list(await seed_catalog(client, generator))
+            watched, others = product_ids[0], product_ids[1:]
+            rss_before = server_rss_mb(args.port)
+
+            started = time.perf_counter()
+            targets = [watched] * args.watchers + [
+                others[i % len(others)] for i in range(args.streams - args.watchers)
+            ]
+            streams = await open_streams(args.port, targets)
+            open_s = time.perf_counter() - started
+            opened = [stream for stream in streams if stream is not None]
+            watchers = [stream for stream in streams[:args.watchers] if stream is not None]
+            await asyncio.sleep(1)
+            rss_after = server_rss_mb(args.port)
+            print(f"opened {len(opened):,}/{args.streams:,} streams in {open_s:.1f}s, "
+                  f"server RSS {rss_before:.0f} -> {rss_after:.0f} MB")
+
+            fanout_ms, write_ms = [], []
+            for _ in range(args.writes):
+                received = [asyncio.ensure_future(watcher.next_event()) for watcher in watchers]
+                sent = time.perf_counter()
+                response = await client.patch("/products/stock", json={"adjustments": [{"id": watched, "delta": 1}]})
+                response.raise_for_status()
+                write_ms.append((time.perf_counter() - sent) * 1000)
+                await asyncio.wait_for(asyncio.gather(*received), timeout=10)
+                fanout_ms.append((time.perf_counter() - sent) * 1000)
+                await asyncio.sleep(args.pause)
+            for stream in opened:
+                stream.close()
+
+    fanout_ms.sort()
+    write_ms.sort()
+    return {
+        "streams": args.streams,
+        "opened": len(opened),
+        "watchers": len(watchers),
+        "open_s": round(open_s, 2),
+        "rss_before_mb": round(rss_before, 1),
+        "rss_after_mb": round(rss_after, 1),
+        "kb_per_stream": round((rss_after - rss_before) * 1024 / max(len(opened), 1), 1),
+        "write_p50_ms": round(percentile(write_ms, 50), 2),
+        "fanout_p50_ms": round(percentile(fanout_ms, 50), 2),
+        "fanout_p99_ms": round(percentile(fanout_ms, 99), 2),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=10_000)
+    parser.add_argument("--watchers", type=int, default=100)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--pause", type=float, default=0.05, help="Seconds between writes")
+    parser.add_argument("--catalog-size", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/sse-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    # Both ends hold one descriptor per stream; the server inherits the limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, args.streams * 2 + 1000) if hard != resource.RLIM_INFINITY else args.streams * 2 + 1000
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    result = asyncio.run(run(args))
+    print(f"per stream {result['kb_per_stream']:.1f} KB, write p50 {result['write_p50_ms']:.2f}ms, "
+          f"fan-out to {result['watchers']} watchers p50 {result['fanout_p50_ms']:.2f}ms "
+          f"p99 {result['fanout_p99_ms']:.2f}ms")
+    print(f"Results written to {write_results(result, 'sse', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Time-to-first-request benchmark.
+
+Examples:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 5 --products 100000 --workers 4
+
+Starts uvicorn on a database seeded by the synthetic data generator and
+measures, for each run, the time from spawning the process until the first
+successful `GET /products/{id}` and until `GET /ready` reports ready (when the
+endpoint exists). The first run also creates the schema; later runs boot on
+an existing database, which is the common case for a deploy or autoscale.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+from app.db.base import Base
+from app.db.generate_data import generate
+from benchmarks.common import percentile, write_results
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float) -> Optional[float]:
+    """Poll `path` until it returns 200; returns the time it succeeded or None on 404/timeout."""
+    while time.perf_counter() < deadline:
+        try:
+            response = client.get(path)
+            if response.status_code == 200:
+                return time.perf_counter()
+            if response.status_code == 404 and path == "/ready":
+                return None
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    return None
+
+
+def boot_once(db_url: str, port: int, workers: int, env_overrides: Dict[str, str]) -> Dict[str, Any]:
+    env = dict(os.environ, DATABASE_URL=db_url, **env_overrides)
+    command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        command += ["--workers", str(workers)]
+    started = time.perf_counter()
+    server = subprocess.Popen(command, env=env)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            first = wait_for(client, "/products/1", started + 60)
+            ready = wait_for(client, "/ready", started + 60)
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "first_request_ms": round((first - started) * 1000, 1) if first else None,
+        "ready_ms": round((ready - started) * 1000, 1) if ready else None,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE passed to the server")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/startup-<timestamp>.json)")
+    args = parser.parse_args(argv)
+    env_overrides = dict(item.split("=", 1) for item in args.env)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        engine = create_engine(db_url)
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0)
+        engine.dispose()
+
+        runs = []
+        for run in range(args.runs):
+            result = boot_once(db_url, args.port, args.workers, env_overrides)
+            runs.append(result)
+            print(f"run {run + 1}: first request {result['first_request_ms']}ms, ready {result['ready_ms'] or '-'}ms")
+
+    first = sorted(run["first_request_ms"] for run in runs if run["first_request_ms"] is not None)
+    summary = {
+        "products": args.products,
+        "workers": args.workers,
+        "env": env_overrides,
+        "runs": runs,
+        "first_request_p50_ms": percentile(first, 50),
+    }
+    print(f"p50 time to first request: {summary['first_request_p50_ms']}ms")
+    print(f"Results written to {write_results(summary, 'startup', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
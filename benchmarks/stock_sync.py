@@ -0,0 +1,119 @@
+"""
+Bulk stock adjustment benchmark: a warehouse sync through PATCH /products/stock.
+
+Examples:
+
+    python -m benchmarks.stock_sync
+    python -m benchmarks.stock_sync --products 200000 --rows 50000 --rounds 5
+
+Each round sends --rows adjustments (half keyed by id, half by SKU, mixing
+deltas and absolute stock) to PATCH /products/stock on a file-backed
+database, and also applies them through CRUDProduct.adjust_stock directly.
+For comparison, --baseline-rows of them are applied one at a time with
+CRUDProduct.update_stock, the only primitive before the bulk endpoint.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.session import get_db
+from app.schemas.product import StockAdjustment
+from benchmarks.common import percentile, write_results
+
+
+def make_rows(rng: random.Random, skus: List[str], rows: int) -> List[Dict[str, Any]]:
+    adjustments = []
+    for i in range(rows):
+        index = rng.randrange(len(skus))
+        key = {"id": index + 1} if i % 2 else {"sku": skus[index]}
+        change = {"delta": rng.randint(-20, 20)} if rng.random() < 0.8 else {"stock": rng.randint(0, 500)}
+        adjustments.append({**key, **change})
+    return adjustments
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--baseline-rows", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/stock_sync-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    settings.WARMUP_ENABLED = False
+    settings.INVALIDATION_BUS_ENABLED = False
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(tmp, 'stock.db')}", connect_args={"check_same_thread": False}
+        )
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0, seed=args.seed)
+        with engine.connect() as conn:
+            skus = conn.execute(text("SELECT sku FROM product ORDER BY id")).scalars().all()
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = override_get_db
+        timings: Dict[str, List[float]] = {"http": [], "crud": []}
+        with TestClient(app) as client:
+            for _ in range(args.rounds):
+                payload = {"adjustments": make_rows(rng, skus, args.rows), "policy": "clamp"}
+                started = time.perf_counter()
+                response = client.patch("/products/stock", json=payload)
+                timings["http"].append((time.perf_counter() - started) * 1000)
+                assert response.status_code == 200, response.text
+
+                adjustments = [StockAdjustment(**row) for row in make_rows(rng, skus, args.rows)]
+                with session_factory() as db:
+                    started = time.perf_counter()
+                    product_crud.adjust_stock(db, adjustments=adjustments)
+                    timings["crud"].append((time.perf_counter() - started) * 1000)
+        app.dependency_overrides = {}
+
+        started = time.perf_counter()
+        with session_factory() as db:
+            for _ in range(args.baseline_rows):
+                product_crud.update_stock(db, product_id=rng.randint(1, args.products), quantity_change=-1)
+        baseline_ms_per_row = (time.perf_counter() - started) * 1000 / args.baseline_rows
+        engine.dispose()
+
+    results = []
+    for path, values in timings.items():
+        values.sort()
+        results.append({
+            "path": path,
+            "rows": args.rows,
+            "p50_ms": round(percentile(values, 50), 1),
+            "max_ms": round(values[-1], 1),
+        })
+        print(f"{path:5} {args.rows:,} rows: p50={results[-1]['p50_ms']}ms max={results[-1]['max_ms']}ms")
+    results.append({"path": "update_stock", "rows": 1, "mean_ms": round(baseline_ms_per_row, 3)})
+    print(
+        f"update_stock one at a time: {baseline_ms_per_row:.3f}ms per row, "
+        f"{baseline_ms_per_row * args.rows / 1000:.1f}s for {args.rows:,} rows"
+    )
+    print(f"Results written to {write_results(results, 'stock_sync', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
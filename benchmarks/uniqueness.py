@@ -0,0 +1,83 @@
+"""
+Product key filter benchmark: insert throughput with and without the name/SKU filter.
+
+Examples:
+
+    python -m benchmarks.uniqueness
+    python -m benchmarks.uniqueness --products 100000 --inserts 5000
+
+Generates a --products catalog in a file-backed SQLite database, then
+creates --inserts new products through CRUDProduct.create, the way catalog
+onboarding does, once with the uniqueness queries and once with the
+product key filter built from the catalog. Reports the filter's build time
+and size, inserts per second in both modes, and the false positive rate:
+the share of new products the filter sent to the exact queries anyway.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.uniqueness import product_key_filter
+from app.schemas.product import ProductCreate
+from benchmarks.common import write_results
+
+
+def time_inserts(session_factory, first: int, count: int) -> float:
+    """Products created per second, with names and SKUs not in the catalog."""
+    started = time.perf_counter()
+    with session_factory() as db:
+        for i in range(first, first + count):
+            product_crud.create(db=db, obj_in=ProductCreate(
+                name=f"Onboarded Product {i}", sku=f"ONB-{i:08d}", category="Books",
+                description="Onboarded product description", price=9.99, stock=10,
+            ))
+    return count / (time.perf_counter() - started)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--inserts", type=int, default=10_000, help="Products created in each mode")
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/uniqueness-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {"products": args.products, "inserts": args.inserts}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'uniqueness.db')}")
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=0, seed=args.seed)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        results["without_per_s"] = round(time_inserts(session_factory, 0, args.inserts))
+
+        product_key_filter.error_rate = args.error_rate
+        started = time.perf_counter()
+        bloom = product_key_filter.rebuild(engine)
+        results["build_s"] = round(time.perf_counter() - started, 2)
+        results["filter_mb"] = round(bloom.size / 2**20, 1)
+        results["with_per_s"] = round(time_inserts(session_factory, args.inserts, args.inserts))
+        results["filter"] = product_key_filter.stats()
+        engine.dispose()
+
+    print(f"filter of {args.products:,} products built in {results['build_s']}s, {results['filter_mb']} MB")
+    print(f"inserts/s: without filter {results['without_per_s']:,}, with filter {results['with_per_s']:,} "
+          f"({results['with_per_s'] / results['without_per_s']:.2f}x)")
+    print(f"false positive rate: {results['filter']['false_positive_rate']:.4f} "
+          f"({results['filter']['false_positives']} of {results['filter']['checks']} checks)")
+    print(f"Results written to {write_results(results, 'uniqueness', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+First-minute latency benchmark, with and without startup warm-up.
+
+Examples:
+
+    python -m benchmarks.warmup
+    python -m benchmarks.warmup --products 200000 --orders 1000000 --duration 60 --concurrency 16
+
+Seeds a database with the synthetic data generator, then boots uvicorn once
+with WARMUP_ENABLED=false and once with WARMUP_ENABLED=true. Before each boot
+the database file is dropped from the OS page cache (posix_fadvise), so both
+runs start as cold as a fresh deploy. Once `GET /ready` reports ready the
+benchmark drives `GET /products/{id}` and `GET /orders/{id}` for --duration
+seconds, picking products in proportion to how often they were ordered, and
+reports latency percentiles per --bucket seconds.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from app.db.base import Base
+from app.db.generate_data import generate
+from benchmarks.common import percentile, write_results
+
+
+def evict_page_cache(path: str) -> None:
+    """Drop a file's clean pages from the OS page cache where the platform allows it."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def request_mix(db_url: str, count: int, seed: int) -> List[str]:
+    """Request paths: 90% products weighted by order history, 10% orders."""
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        product_ids = [
+            item["product_id"]
+            for (products,) in conn.execute(text('SELECT products FROM "order" ORDER BY id DESC LIMIT 20000'))
+            for item in json.loads(products)
+        ] or list(conn.execute(text("SELECT id FROM product")).scalars())
+        max_order_id = conn.execute(text('SELECT coalesce(max(id), 0) FROM "order"')).scalar()
+    engine.dispose()
+
+    rng = random.Random(seed)
+    paths = []
+    for _ in range(count):
+        if max_order_id and rng.random() < 0.1:
+            paths.append(f"/orders/{rng.randint(1, max_order_id)}")
+        else:
+            paths.append(f"/products/{rng.choice(product_ids)}")
+    return paths
+
+
+async def drive(base_url: str, paths: List[str], duration: float, concurrency: int) -> List[Tuple[float, float]]:
+    """Issue requests for `duration` seconds; returns (seconds since start, latency ms) pairs."""
+    samples: List[Tuple[float, float]] = []
+    queue = iter(paths * (1 + int(duration * 20000 // max(len(paths), 1))))
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        started = time.perf_counter()
+
+        async def worker():
+            for path in queue:
+                sent = time.perf_counter()
+                if sent - started >= duration:
+                    return
+                await client.get(path)
+                samples.append((sent - started, (time.perf_counter() - sent) * 1000))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples
+
+
+def wait_until_ready(base_url: str, timeout: float = 120) -> float:
+    started = time.perf_counter()
+    with httpx.Client(base_url=base_url, timeout=5) as client:
+        while time.perf_counter() - started < timeout:
+            try:
+                if client.get("/ready").status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+    raise RuntimeError("server did not become ready")
+
+
+def run(db_path: str, warmup: bool, args: argparse.Namespace, paths: List[str]) -> Dict[str, Any]:
+    evict_page_cache(db_path)
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", WARMUP_ENABLED=str(warmup).lower())
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    try:
+        ready_s = wait_until_ready(base_url)
+        samples = asyncio.run(drive(base_url, paths, args.duration, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+    buckets = []
+    for start in range(0, int(args.duration), args.bucket):
+        latencies = sorted(latency for at, latency in samples if start <= at < start + args.bucket)
+        buckets.append({
+            "from_s": start,
+            "requests": len(latencies),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        })
+    return {"warmup": warmup, "ready_s": round(ready_s, 3), "requests": len(samples), "buckets": buckets}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--bucket", type=int, default=10, help="Seconds per latency bucket")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/warmup-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "warmup.db")
+        db_url = f"sqlite:///{db_path}"
+        engine = create_engine(db_url)
+        Base.metadata.create_all(bind=engine)
+        generate(engine, products=args.products, orders=args.orders, seed=args.seed)
+        engine.dispose()
+        paths = request_mix(db_url, 50_000, args.seed)
+
+        runs = []
+        for warmup in (False, True):
+            result = run(db_path, warmup, args, paths)
+            runs.append(result)
+            print(f"warm-up {'on' if warmup else 'off'}: ready after {result['ready_s']}s")
+            for bucket in result["buckets"]:
+                print(
+                    f"  {bucket['from_s']:>4}s {bucket['requests']:>7} req  "
+                    f"p50={bucket['p50_ms']:.2f}ms p99={bucket['p99_ms']:.2f}ms"
+                )
+
+    summary = {"products": args.products, "orders": args.orders, "concurrency": args.concurrency, "runs": runs}
+    print(f"Results written to {write_results(summary, 'warmup', args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import random
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+CATEGORIES = ["Electronics", "Home Goods", "Clothing", "Books", "Toys", "Sports", "Garden", "Beauty"]
+
+SCENARIOS = ("uniform_reads", "hot_sku_storm", "mixed_read_write", "large_orders")
+
+
+@dataclass
+class Request:
+    """A single HTTP request issued by the load generator."""
+    method: str
+    path: str
+    json: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_order(self) -> bool:
+        return self.method == "POST" and self.path.startswith("/orders")
+
+
+class WorkloadGenerator:
+    """
+    Seedable generator of catalogs and request streams.
+
+    The same seed always produces the same catalog and the same sequence of
+    requests, so two benchmark runs differ only by the code under test.
+
+    **Parameters**
+
+    * `seed`: Random seed
+    * `catalog_size`: Number of products in the catalog
+    * `hot_products`: Number of products targeted by the hot-SKU scenario
+    * `hot_stock`: Initial stock of each hot product
+    """
+
+    def __init__(self, seed: int = 0, catalog_size: int = 200, hot_products: int = 3, hot_stock: int = 50):
+        self.seed = seed
+        self.catalog_size = catalog_size
+        self.hot_products = min(hot_products, catalog_size)
+        self.hot_stock = hot_stock
+
+    def catalog(self) -> List[Dict[str, Any]]:
+        """Product payloads for POST /products; the first `hot_products` are the hot SKUs."""
+        rng = random.Random(f"{self.seed}:catalog")
+        products = []
+        for i in range(self.catalog_size):
+            hot = i < self.hot_products
+            products.append({
+                "name": f"Bench Product {i:06d}",
+                "sku": f"BENCH-{i:06d}",
+                "category": rng.choice(CATEGORIES),
+                "description": f"Benchmark product number {i} for load testing",
+                "price": round(rng.uniform(1, 500), 2),
+                "stock": self.hot_stock if hot else rng.randint(1_000, 10_000),
+            })
+        return products
+
+    def requests(self, scenario: str, count: int, product_ids: List[int]) -> Iterator[Request]:
+        """
+        Generate the request stream for a scenario.
+
+        Args:
+            scenario: One of SCENARIOS
+            count: Number of requests
+            product_ids: Database ids of the catalog, in catalog order
+
+        Returns:
+            Iterator of requests
+        """
+        if scenario not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{scenario}', expected one of {SCENARIOS}")
+        rng = random.Random(f"{self.seed}:{scenario}")
+        hot_ids = product_ids[:self.hot_products]
+        for _ in range(count):
+            if scenario == "uniform_reads":
+                yield self._read(rng, product_ids)
+            elif scenario == "hot_sku_storm":
+                yield self._order(rng, hot_ids, lines=1, max_quantity=2)
+            elif scenario == "mixed_read_write":
+                if rng.random() < 0.9:
+                    yield self._read(rng, product_ids)
+                else:
+                    yield self._order(rng, product_ids, lines=rng.randint(1, 3), max_quantity=3)
+            else:
+                yield self._order(rng, product_ids, lines=rng.randint(20, 50), max_quantity=2)
+
+    @staticmethod
+    def _read(rng: random.Random, product_ids: List[int]) -> Request:
+        if rng.random() < 0.8:
+            return Request("GET", f"/products/{rng.choice(product_ids)}")
+        skip = rng.randrange(0, max(len(product_ids) - 100, 1))
+        return Request("GET", f"/products/?skip={skip}&limit=100")
+
+    @staticmethod
+    def _order(rng: random.Random, product_ids: List[int], lines: int, max_quantity: int) -> Request:
+        chosen = rng.sample(product_ids, min(lines, len(product_ids)))
+        return Request("POST", "/orders/", {
+            "products": [
+                {"product_id": product_id, "quantity": rng.randint(1, max_quantity)}
+                for product_id in chosen
+            ]
+        })
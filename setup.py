@@ -10,6 +10,7 @@ setup(
         "sqlalchemy>=2.0.20",
         "pydantic>=2.3.0",
         "pydantic-settings>=2.0.3",
+        "alembic>=1.12.0",
         "pytest>=7.4.2",
     ],
 ) 
\ No newline at end of file
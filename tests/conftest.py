@@ -5,8 +5,10 @@ from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.core.cache import product_cache
+from app.core.config import settings
 from app.db.base import Base
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 
 
 # Use an in-memory SQLite database for testing
@@ -17,12 +19,33 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Background components started by the app; the default startup, with them
+# running, is tested against its own database in test_health_api.py
+BACKGROUND_SETTINGS = (
+    "WARMUP_ENABLED",
+    "INVALIDATION_BUS_ENABLED",
+    "PRODUCT_CHANGE_PRUNE_ENABLED",
+    "INVENTORY_COMPACTION_ENABLED",
+    "ORDER_ARCHIVE_ENABLED",
+    "AUTOCOMPLETE_ENABLED",
+    "PRODUCT_KEY_FILTER_ENABLED",
+    "RECOMMENDATIONS_ENABLED",
+)
+
+
+@pytest.fixture(autouse=True)
+def no_background_components(monkeypatch):
+    # They would use the application database, not the test database
+    for name in BACKGROUND_SETTINGS:
+        monkeypatch.setattr(settings, name, False)
+
 
 # Override the get_db dependency to use the test database
 @pytest.fixture
 def db():
     # Create the database
     Base.metadata.create_all(bind=engine)
+    product_cache.clear()
     
     # Create a connection to use for testing
     connection = engine.connect()
@@ -44,7 +67,7 @@ def db():
 
 @pytest.fixture
 def client(db):
-    # Override the get_db dependency to use the test database
+    # Override the get_db and get_read_db dependencies to use the test database
     def override_get_db():
         try:
             yield db
@@ -52,6 +75,7 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(app) as client:
         yield client
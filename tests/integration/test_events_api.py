@@ -0,0 +1,93 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.product import product as crud_product
+from app.schemas.product import StockAdjustment
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def server(tmp_path):
+    """The app with its default settings in a worker of its own, against a fresh database."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    database_url = f"sqlite:///{tmp_path / 'events.db'}"
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.endswith(("_ENABLED", "_URL", "_URI", "_PATH", "_DIR"))
+    }
+    env |= {"PYTHONPATH": ROOT, "DATABASE_URL": database_url, "INVALIDATION_POLL_SECONDS": "0.05"}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=tmp_path, env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if httpx.get(f"{base_url}/ready").status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            assert time.monotonic() < deadline and process.poll() is None, "server did not become ready"
+            time.sleep(0.05)
+        yield base_url, database_url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def next_events(lines, count):
+    """Read SSE frames until `count` events, as (event, data), have arrived."""
+    events, kind = [], None
+    while len(events) < count:
+        line = next(lines)
+        if line.startswith("event: "):
+            kind = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((kind, json.loads(line[len("data: "):])))
+    return events
+
+
+def test_stream_delivers_stock_and_order_changes_from_every_worker(server):
+    base_url, database_url = server
+    product = httpx.post(f"{base_url}/products/", json={
+        "name": "Streamed Product", "sku": "SSE-001", "category": "Books",
+        "description": "Product watched over an event stream", "price": 10.0, "stock": 10,
+    }).json()
+    # Writes made here, as by another worker, reach the server only through the change log
+    other_worker = create_engine(database_url)
+    SessionLocal = sessionmaker(bind=other_worker)
+
+    with httpx.Client(base_url=base_url, timeout=10) as client:
+        with client.stream("GET", "/events/stream", params={"category": "Books"}) as response:
+            assert response.status_code == 200
+            lines = response.iter_lines()
+
+            with SessionLocal() as db:
+                crud_product.update_stock(db, product_id=product["id"], quantity_change=-2)
+            assert next_events(lines, 1) == [("stock", {"product_id": product["id"], "stock": 8})]
+
+            with SessionLocal() as db:
+                crud_product.adjust_stock(db, adjustments=[StockAdjustment(id=product["id"], delta=5)])
+            assert next_events(lines, 1) == [("stock", {"product_id": product["id"], "stock": 13})]
+
+            placed = client.post("/orders/", json={"products": [{"product_id": product["id"], "quantity": 3}]})
+            assert placed.status_code == 200
+            assert next_events(lines, 2) == [
+                ("stock", {"product_id": product["id"], "stock": 10}),
+                ("order", {"order_id": placed.json()["id"], "status": "completed", "product_ids": [product["id"]]}),
+            ]
+    other_worker.dispose()
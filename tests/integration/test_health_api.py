@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def test_health_check(client: TestClient):
+    response = client.get("/")
+    assert response.status_code == 200
+    assert response.json()["status"] == "healthy"
+
+
+def test_readiness_after_startup(client: TestClient):
+    response = client.get("/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert "schema" in body["steps"]
+    assert "pool" in body["steps"]
+
+
+# Boots the app with the default settings, every background component
+# included, against a fresh database, and shuts it down again
+DEFAULT_STARTUP = """
+import json, threading, time
+from fastapi.testclient import TestClient
+from app.main import app
+
+def background():
+    return sorted(t.name for t in threading.enumerate() if t.daemon and not t.name.startswith(("AnyIO", "Thread-")))
+
+with TestClient(app) as client:
+    deadline = time.monotonic() + 30
+    while client.get("/ready").status_code != 200 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    ready = client.get("/ready").json()
+    created = client.post("/products/", json={
+        "name": "Startup Product", "sku": "START-001", "category": "Test",
+        "description": "Product created by the startup test", "price": 10.0, "stock": 5,
+    }).status_code
+    order = client.post("/orders/", json={"products": [{"product_id": 1, "quantity": 1}]}).status_code
+    running = background()
+print(json.dumps({"ready": ready, "created": created, "order": order, "running": running, "stopped": background()}))
+"""
+
+
+def test_default_startup_and_shutdown(tmp_path):
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.endswith(("_ENABLED", "_URL", "_URI", "_PATH", "_DIR"))
+    }
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'startup.db'}"
+    result = subprocess.run(
+        [sys.executable, "-c", DEFAULT_STARTUP], cwd=tmp_path, env=env | {"PYTHONPATH": ROOT},
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    outcome = json.loads(result.stdout.strip().splitlines()[-1])
+    assert outcome["ready"]["status"] == "ready"
+    assert set(outcome["ready"]["steps"]) >= {"schema", "pool", "statements", "indexes", "products"}
+    assert (outcome["created"], outcome["order"]) == (201, 200)
+    assert {
+        "invalidation-bus", "change-log-pruner", "inventory-compactor", "autocomplete-index", "recommendations",
+    } <= set(outcome["running"])
+    # Order archival is opt-in
+    assert "order-archiver" not in outcome["running"]
+    assert outcome["stopped"] == []
+
+
+# Starts the app on a database written by the data generator
+GENERATED_STARTUP = """
+import json
+from fastapi.testclient import TestClient
+from app.main import app
+
+with TestClient(app) as client:
+    ready = client.get("/ready").status_code
+    product = client.get("/products/1").status_code
+    facets = client.get("/products/facets").status_code
+print(json.dumps({"ready": ready, "product": product, "facets": facets}))
+"""
+
+
+def test_startup_on_generated_database(tmp_path):
+    env = {
+        name: value for name, value in os.environ.items()
+        if not name.endswith(("_ENABLED", "_URL", "_URI", "_PATH", "_DIR"))
+    }
+    database_url = f"sqlite:///{tmp_path / 'generated.db'}"
+    env |= {"PYTHONPATH": ROOT, "DATABASE_URL": database_url, "WARMUP_ENABLED": "false"}
+    generated = subprocess.run(
+        [sys.executable, "-m", "app.db.generate_data", "--products", "50", "--orders", "100",
+         "--database-url", database_url],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120,
+    )
+    assert generated.returncode == 0, generated.stderr
+    result = subprocess.run(
+        [sys.executable, "-c", GENERATED_STARTUP], cwd=tmp_path, env=env,
+        capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == {"ready": 200, "product": 200, "facets": 200}
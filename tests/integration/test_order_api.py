@@ -1,4 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
 from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.pricing import pricing_engine
+from app.db.base import Base
+from app.db.order_archive import archive_batch
+from app.db.session import get_db, get_read_db
+from app.main import app
+from app.schemas.pricing import PromotionSet
 
 
 def create_test_products(client):
@@ -123,6 +135,39 @@ def test_place_order_insufficient_stock(client: TestClient):
     assert response.json()["stock"] == 3
 
 
+def test_quote_matches_placed_order(client: TestClient):
+    products = create_test_products(client)
+    pricing_engine.load(PromotionSet.model_validate({"promotions": [
+        {"type": "percent_off", "name": "Electronics 10%", "category": "Electronics", "percent": 10},
+        {"type": "buy_x_get_y", "name": "2 for 1", "product_ids": [products[1]["id"]], "buy": 1, "get": 1},
+    ]}).promotions)
+    try:
+        cart = {"products": [
+            {"product_id": products[0]["id"], "quantity": 3},
+            {"product_id": products[1]["id"], "quantity": 6},
+        ]}
+        response = client.post("/orders/quote", json=cart)
+        assert response.status_code == 200
+        quote = response.json()
+        assert [(line["promotion"], line["in_stock"]) for line in quote["lines"]] == [
+            ("Electronics 10%", True), ("2 for 1", False)
+        ]
+        assert quote["total_price"] == 869.94
+        
+        # Nothing was reserved or written
+        assert client.get(f"/products/{products[1]['id']}").json()["stock"] == 5
+        
+        cart["products"][1]["quantity"] = 4
+        quote = client.post("/orders/quote", json=cart).json()
+        order = client.post("/orders/", json=cart).json()
+        assert order["total_price"] == quote["total_price"] == 669.95
+    finally:
+        pricing_engine.load([])
+    
+    response = client.post("/orders/quote", json={"products": [{"product_id": 999999, "quantity": 1}]})
+    assert response.status_code == 404
+
+
 def test_get_order_by_id(client: TestClient):
     product_data = {
         "name": "Test Product for Order",
@@ -161,6 +206,23 @@ def test_get_order_by_id(client: TestClient):
     assert order["products"][0]["product"]["category"] == product["category"]
 
 
+def test_get_archived_order(client: TestClient, db: Session):
+    products = create_test_products(client)
+    placed = [
+        client.post("/orders/", json={"products": [{"product_id": product["id"], "quantity": 1}]}).json()
+        for product in products
+    ]
+    
+    # Every order but the newest is archived
+    assert archive_batch(db.connection(), before=datetime.utcnow() + timedelta(days=1)) == 1
+    
+    response = client.get(f"/orders/{placed[0]['id']}")
+    assert response.status_code == 200
+    order = response.json()
+    for key in ("id", "products", "total_price", "status", "created_at"):
+        assert order[key] == placed[0][key]
+
+
 def test_get_order_not_found(client: TestClient):
     response = client.get("/orders/999")
     assert response.status_code == 404
@@ -178,4 +240,51 @@ def test_validation_order_create(client: TestClient):
     }
     
     response = client.post("/orders/", json=order_data)
-    assert response.status_code == 422 
\ No newline at end of file
+    assert response.status_code == 422 
+
+def test_concurrent_orders_for_a_versioned_product(tmp_path):
+    # Sessions of their own against a file database, so orders really run concurrently
+    engine = create_engine(f"sqlite:///{tmp_path / 'orders.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def override_get_db():
+        db = sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    try:
+        with TestClient(app) as client:
+            product = client.post("/products/", json={
+                "name": "Contended Product", "sku": "HOT-001", "category": "Electronics",
+                "description": "Product ordered by many clients at once", "price": 5.0, "stock": 100,
+            }).json()
+            etag = client.get(f"/products/{product['id']}").headers["etag"]
+
+            def place_order(_):
+                return client.post("/orders/", json={"products": [{"product_id": product["id"], "quantity": 1}]})
+
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                statuses = [response.status_code for response in pool.map(place_order, range(40))]
+            # Stock updates of concurrent orders never conflict; only admission control may shed some
+            assert set(statuses) <= {200, 503}
+            placed = statuses.count(200)
+            assert placed > 0
+
+            response = client.get(f"/products/{product['id']}")
+            assert (response.json()["stock"], response.json()["version"]) == (100 - placed, 1 + placed)
+
+            # Every order moved the version, so an edit made before them is refused
+            stale = client.patch(f"/products/{product['id']}", json={"price": 6.0}, headers={"If-Match": etag})
+            assert stale.status_code == 409
+            fresh = client.patch(
+                f"/products/{product['id']}", json={"price": 6.0}, headers={"If-Match": response.headers["etag"]}
+            )
+            assert fresh.status_code == 200 and fresh.json()["version"] == 2 + placed
+    finally:
+        app.dependency_overrides = {}
+        engine.dispose()
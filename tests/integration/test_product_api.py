@@ -1,5 +1,14 @@
+import asyncio
+import time
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.core.cache import product_cache
+from app.main import app
 
 
 def test_read_products_empty(client: TestClient):
@@ -117,6 +126,76 @@ def test_read_products(client: TestClient):
     assert "Product 2" in product_names
 
 
+def test_read_products_filtered_with_cursor(client: TestClient):
+    for i, price in enumerate([45.0, 15.0, 30.0, 80.0]):
+        client.post("/products/", json={
+            "name": f"Filtered Product {i}",
+            "sku": f"FILTER-00{i}",
+            "category": "Electronics",
+            "description": "Description",
+            "price": price,
+            "stock": 1,
+        })
+    
+    params = {"category": "Electronics", "max_price": 50, "in_stock": "true", "sort": "price", "limit": 2}
+    response = client.get("/products/", params=params)
+    assert response.status_code == 200
+    assert [p["price"] for p in response.json()] == [15.0, 30.0]
+    
+    response = client.get("/products/", params={**params, "cursor": response.headers["X-Next-Cursor"]})
+    assert [p["price"] for p in response.json()] == [45.0]
+    assert "X-Next-Cursor" not in response.headers
+    
+    assert client.get("/products/", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get("/products/", params={"sort": "stock"}).status_code == 422
+
+
+def test_read_product_facets(client: TestClient):
+    for i, (category, price) in enumerate([("Books", 12.0), ("Books", 80.0), ("Garden", 12.0)]):
+        client.post("/products/", json={
+            "name": f"Facet Product {i}",
+            "sku": f"FACETAPI-00{i}",
+            "category": category,
+            "description": "Description",
+            "price": price,
+            "stock": i,
+        })
+    
+    response = client.get("/products/facets", params={"category": "Books"})
+    assert response.status_code == 200
+    facets = response.json()
+    assert facets["categories"] == [
+        {"category": "Books", "products": 2, "in_stock": 1},
+        {"category": "Garden", "products": 1, "in_stock": 1},
+    ]
+    assert [(b["min_price"], b["max_price"], b["products"]) for b in facets["price_histogram"] if b["products"]] == [
+        (10, 25, 1), (50, 100, 1)
+    ]
+    assert facets["price_histogram"][-1]["max_price"] is None
+
+
+def test_autocomplete_products(client: TestClient):
+    for i, name in enumerate(["Wireless Mouse", "Wireless Keyboard", "Wired Mouse"]):
+        client.post("/products/", json={
+            "name": name,
+            "sku": f"TYPE-00{i}",
+            "category": "Electronics",
+            "description": "Description",
+            "price": 19.99,
+            "stock": 1,
+        })
+    
+    response = client.get("/products/autocomplete", params={"prefix": "wireless"})
+    assert response.status_code == 200
+    assert [p["name"] for p in response.json()] == ["Wireless Keyboard", "Wireless Mouse"]
+    # LIKE wildcards in the prefix match literally
+    assert client.get("/products/autocomplete", params={"prefix": "Wire_"}).json() == []
+    assert [p["sku"] for p in client.get("/products/autocomplete", params={"prefix": "type-002"}).json()] == [
+        "TYPE-002"
+    ]
+    assert client.get("/products/autocomplete", params={"prefix": ""}).status_code == 422
+
+
 def test_read_product(client: TestClient):
     product_data = {
         "name": "Test Product for Get",
@@ -143,12 +222,193 @@ def test_read_product(client: TestClient):
     assert product["stock"] == product_data["stock"]
 
 
+def test_lookup_products(client: TestClient):
+    ids = []
+    for i in range(3):
+        response = client.post("/products/", json={
+            "name": f"Cart Product {i}",
+            "sku": f"CART-00{i}",
+            "category": "Books",
+            "description": "Test Description for lookup",
+            "price": 10.0,
+            "stock": 5
+        })
+        ids.append(response.json()["id"])
+    
+    response = client.get("/products/batch", params={"ids": f"{ids[2]},999999,{ids[0]}", "skus": "cart-001"})
+    assert response.status_code == 200
+    assert [p and p["id"] for p in response.json()] == [ids[2], None, ids[0], ids[1]]
+    assert client.get("/products/batch", params={"ids": "1,two"}).status_code == 400
+    assert client.get("/products/batch", params={"ids": ",".join(["1"] * 101)}).status_code == 400
+    
+    # The listing keeps its own schema, without nulls
+    listing = client.get("/openapi.json").json()["paths"]["/products/"]["get"]["responses"]["200"]
+    assert listing["content"]["application/json"]["schema"]["items"] == {"$ref": "#/components/schemas/Product"}
+    
+    response = client.post("/products/lookup", json={"ids": [ids[1], 999999], "skus": ["CART-002", "NOPE-001"]})
+    assert response.status_code == 200
+    result = response.json()
+    assert result["not_found"] == 2
+    assert [(r["id"], r["sku"], r["found"]) for r in result["results"]] == [
+        (ids[1], None, True), (999999, None, False), (None, "CART-002", True), (None, "NOPE-001", False)
+    ]
+    assert result["results"][2]["product"]["id"] == ids[2]
+    assert client.post("/products/lookup", json={}).status_code == 422
+
+
+def test_related_products(client: TestClient):
+    ids = []
+    for i in range(3):
+        response = client.post("/products/", json={
+            "name": f"Related Product {i}",
+            "sku": f"REL-00{i}",
+            "category": "Books",
+            "description": "Test Description for related",
+            "price": 10.0,
+            "stock": 5
+        })
+        ids.append(response.json()["id"])
+    for basket in ([ids[0], ids[1]], [ids[0], ids[1], ids[2]]):
+        client.post("/orders/", json={"products": [{"product_id": i, "quantity": 1} for i in basket]})
+    
+    response = client.get(f"/products/{ids[0]}/related")
+    assert response.status_code == 200
+    assert [(r["product"]["id"], r["orders"]) for r in response.json()] == [(ids[1], 2), (ids[2], 1)]
+    assert client.get(f"/products/{ids[2]}/related", params={"limit": 1}).json()[0]["product"]["id"] == ids[0]
+    assert client.get("/products/999999/related").status_code == 404
+
+
+def test_adjust_stock(client: TestClient):
+    product_data = {
+        "name": "Test Product for Stock Sync",
+        "sku": "SYNC-001",
+        "category": "Clothing",
+        "description": "Test Description for stock sync",
+        "price": 19.99,
+        "stock": 10
+    }
+    created_product = client.post("/products/", json=product_data).json()
+    client.get(f"/products/{created_product['id']}")
+    
+    response = client.patch("/products/stock", json={
+        "policy": "reject",
+        "adjustments": [
+            {"sku": "SYNC-001", "delta": -3},
+            {"id": created_product["id"], "delta": -100},
+            {"id": 999, "stock": 5},
+        ]
+    })
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["applied"], report["rejected"], report["not_found"]) == (1, 1, 1)
+    assert [r["status"] for r in report["results"]] == ["updated", "rejected", "not_found"]
+    
+    # The cached copy read above is not served any more
+    assert client.get(f"/products/{created_product['id']}").json()["stock"] == 7
+    
+    response = client.patch("/products/stock", json={"adjustments": [{"id": 1, "sku": "SYNC-001", "delta": 1}]})
+    assert response.status_code == 422
+
+
+def test_update_product_with_if_match(client: TestClient):
+    product_data = {
+        "name": "Test Product for Editing",
+        "sku": "EDIT-001",
+        "category": "Books",
+        "description": "Test Description for editing",
+        "price": 19.99,
+        "stock": 10
+    }
+    created_product = client.post("/products/", json=product_data).json()
+    url = f"/products/{created_product['id']}"
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert etag == '"1"' and response.json()["version"] == 1
+    
+    response = client.patch(url, json={"price": 17.5}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    assert {key: response.json()[key] for key in ("price", "stock", "version")} == {
+        "price": 17.5, "stock": 10, "version": 2
+    }
+    # The cached copy read above is not served any more
+    assert client.get(url).json()["price"] == 17.5
+    
+    # Edits made against the old version are refused, through If-Match or in the body
+    response = client.patch(url, json={"price": 15.0}, headers={"If-Match": etag})
+    assert response.status_code == 409
+    assert client.patch(url, json={"price": 15.0, "version": 1}).status_code == 409
+    assert client.patch(url, json={"price": 15.0}, headers={"If-Match": "W/\"2\""}).status_code == 400
+    assert client.patch(url, json={"price": 15.0, "version": 1}, headers={"If-Match": '"2"'}).status_code == 400
+    assert client.patch(url, json={"stock": 5}).status_code == 422
+    assert client.patch(url, json={}).status_code == 422
+    assert client.patch("/products/999", json={"price": 15.0}).status_code == 404
+    
+    # Without a version the change is written whatever the current one
+    response = client.patch(url, json={"description": None, "category": "Comics"})
+    assert response.status_code == 200
+    assert (response.json()["description"], response.json()["version"]) == (None, 3)
+
+
+def test_product_stock_history(client: TestClient):
+    product_data = {
+        "name": "Test Product for Ledger",
+        "sku": "LEDGER-001",
+        "category": "Clothing",
+        "description": "Test Description for the ledger",
+        "price": 19.99,
+        "stock": 10
+    }
+    created_product = client.post("/products/", json=product_data).json()
+    client.post("/orders/", json={"products": [{"product_id": created_product["id"], "quantity": 4}]})
+    
+    response = client.get(f"/products/{created_product['id']}/stock")
+    assert response.status_code == 200
+    assert response.json()["stock"] == 6
+    
+    response = client.get(f"/products/{created_product['id']}/stock", params={"at": "2000-01-01T00:00:00Z"})
+    assert response.json()["stock"] == 0
+    
+    response = client.get(f"/products/{created_product['id']}/movements")
+    assert [(m["reason"], m["delta"]) for m in response.json()] == [("order", -4), ("initial", 10)]
+    
+    assert client.get("/products/999/stock").status_code == 404
+
+
 def test_read_product_not_found(client: TestClient):
     response = client.get("/products/999")
     assert response.status_code == 404
     assert response.json()["detail"] == "Product not found"
 
 
+def test_concurrent_reads_of_a_product_share_one_query(client: TestClient, db: Session):
+    created = client.post("/products/", json={
+        "name": "Herd Product", "sku": "HERD-001", "category": "Books",
+        "description": "Product read by a herd", "price": 5.0, "stock": 3,
+    }).json()
+    product_cache.clear()
+    loads = []
+    
+    def slow_load(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM product" in statement:
+            loads.append(statement)
+            # Keeps the first load running while the rest of the herd arrives
+            time.sleep(0.2)
+    
+    async def herd():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as herd_client:
+            return await asyncio.gather(*(herd_client.get(f"/products/{created['id']}") for _ in range(20)))
+    
+    event.listen(db.get_bind(), "before_cursor_execute", slow_load)
+    try:
+        responses = asyncio.run(herd())
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", slow_load)
+    assert {response.status_code for response in responses} == {200}
+    assert {response.json()["name"] for response in responses} == {"Herd Product"}
+    assert len(loads) == 1
+
+
 def test_validation_product_create(client: TestClient):
     product_data = {
         "name": "Invalid Product",
@@ -184,4 +444,41 @@ def test_validation_product_create(client: TestClient):
     }
     
     response = client.post("/products/", json=product_data)
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+def test_product_changes_sync(client: TestClient, db: Session):
+    ids = []
+    for i in range(3):
+        response = client.post("/products/", json={
+            "name": f"Sync Product {i}",
+            "sku": f"DELTA-00{i}",
+            "category": "Books",
+            "description": "Test Description for delta sync",
+            "price": 10.0,
+            "stock": 5
+        })
+        ids.append(response.json()["id"])
+    
+    response = client.get("/products/changes", params={"since": 0, "limit": 2})
+    assert response.status_code == 200
+    page = response.json()
+    assert page["has_more"] is True
+    assert [change["id"] for change in page["changes"]] == ids[:2]
+    
+    page = client.get("/products/changes", params={"since": page["next_since"], "limit": 2}).json()
+    assert page["has_more"] is False
+    assert [change["id"] for change in page["changes"]] == ids[2:]
+    synced = page["next_since"]
+    
+    assert client.get("/products/changes", params={"since": synced}).json()["changes"] == []
+    
+    client.patch("/products/stock", json={"adjustments": [{"id": ids[1], "delta": 1}, {"id": ids[1], "delta": 1}]})
+    page = client.get("/products/changes", params={"since": synced}).json()
+    assert [(c["id"], c["deleted"], c["product"]["stock"]) for c in page["changes"]] == [(ids[1], False, 7)]
+    
+    # Once the changes up to `synced` are pruned, older versions have to resync
+    db.execute(text("DELETE FROM productchange WHERE id <= :id"), {"id": synced})
+    response = client.get("/products/changes", params={"since": 0})
+    assert response.status_code == 410
+    assert int(response.headers["x-catalog-version"]) == page["next_since"]
+    assert client.get("/products/changes", params={"since": synced}).status_code == 200
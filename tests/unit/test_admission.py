@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from app.core.admission import AdmissionLimiter, AdmissionMiddleware, check_deadline, remaining_time
+
+
+def test_limiter_queues_then_rejects():
+    async def main():
+        limiter = AdmissionLimiter("write", limit=1, max_queue=1, max_wait=1.0)
+        assert await limiter.acquire(10)
+
+        queued = asyncio.ensure_future(limiter.acquire(10))
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+        # Queue full: rejected without waiting
+        assert await limiter.acquire(10) is False
+
+        limiter.release()
+        assert await queued is True
+        assert limiter.stats()["in_flight"] == 1
+
+        # Nothing frees the slot: rejected once the wait budget is spent
+        assert await limiter.acquire(0.05) is False
+        limiter.release()
+        assert limiter.stats() == {"limit": 1, "in_flight": 0, "queued": 0, "admitted": 2, "rejected": 2}
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def main():
+        limiter = AdmissionLimiter("read", limit=1, max_queue=5, max_wait=5.0)
+        await limiter.acquire(10)
+        waiter = asyncio.ensure_future(limiter.acquire(10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+        assert limiter.in_flight == 0 and limiter.queued == 0
+
+    asyncio.run(main())
+
+
+def make_app():
+    app = FastAPI()
+    release = asyncio.Event()
+
+    @app.post("/orders")
+    async def place_order():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/products")
+    async def list_products():
+        return {"remaining": remaining_time()}
+
+    @app.post("/products/lookup")
+    async def lookup_products():
+        return {"ok": True}
+
+    @app.get("/slow")
+    def slow():
+        check_deadline()
+        return {"ok": True}
+
+    read = AdmissionLimiter("read", limit=10, max_queue=10, max_wait=1.0)
+    write = AdmissionLimiter("write", limit=1, max_queue=0, max_wait=1.0)
+    return AdmissionMiddleware(app, read=read, write=write, default_timeout=5.0,
+                               read_paths=("/products/lookup",)), release
+
+
+def test_writes_are_shed_while_reads_are_served():
+    async def main():
+        app, release = make_app()
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/orders"))
+            await asyncio.sleep(0.05)
+
+            shed = await client.post("/orders")
+            assert shed.status_code == 503
+            assert int(shed.headers["retry-after"]) >= 1
+
+            browse = await client.get("/products", headers={"X-Request-Timeout": "2"})
+            assert browse.status_code == 200
+            assert 0 < browse.json()["remaining"] <= 2
+            assert (await client.post("/products/lookup")).status_code == 200
+
+            release.set()
+            assert (await first).status_code == 200
+
+    asyncio.run(main())
+
+
+def test_expired_deadline_stops_work():
+    async def main():
+        app, _ = make_app()
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/slow", headers={"X-Request-Timeout": "0"})
+            assert response.status_code == 503
+            assert response.json()["detail"] == "Request deadline exceeded"
+            # Clients back off as they do from shed requests
+            assert int(response.headers["retry-after"]) >= 1
+            assert (await client.get("/slow")).status_code == 200
+
+    asyncio.run(main())
+
+
+def test_non_finite_timeout_gets_the_default_deadline():
+    async def main():
+        app, _ = make_app()
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            for value in ("nan", "inf", "-inf", "soon"):
+                response = await client.get("/products", headers={"X-Request-Timeout": value})
+                assert response.status_code == 200
+                assert 0 < response.json()["remaining"] <= 5
+
+    asyncio.run(main())
@@ -0,0 +1,63 @@
+import random
+
+from sqlalchemy.orm import Session
+
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.autocomplete import AutocompleteIndex, PrefixIndex
+from app.schemas.order import OrderCreate, OrderProductItem
+from app.schemas.product import ProductCreate
+
+
+def test_prefix_index_matches_brute_force():
+    rng = random.Random(7)
+    products = [
+        (i, f"{rng.choice(['Lamp', 'lantern', 'Laptop', 'Kettle'])} {rng.randint(1, 50)} #{i}", f"SKU-{i:05d}")
+        for i in range(1, 2001)
+    ]
+    popularity = {i: rng.randint(0, 20) for i in range(1, 2001, 3)}
+    index = PrefixIndex(products, popularity)
+
+    for prefix in ("la", "LAMP 1", "lantern 4", "sku-001", "k", "zzz", ""):
+        key = prefix.lower()
+        expected = sorted(
+            (-popularity.get(i, 0), min(k for k in (name.lower(), sku.lower()) if k.startswith(key)), i)
+            for i, name, sku in products
+            if name.lower().startswith(key) or sku.lower().startswith(key)
+        )
+        ranked = []
+        for _, slot in index.matches(key.encode()):
+            product_id = index.ids[slot]
+            if product_id not in ranked:
+                ranked.append(product_id)
+        assert ranked[:25] == [i for _, _, i in expected][:25], prefix
+    assert index.find(17) == products[16]
+    assert index.find(5000) is None
+
+
+def test_writes_are_searchable_before_the_next_build(db: Session):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=name, sku=sku, category="Test Category", description="Test Description", price=9.99, stock=10,
+        ))
+        for name, sku in [("Lamp Classic", "LMP-001"), ("Lamp Deluxe", "LMP-002"), ("Kettle", "KET-001")]
+    ]
+    order_crud.create_with_stock_validation(db, obj_in=OrderCreate(products=[
+        OrderProductItem(product_id=products[1].id, quantity=3)
+    ]))
+
+    index = AutocompleteIndex()
+    assert index.search("lamp") is None
+    index.rebuild(db.connection())
+    assert [s[1] for s in index.search("LAMP")] == ["Lamp Deluxe", "Lamp Classic"]
+    assert [s[1] for s in index.search("ket")] == ["Kettle"]
+
+    index.upsert(products[2].id, "Lamp Kettle", "KET-001")
+    index.remove(products[0].id)
+    assert [s[1] for s in index.search("lamp")] == ["Lamp Deluxe", "Lamp Kettle"]
+    assert [s[1] for s in index.search("ket-")] == ["Lamp Kettle"]
+    assert index.search("lamp", limit=1) == [(products[1].id, "Lamp Deluxe", "LMP-002")]
+
+    # Writes made before a build are dropped from the overlay once it is built
+    index.rebuild(db.connection())
+    assert index._pending == {}
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+from app.core.events import EventBroker, order_event, stock_event
+
+
+def test_events_reach_matching_subscribers_only():
+    async def main():
+        broker = EventBroker()
+        broker.start(asyncio.get_running_loop())
+        by_product = broker.subscribe(product_ids=[1])
+        by_category = broker.subscribe(categories=["Books"])
+        everything = broker.subscribe()
+
+        # Published from a threadpool thread, as CRUD writes do
+        thread = threading.Thread(target=broker.publish, args=([
+            stock_event(1, 5, "Electronics"),
+            stock_event(2, 7, "Books"),
+            order_event(10, "completed", [3], ["Garden"]),
+        ],))
+        thread.start()
+        thread.join()
+
+        return [
+            [event.data for event in await subscriber.next_events(timeout=1)]
+            for subscriber in (by_product, by_category, everything)
+        ]
+
+    by_product, by_category, everything = asyncio.run(main())
+    assert by_product == [{"product_id": 1, "stock": 5}]
+    assert by_category == [{"product_id": 2, "stock": 7}]
+    assert [data.get("product_id", data.get("order_id")) for data in everything] == [1, 2, 10]
+
+
+def test_updates_coalesce_and_slow_subscribers_are_dropped():
+    async def main():
+        broker = EventBroker(queue_size=2)
+        broker.start(asyncio.get_running_loop())
+        subscriber = broker.subscribe()
+
+        broker._dispatch([stock_event(1, stock, "Books") for stock in (9, 8, 7)])
+        coalesced = await subscriber.next_events(timeout=1)
+
+        broker._dispatch([stock_event(product_id, 1) for product_id in (1, 2, 3)])
+        return coalesced, subscriber, broker
+
+    coalesced, subscriber, broker = asyncio.run(main())
+    assert [event.data["stock"] for event in coalesced] == [7]
+    assert subscriber.dropped and subscriber.closed
+    assert broker.stats()["subscribers"] == 0
+    assert broker.stats()["dropped"] == 1
+
+
+def test_repeated_stock_is_sent_once_and_drop_all_ends_every_stream():
+    async def main():
+        broker = EventBroker()
+        broker.start(asyncio.get_running_loop())
+        subscriber = broker.subscribe()
+
+        # Published by the write, then again when the invalidation bus reports it
+        broker._dispatch([stock_event(1, 5, "Books")])
+        first = await subscriber.next_events(timeout=1)
+        broker._dispatch([stock_event(1, 5, "Books"), stock_event(1, 4, "Books")])
+        second = await subscriber.next_events(timeout=1)
+
+        broker.drop_all("catalog changed")
+        await asyncio.sleep(0)
+        return first, second, subscriber, broker
+
+    first, second, subscriber, broker = asyncio.run(main())
+    assert [event.data["stock"] for event in first] == [5]
+    assert [event.data["stock"] for event in second] == [4]
+    assert subscriber.dropped and subscriber.drop_reason == "catalog changed"
+    assert broker.stats()["subscribers"] == 0
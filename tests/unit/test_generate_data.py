@@ -0,0 +1,50 @@
+import json
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from app.db.generate_data import DataGenerator, generate
+from app.db.models.order import Order
+from app.db.models.product import Product
+from app.schemas.product import ProductCreate
+
+
+def test_generator_is_deterministic():
+    first = DataGenerator(seed=7)
+    second = DataGenerator(seed=7)
+    assert list(first.products(50)) == list(second.products(50))
+
+    prices = [row[5] for row in first.products(50)]
+    assert list(first.orders(100, prices)) == list(second.orders(100, prices))
+    assert list(DataGenerator(seed=8).products(50)) != list(first.products(50))
+
+
+def test_generated_products_pass_validation():
+    for product_id, name, sku, category, description, price, stock in DataGenerator(seed=1).products(200):
+        ProductCreate(
+            name=name, sku=sku, category=category, description=description, price=price, stock=stock
+        )
+
+
+def test_order_popularity_is_skewed():
+    prices = [10.0] * 1000
+    counts = Counter()
+    for _, products, _, _, _ in DataGenerator(seed=3).orders(5000, prices):
+        counts.update(item["product_id"] for item in json.loads(products))
+    top_ten = sum(count for _, count in counts.most_common(10))
+    assert top_ten > sum(counts.values()) * 0.2
+
+
+def test_generate_writes_chunks(db: Session):
+    engine = db.get_bind().engine
+    stats = generate(engine, products=120, orders=300, seed=5, chunk_size=50)
+    assert stats["products"] == 120
+    assert stats["orders"] == 300
+
+    assert db.query(Product).count() == 120
+    assert db.query(Order).count() == 300
+    order = db.query(Order).order_by(Order.id).first()
+    items = order.get_products()
+    prices = {p.id: p.price for p in db.query(Product).filter(Product.id.in_([i["product_id"] for i in items]))}
+    assert order.total_price == round(sum(prices[i["product_id"]] * i["quantity"] for i in items), 2)
+    assert order.created_at is not None
@@ -0,0 +1,149 @@
+import multiprocessing
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.cache import product_cache
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.change_log import ChangeLogPruner, retention_watermark
+from app.db.generate_data import generate
+from app.db.invalidation import InvalidationBus, invalidate_product_cache, publish_catalog_invalidation
+
+POLL_INTERVAL = 0.05
+# Poll interval plus generous scheduling slack for a loaded CI machine
+MAX_DELAY = 2.0
+
+
+def make_engine(path):
+    return create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+
+
+def cache_worker(db_path, ready, stop, results):
+    """A stand-in for a uvicorn worker: caches product 1 and follows the bus."""
+    engine = make_engine(db_path)
+    bus = InvalidationBus(poll_interval=POLL_INTERVAL)
+    bus.subscribe(invalidate_product_cache)
+    bus.subscribe(lambda ids: results.put(("invalidated", None if ids is None else sorted(ids), time.time())))
+    with sessionmaker(bind=engine)() as db:
+        product_crud.get_cached(db, id=1)
+    assert product_cache.get(1) is not None
+    bus.start(engine)
+    ready.set()
+    stop.wait(30)
+    bus.stop()
+    results.put(("cached", product_cache.get(1) is not None, time.time()))
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / "bus.db"
+    engine = make_engine(path)
+    Base.metadata.create_all(bind=engine)
+    generate(engine, products=10, orders=0, seed=9)
+    engine.dispose()
+    return str(path)
+
+
+def test_invalidations_reach_every_worker(db_path):
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    workers = []
+    for _ in range(2):
+        ready, results = context.Event(), context.Queue()
+        process = context.Process(target=cache_worker, args=(db_path, ready, stop, results))
+        process.start()
+        workers.append((process, ready, results))
+    try:
+        for _, ready, _ in workers:
+            assert ready.wait(30)
+
+        engine = make_engine(db_path)
+        with sessionmaker(bind=engine)() as db:
+            written = time.time()
+            product_crud.update_stock(db, product_id=1, quantity_change=4)
+            for _, _, results in workers:
+                kind, ids, received = results.get(timeout=MAX_DELAY)
+                assert (kind, ids) == ("invalidated", [1])
+                assert received - written < MAX_DELAY
+
+            publish_catalog_invalidation(db)
+            for _, _, results in workers:
+                assert results.get(timeout=MAX_DELAY)[:2] == ("invalidated", None)
+        engine.dispose()
+    finally:
+        stop.set()
+        for process, _, _ in workers:
+            process.join(10)
+
+    for _, _, results in workers:
+        assert results.get(timeout=5)[:2] == ("cached", False)
+
+
+def test_poll_skips_unchanged_database_and_collapses_backlog(db_path):
+    engine = make_engine(db_path)
+    received = []
+    bus = InvalidationBus(poll_interval=3600, batch_size=3)
+    bus.subscribe(received.append)
+    bus.start(engine)
+    try:
+        assert bus.poll() == 0
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE product SET stock = stock + 1 WHERE id IN (2, 3)")
+        assert bus.poll() == 2
+        assert received == [frozenset({2, 3})]
+
+        # Orders do not touch the change log
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO \"order\" (products, total_price, status) VALUES ('[]', 0, 'pending')"
+            )
+        assert bus.poll() == 0
+
+        with engine.begin() as conn:
+            conn.exec_driver_sql("UPDATE product SET stock = stock + 1")
+        bus.poll()
+        assert received[-1] is None
+        assert bus.poll() == 0
+    finally:
+        bus.stop()
+        engine.dispose()
+
+
+def test_pruning_keeps_the_newest_change_and_invalidates_lagging_buses(db_path):
+    engine = make_engine(db_path)
+    received = []
+    bus = InvalidationBus(poll_interval=3600)
+    bus.subscribe(received.append)
+    bus.start(engine)
+    try:
+        with engine.begin() as conn:
+            for _ in range(3):
+                conn.exec_driver_sql("UPDATE product SET stock = stock + 1 WHERE id = 1")
+            newest = conn.exec_driver_sql("SELECT max(id) FROM productchange").scalar()
+            assert retention_watermark(conn) == 0
+            # Every change but the one before the newest is old
+            conn.exec_driver_sql(
+                "UPDATE productchange SET created_at = '2000-01-01 00:00:00' WHERE id != ?", (newest - 1,)
+            )
+
+        # Only the oldest changes go, up to the first recent one, and never the newest
+        pruner = ChangeLogPruner(retention_hours=1, batch_size=4)
+        assert pruner.prune(engine) == newest - 2
+        with engine.connect() as conn:
+            assert retention_watermark(conn) == newest - 2
+            assert [row.id for row in conn.exec_driver_sql("SELECT id FROM productchange")] == [newest - 1, newest]
+        pruner.prune(engine, now=datetime.utcnow() + timedelta(days=1))
+        with engine.connect() as conn:
+            assert [row.id for row in conn.exec_driver_sql("SELECT id FROM productchange")] == [newest]
+
+        # The bus had not read the pruned changes: everything is invalidated
+        bus.poll()
+        assert received == [None]
+    finally:
+        bus.stop()
+        engine.dispose()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from app.crud.inventory import inventory
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.inventory import compact_batch
+from app.db.models.inventory import InventoryMovement, InventorySnapshot
+from app.schemas.order import OrderCreate, OrderProductItem
+from app.schemas.product import ProductCreate, StockAdjustment
+
+
+def _product(db: Session, sku: str, stock: int):
+    return product_crud.create(db=db, obj_in=ProductCreate(
+        name=f"Ledger Product {sku}", sku=sku, category="Test Category",
+        description="Test Description", price=5.0, stock=stock,
+    ))
+
+
+def test_stock_changes_are_recorded(db: Session):
+    product = _product(db, "LEDGER-001", 10)
+    
+    db_order, _ = order_crud.create_with_stock_validation(db=db, obj_in=OrderCreate(
+        products=[OrderProductItem(product_id=product.id, quantity=3)]
+    ))
+    product_crud.update_stock(db=db, product_id=product.id, quantity_change=-20)
+    product_crud.adjust_stock(db=db, adjustments=[StockAdjustment(id=product.id, stock=8)])
+    product_crud.update(db, db_obj=product_crud.get(db, id=product.id), obj_in={"stock": 6})
+    
+    movements = inventory.get_movements(db, product_id=product.id)
+    assert [(m.reason, m.delta, m.order_id) for m in reversed(movements)] == [
+        ("initial", 10, None),
+        ("order", -3, db_order.id),
+        ("adjustment", -7, None),  # clamped at 0
+        ("adjustment", 8, None),
+        ("adjustment", -2, None),
+    ]
+    assert inventory.stock_at(db, product_id=product.id) == product_crud.get(db, id=product.id).stock == 6
+
+
+def test_compaction_keeps_point_in_time_stock(db: Session):
+    first, second = _product(db, "LEDGER-001", 0), _product(db, "LEDGER-002", 0)
+    start = datetime(2024, 1, 1)
+    for minute in range(10):
+        for product, delta in ((first, 5), (second, minute)):
+            db.add(InventoryMovement(
+                product_id=product.id, delta=delta, reason="adjustment",
+                created_at=start + timedelta(minutes=minute),
+            ))
+    db.commit()
+    
+    def levels():
+        return [
+            inventory.stock_at(db, product_id=product.id, at=start + timedelta(minutes=minute, seconds=30))
+            for product in (first, second) for minute in range(10)
+        ] + [inventory.stock_at(db, product_id=first.id), inventory.stock_at(db, product_id=second.id)]
+    
+    expected = levels()
+    assert expected[9] == 50 and expected[19] == 45
+    
+    conn = db.connection()
+    assert [compact_batch(conn, batch_size=7) for _ in range(4)] == [7, 7, 6, 0]
+    assert db.query(InventorySnapshot).count() == 6
+    assert levels() == expected
+    
+    # Movements after the last snapshot are the tail added on top of it
+    inventory.record(db, product_id=first.id, delta=-1, reason="adjustment")
+    db.commit()
+    assert inventory.stock_at(db, product_id=first.id) == 49
+    assert inventory.stock_at(db, product_id=first.id, at=start) == 5
+    assert inventory.stock_at(db, product_id=first.id, at=start - timedelta(days=1)) == 0
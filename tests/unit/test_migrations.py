@@ -0,0 +1,111 @@
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, text
+
+from app.db.base import Base
+from app.db.models.order import Order
+from app.db.models.product import Product
+from app.db.init_db import SCHEMA_REVISION, _alembic_config, current_revision, ensure_schema, schema_head
+
+
+def make_engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+
+
+def triggers(conn):
+    rows = conn.execute(text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"))
+    return {name: " ".join(sql.split()) for name, sql in rows}
+
+
+def test_schema_revision_is_head():
+    assert SCHEMA_REVISION == schema_head()
+
+
+def test_migrations_match_models(tmp_path):
+    engine = make_engine(tmp_path)
+    assert ensure_schema(engine) is True
+
+    with engine.connect() as conn:
+        assert current_revision(conn) == SCHEMA_REVISION
+        diff = compare_metadata(MigrationContext.configure(conn), Base.metadata)
+        migrated_triggers = triggers(conn)
+    assert diff == []
+
+    # Migrations carry frozen copies of the model triggers, which must not drift apart
+    models = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    Base.metadata.create_all(bind=models)
+    with models.connect() as conn:
+        assert migrated_triggers == triggers(conn)
+
+
+def test_current_schema_skips_ddl(tmp_path):
+    engine = make_engine(tmp_path)
+    ensure_schema(engine)
+    assert ensure_schema(engine) is False
+
+
+def test_legacy_database_is_stamped_and_upgraded(tmp_path):
+    engine = make_engine(tmp_path)
+    # The tables create_all() produced before migrations existed
+    Base.metadata.create_all(bind=engine, tables=[Product.__table__, Order.__table__])
+    with engine.begin() as conn:
+        assert current_revision(conn) is None
+        # Indexes added to the models since
+        for index in ("ix_product_category_price", "ix_product_category_name",
+                      "ix_product_price_id", "ix_product_in_stock_price"):
+            conn.execute(text(f"DROP INDEX {index}"))
+        # Columns added to the models since
+        conn.execute(text("ALTER TABLE product DROP COLUMN version"))
+        conn.execute(text(
+            "INSERT INTO product (id, name, sku, category, price, stock) "
+            "VALUES (1, 'Legacy Product', 'LEGACY-1', 'Books', 9.5, 7)"
+        ))
+
+    assert ensure_schema(engine) is True
+    with engine.connect() as conn:
+        assert current_revision(conn) == SCHEMA_REVISION
+        # Existing products are in the change log and their stock in the inventory ledger
+        assert conn.execute(text("SELECT product_id, op FROM productchange")).all() == [(1, "insert")]
+        assert conn.execute(text("SELECT product_id, delta, reason FROM inventorymovement")).all() == [
+            (1, 7, "initial")
+        ]
+        assert conn.execute(text("SELECT * FROM productfacet")).all() == [("Books", 0, 1, 1)]
+        assert conn.execute(text("SELECT version FROM product")).scalar() == 1
+
+
+def test_database_created_from_current_models_is_stamped_head(tmp_path):
+    engine = make_engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        created_triggers = triggers(conn)
+
+    assert ensure_schema(engine) is True
+    with engine.connect() as conn:
+        assert current_revision(conn) == SCHEMA_REVISION
+        assert triggers(conn) == created_triggers
+
+
+def test_product_version_downgrade_keeps_triggers(tmp_path):
+    engine = make_engine(tmp_path)
+    ensure_schema(engine)
+    with engine.connect() as conn:
+        head_triggers = triggers(conn)
+
+    with engine.begin() as conn:
+        command.downgrade(_alembic_config(conn), "0007")
+    with engine.connect() as conn:
+        assert current_revision(conn) == "0007"
+        assert triggers(conn) == head_triggers
+        conn.execute(text(
+            "INSERT INTO product (id, name, sku, category, price, stock) "
+            "VALUES (1, 'Downgraded Product', 'DOWN-1', 'Books', 9.5, 7)"
+        ))
+        assert conn.execute(text("SELECT product_id, op FROM productchange")).all() == [(1, "insert")]
+        conn.rollback()
+
+    with engine.begin() as conn:
+        command.upgrade(_alembic_config(conn), "head")
+    with engine.connect() as conn:
+        assert current_revision(conn) == SCHEMA_REVISION
+        assert triggers(conn) == head_triggers
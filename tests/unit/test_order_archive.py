@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.models.order import Order
+from app.db.models.order_archive import OrderArchive
+from app.db.base import Base
+from app.db.generate_data import DEFAULT_END, generate
+from app.db.order_archive import OrderArchiver, archive_batch, get_archived
+from app.db.recommendations import RecommendationEngine
+from app.schemas.product import ProductCreate
+
+
+def _history(db: Session):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Archive Product {i}", sku=f"ARCHIVE-00{i}", category="Test Category",
+            description="Test Description", price=4.5, stock=100,
+        ))
+        for i in range(2)
+    ]
+    lines = [{"product_id": product.id, "quantity": 2} for product in products]
+    start = datetime(2024, 1, 30)
+    for day in range(6):
+        db.add(Order(
+            products=lines, total_price=18.0, status="pending" if day == 1 else "completed",
+            created_at=start + timedelta(days=day),
+        ))
+    db.commit()
+    return products, [order.id for order in db.query(Order).order_by(Order.id)]
+
+
+def test_cold_orders_move_to_chunks(db: Session):
+    products, ids = _history(db)
+    conn = db.connection()
+
+    # Completed orders before the cutoff, in chunks of one month; the pending one stays hot
+    assert archive_batch(conn, before=datetime(2024, 2, 3), chunk_size=2) == 3
+    chunks = db.query(OrderArchive).order_by(OrderArchive.min_order_id).all()
+    assert [(c.month, c.min_order_id, c.max_order_id, c.orders) for c in chunks] == [
+        ("2024-01", ids[0], ids[0], 1),
+        ("2024-02", ids[2], ids[3], 2),
+    ]
+    assert [order.id for order in db.query(Order).order_by(Order.id)] == [ids[1], ids[4], ids[5]]
+
+    # The newest order is never archived, so its ID is not handed out again
+    assert archive_batch(conn, before=datetime(2025, 1, 1)) == 1
+    assert archive_batch(conn, before=datetime(2025, 1, 1)) == 0
+    assert [order.id for order in db.query(Order).order_by(Order.id)] == [ids[1], ids[5]]
+
+    archived = get_archived(db, ids[3])
+    assert (archived.id, archived.status, archived.total_price) == (ids[3], "completed", 18.0)
+    assert archived.created_at == datetime(2024, 2, 2)
+    assert get_archived(db, ids[1]) is None
+    assert get_archived(db, ids[5] + 1) is None
+
+
+def test_reads_span_hot_and_archived_orders(db: Session):
+    products, ids = _history(db)
+    archive_batch(db.connection(), before=datetime(2025, 1, 1))
+    db.commit()
+
+    for order_id in (ids[0], ids[1], ids[5]):
+        details = order_crud.get_order_with_product_details(db, order_id=order_id)
+        assert details.id == order_id
+        assert [(product.id, quantity) for product, quantity in details.product_details] == [
+            (products[0].id, 2), (products[1].id, 2)
+        ]
+    assert order_crud.get_order_with_product_details(db, order_id=ids[5] + 1) is None
+
+    _, message = order_crud.process_order(db, order_id=ids[2])
+    assert message == "Order already completed"
+
+    # Archived orders count towards recommendations
+    engine = RecommendationEngine(batch_size=2)
+    engine.rebuild(db.connection())
+    assert engine.related(products[0].id) == [(products[1].id, 6)]
+
+
+def test_archiver_with_default_settings(tmp_path):
+    # Opt-in: a deployment only starts moving orders once it sets ORDER_ARCHIVE_ENABLED
+    assert settings.model_fields["ORDER_ARCHIVE_ENABLED"].default is False
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'archive.db'}")
+    Base.metadata.create_all(bind=engine)
+    generate(engine, products=50, orders=3000, seed=4, months=6)
+    cutoff = DEFAULT_END - timedelta(days=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    with engine.connect() as conn:
+        cold = conn.execute(
+            select(func.count()).select_from(Order.__table__)
+            .where(Order.status == "completed", Order.created_at < cutoff)
+        ).scalar()
+
+    archiver = OrderArchiver(
+        after_days=settings.ORDER_ARCHIVE_AFTER_DAYS,
+        interval=settings.ORDER_ARCHIVE_SECONDS,
+        batch_size=settings.ORDER_ARCHIVE_BATCH,
+        chunk_size=settings.ORDER_ARCHIVE_CHUNK,
+    )
+    assert archiver.archive(engine, now=DEFAULT_END) == cold > 0
+    with engine.connect() as conn:
+        chunks = conn.execute(select(OrderArchive.month, OrderArchive.orders)).all()
+        assert sum(orders for _, orders in chunks) == cold
+        assert max(orders for _, orders in chunks) <= settings.ORDER_ARCHIVE_CHUNK
+        assert conn.execute(select(func.min(Order.created_at)).where(Order.status == "completed")).scalar() >= cutoff
+    assert archiver.archive(engine, now=DEFAULT_END) == 0
+    engine.dispose()
@@ -0,0 +1,51 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.pricing import PricingEngine
+from app.schemas.pricing import PromotionSet
+
+
+def product(id, category, price, stock=100):
+    return SimpleNamespace(id=id, category=category, price=price, stock=stock)
+
+
+def test_lines_get_their_best_promotion(tmp_path):
+    path = tmp_path / "promotions.json"
+    path.write_text(json.dumps({"promotions": [
+        {"type": "percent_off", "name": "Books 10%", "category": "Books", "percent": 10},
+        {"type": "buy_x_get_y", "name": "3 for 2", "product_ids": [2], "buy": 2, "get": 1},
+        {"type": "tiered", "name": "Bulk", "category": "Books",
+         "tiers": [{"min_quantity": 10, "percent": 15}, {"min_quantity": 5, "percent": 5}]},
+    ]}))
+    engine = PricingEngine()
+    assert engine.load_file(str(path)) == 3
+
+    quote = engine.quote([
+        (product(1, "Books", 20.0), 1),   # 10% off: 2.00
+        (product(2, "Books", 10.0), 7),   # 3 for 2: 2 free, 20.00 beats 10% (7.00) and 5% (3.50)
+        (product(3, "Books", 5.0), 12),   # 15% bulk: 9.00
+        (product(4, "Garden", 9.99, stock=1), 3),
+    ])
+    assert [(line.discount, line.promotion) for line in quote.lines] == [
+        (2.0, "Books 10%"), (20.0, "3 for 2"), (9.0, "Bulk"), (0.0, None)
+    ]
+    assert [line.in_stock for line in quote.lines] == [True, True, True, False]
+    assert (quote.subtotal, quote.discount, quote.total_price) == (179.97, 31.0, 148.97)
+
+    # Loading replaces the promotions
+    engine.load([])
+    assert engine.quote([(product(1, "Books", 20.0), 1)]).total_price == 20.0
+
+
+def test_invalid_promotions_are_rejected():
+    with pytest.raises(ValidationError):
+        PromotionSet.model_validate({"promotions": [{"type": "percent_off", "name": "x", "percent": 10}]})
+    with pytest.raises(ValidationError):
+        PromotionSet.model_validate({"promotions": [
+            {"type": "percent_off", "name": "x", "category": "Books", "percent": 110}
+        ]})
+    with pytest.raises(ValidationError):
+        PromotionSet.model_validate({"promotions": [{"type": "bogus", "name": "x", "category": "Books"}]})
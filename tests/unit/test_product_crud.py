@@ -1,9 +1,16 @@
+import base64
+import itertools
+import json
+
 import pytest
 from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import Session
 
-from app.schemas.product import ProductCreate
-from app.crud.product import product as product_crud
+from app.schemas.product import ProductCreate, ProductUpdate, StockAdjustment
+from app.crud.product import LISTING_SORTS, product as product_crud
+from app.db.base import Base
+from app.db.facets import recompute_facets
 
 
 def test_create_product(db: Session):
@@ -132,6 +139,32 @@ def test_get_products(db: Session):
     assert len(products) >= 2
 
 
+def test_get_many_cached_keeps_request_order(db: Session, monkeypatch):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Lookup Product {i}", sku=f"LOOKUP-00{i}", category="Test Category",
+            description="Test Description", price=9.99, stock=i,
+        ))
+        for i in range(5)
+    ]
+    ids = [p.id for p in products]
+    queries = []
+    monkeypatch.setattr(db, "query", lambda *args: queries.append(args) or Session.query(db, *args))
+    
+    by_id, by_sku = product_crud.get_many_cached(
+        db, ids=[ids[3], 999_999, ids[0], ids[3], ids[4]], skus=["lookup-002", "NOPE-001"], chunk_size=2,
+    )
+    assert [p and p.id for p in by_id] == [ids[3], None, ids[0], ids[3], ids[4]]
+    assert [p and p.id for p in by_sku] == [ids[2], None]
+    # Four distinct IDs in chunks of two, and one query for the SKUs
+    assert len(queries) == 3
+    
+    queries.clear()
+    by_id, _ = product_crud.get_many_cached(db, ids=[ids[4], ids[0]])
+    assert [p.id for p in by_id] == [ids[4], ids[0]]
+    assert queries == []
+
+
 def test_update_stock(db: Session):
     product_data = ProductCreate(
         name="Test Product for Stock Update",
@@ -153,6 +186,252 @@ def test_update_stock(db: Session):
     assert updated_product.stock == 0
 
 
+def test_update_stock_of_missing_product_releases_write_lock(tmp_path):
+    # Sessions of their own against a file database, so the lock is really contended
+    engine = create_engine(f"sqlite:///{tmp_path / 'stock.db'}", connect_args={"timeout": 0.1})
+    Base.metadata.create_all(bind=engine)
+    try:
+        with Session(bind=engine) as db, Session(bind=engine) as other:
+            assert product_crud.update_stock(db=db, product_id=404, quantity_change=1) is None
+            other.execute(text("UPDATE product SET stock = stock WHERE 0"))
+            other.commit()
+    finally:
+        engine.dispose()
+
+
+def test_adjust_stock(db: Session):
+    first = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Bulk Stock Product 1", sku="BULK-001", category="Test Category",
+        description="Test Description", price=9.99, stock=10,
+    ))
+    second = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Bulk Stock Product 2", sku="BULK-002", category="Test Category",
+        description="Test Description", price=9.99, stock=5,
+    ))
+    
+    report = product_crud.adjust_stock(db=db, adjustments=[
+        StockAdjustment(id=first.id, delta=-4),
+        StockAdjustment(sku="bulk-002", stock=20),
+        StockAdjustment(id=first.id, delta=-10),
+        StockAdjustment(sku="BULK-404", delta=1),
+    ])
+    
+    assert (report.applied, report.rejected, report.not_found) == (3, 0, 1)
+    assert [(r.status, r.stock) for r in report.results] == [
+        ("updated", 6), ("updated", 20), ("clamped", 0), ("not_found", None),
+    ]
+    assert report.results[1].id == second.id
+    assert product_crud.get(db, id=first.id).stock == 0
+    assert product_crud.get(db, id=second.id).stock == 20
+
+
+def test_adjust_stock_reject(db: Session):
+    product = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Bulk Stock Product", sku="BULK-001", category="Test Category",
+        description="Test Description", price=9.99, stock=10,
+    ))
+    
+    report = product_crud.adjust_stock(db=db, policy="reject", adjustments=[
+        StockAdjustment(id=product.id, delta=-8),
+        StockAdjustment(id=product.id, delta=-8),
+        StockAdjustment(id=product.id, delta=3),
+    ])
+    
+    assert (report.applied, report.rejected) == (2, 1)
+    assert [(r.status, r.stock) for r in report.results] == [("updated", 2), ("rejected", 2), ("updated", 5)]
+    assert product_crud.get(db, id=product.id).stock == 5
+
+
+def test_adjust_stock_leaves_unchanged_products_unwritten(db: Session):
+    product = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Bulk Stock Product", sku="BULK-001", category="Test Category",
+        description="Test Description", price=9.99, stock=10,
+    ))
+    version = product_crud.get_changes(db).next_since
+    
+    report = product_crud.adjust_stock(db=db, adjustments=[
+        StockAdjustment(id=product.id, stock=10),
+        StockAdjustment(id=product.id, delta=3),
+        StockAdjustment(id=product.id, delta=-3),
+    ])
+    
+    assert report.applied == 3
+    assert product_crud.get(db, id=product.id).version == product.version
+    assert product_crud.get_changes(db, since=version).changes == []
+
+
+def test_patch_is_one_conditional_update(db: Session):
+    product = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Versioned Product", sku="VERSION-001", category="Test Category",
+        description="Test Description", price=10.0, stock=10,
+    ))
+    other = product_crud.create(db=db, obj_in=ProductCreate(
+        name="Other Versioned Product", sku="VERSION-002", category="Test Category",
+        description="Test Description", price=10.0, stock=10,
+    ))
+    assert product.version == 1
+    
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    try:
+        patched = product_crud.patch(db, id=product.id, obj_in=ProductUpdate(price=12.5), version=1)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", record)
+    assert len(statements) == 1 and statements[0].startswith("UPDATE product SET price=")
+    assert "RETURNING" in statements[0]
+    assert (patched.price, patched.version, patched.stock) == (12.5, 2, 10)
+    
+    # A change made against an older version is refused, and nothing is written
+    with pytest.raises(HTTPException) as exc_info:
+        product_crud.patch(db, id=product.id, obj_in={"price": 1.0}, version=1)
+    assert exc_info.value.status_code == 409
+    with pytest.raises(HTTPException) as exc_info:
+        product_crud.patch(db, id=999, obj_in={"price": 1.0}, version=1)
+    assert exc_info.value.status_code == 404
+    
+    # Every write moves the version, so edits made before it are refused
+    product_crud.update_stock(db, product_id=product.id, quantity_change=-1)
+    product_crud.adjust_stock(db, adjustments=[StockAdjustment(id=product.id, delta=-1)])
+    current = product_crud.get(db, id=product.id)
+    assert (current.price, current.stock, current.version) == (12.5, 8, 4)
+    assert product_crud.patch(db, id=product.id, obj_in={"category": "Other Category"}).version == 5
+    
+    # The failed write rolls back its session; a session of its own, joined to the
+    # fixture's transaction through a savepoint, keeps that transaction alive
+    with Session(bind=db.connection(), join_transaction_mode="create_savepoint") as conflicting:
+        with pytest.raises(HTTPException) as exc_info:
+            product_crud.patch(conflicting, id=product.id, obj_in={"sku": other.sku}, version=5)
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Product with SKU 'VERSION-002' already exists"
+    assert product_crud.get(db, id=product.id).sku == "VERSION-001"
+
+
+def test_get_changes_returns_tombstones(db: Session):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Changed Product {i}", sku=f"CHANGE-00{i}", category="Test Category",
+            description="Test Description", price=9.99, stock=1,
+        ))
+        for i in range(3)
+    ]
+    version = product_crud.get_changes(db).next_since
+    
+    product_crud.update_stock(db=db, product_id=products[0].id, quantity_change=1)
+    product_crud.remove(db=db, id=products[1].id)
+    product_crud.update_stock(db=db, product_id=products[0].id, quantity_change=1)
+    
+    page = product_crud.get_changes(db, since=version)
+    assert [(c.id, c.deleted) for c in page.changes] == [(products[1].id, True), (products[0].id, False)]
+    assert page.changes[0].product is None
+    assert page.changes[1].product.stock == 3
+    assert page.changes[1].version == page.next_since
+    assert product_crud.get_changes(db, since=page.next_since).changes == []
+
+
+def test_get_listing_filters_sorts_and_pages(db: Session):
+    for i, (category, price, stock) in enumerate([
+        ("Books", 30.0, 5), ("Books", 10.0, 0), ("Books", 30.0, 2), ("Toys", 20.0, 1), ("Books", 60.0, 3),
+    ]):
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Listed Product {i}", sku=f"LIST-00{i}", category=category,
+            description="Test Description", price=price, stock=stock,
+        ))
+    
+    def names(products):
+        return [p.name[-1] for p in products]
+    
+    products, cursor = product_crud.get_listing(
+        db, category="Books", max_price=50, in_stock=True, sort="price", limit=1
+    )
+    assert names(products) == ["0"]
+    # Equal prices continue in ID order from the cursor
+    products, cursor = product_crud.get_listing(
+        db, category="Books", max_price=50, in_stock=True, sort="price", cursor=cursor, limit=1
+    )
+    assert names(products) == ["2"] and cursor is not None
+    products, cursor = product_crud.get_listing(
+        db, category="Books", max_price=50, in_stock=True, sort="price", cursor=cursor, limit=1
+    )
+    assert products == [] and cursor is None
+    
+    assert names(product_crud.get_listing(db, sort="-id")[0]) == ["4", "3", "2", "1", "0"]
+    assert names(product_crud.get_listing(db, in_stock=False)[0]) == ["1"]
+    assert names(product_crud.get_listing(db, min_price=20, sort="name")[0]) == ["0", "2", "3", "4"]
+    
+    _, cursor = product_crud.get_listing(db, sort="name", limit=1)
+    with pytest.raises(HTTPException) as exc_info:
+        product_crud.get_listing(db, sort="price", cursor=cursor)
+    assert exc_info.value.status_code == 400
+
+
+@pytest.mark.parametrize("wide_price_range", [False, True])
+def test_listing_query_plans_use_indexes(db: Session, monkeypatch, wide_price_range):
+    if wide_price_range:
+        # Every price range counts as wide, even in an empty table
+        monkeypatch.setattr("app.crud.product.WIDE_PRICE_RANGE", 0)
+    dialect = db.get_bind().dialect
+    for category, price_range, in_stock, sort, paged in itertools.product(
+        (None, "Books"), (False, True), (None, True), LISTING_SORTS, (False, True)
+    ):
+        cursor = None
+        if paged:
+            # Any position works; only the plan matters here
+            key = [sort] + {"id": [1], "-id": [1], "price": [9.5, 1], "name": ["A"]}[sort]
+            cursor = base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+        query = product_crud._listing_query(
+            db, category=category, min_price=10 if price_range else None, max_price=50 if price_range else None,
+            in_stock=in_stock, sort=sort, cursor=cursor,
+        ).limit(100)
+        sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        plan = [row[3] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+        combination = (category, price_range, in_stock, sort, paged, plan)
+        
+        # Filters seek in an index, or rows are read in the requested order and the scan stops at the limit
+        assert all("USING" in step or sort in ("id", "-id") for step in plan if step.startswith("SCAN")), combination
+        if any("TEMP B-TREE" in step for step in plan):
+            assert any(step.startswith("SEARCH") for step in plan), combination
+        if in_stock and sort == "price" and category is None:
+            assert any("ix_product_in_stock_price" in step for step in plan), combination
+        if category is not None and not price_range or wide_price_range:
+            assert not any("TEMP B-TREE" in step for step in plan), combination
+
+
+def test_facets_follow_product_writes(db: Session):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Faceted Product {i}", sku=f"FACET-00{i}", category=category,
+            description="Test Description", price=price, stock=stock,
+        ))
+        for i, (category, price, stock) in enumerate([("Books", 5.0, 1), ("Books", 30.0, 0), ("Toys", 30.0, 2)])
+    ]
+    
+    def counts():
+        facets = product_crud.get_facets(db)
+        return (
+            [(c.category, c.products, c.in_stock) for c in facets.categories],
+            [(b.min_price, b.products, b.in_stock) for b in facets.price_histogram if b.products],
+        )
+    
+    assert counts() == ([("Books", 2, 1), ("Toys", 1, 1)], [(0, 1, 1), (25, 2, 1)])
+    
+    product_crud.update_stock(db=db, product_id=products[0].id, quantity_change=-1)
+    product_crud.adjust_stock(db, adjustments=[StockAdjustment(id=products[1].id, stock=4)])
+    product_crud.update(
+        db, db_obj=product_crud.get(db, id=products[2].id), obj_in={"category": "Books", "price": 300.0}
+    )
+    product_crud.remove(db=db, id=products[0].id)
+    assert counts() == ([("Books", 2, 2)], [(25, 1, 1), (250, 1, 1)])
+    assert product_crud.get_facets(db, category="Toys").price_histogram[3].products == 0
+    
+    # The incremental counts match a full recompute
+    recompute_facets(db.connection())
+    assert counts() == ([("Books", 2, 2)], [(25, 1, 1), (250, 1, 1)])
+
+
 def test_check_stock_availability(db: Session):
     product_data = ProductCreate(
         name="Test Product for Stock Check",
@@ -0,0 +1,100 @@
+import marshal
+import threading
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import (
+    ProfiledRoute,
+    ProfileSpool,
+    ProfilingMiddleware,
+    StackSampler,
+)
+
+
+def busy_wait(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def build_app(monkeypatch, spool, sample_rate=0.0, mode="sampling"):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    router = APIRouter(route_class=ProfiledRoute)
+
+    @router.get("/work")
+    def slow_sync_handler():
+        busy_wait(0.05)
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(ProfilingMiddleware, spool=spool, sample_rate=sample_rate, mode=mode)
+    return app
+
+
+def test_stack_sampler_collapses_target_thread():
+    thread = threading.Thread(target=busy_wait, args=(0.05,))
+    thread.start()
+    sampler = StackSampler(thread.ident, interval=0.001)
+    sampler.start()
+    thread.join()
+    sampler.stop()
+
+    output = sampler.render().decode()
+    assert "busy_wait" in output
+    for line in output.strip().splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert ";" in stack
+
+
+def test_profile_spool_is_bounded(tmp_path):
+    spool = ProfileSpool(str(tmp_path), max_files=3)
+    for _ in range(5):
+        spool.write(b"a;b 1\n", "GET /products", "folded")
+    assert len(spool.files()) == 3
+
+
+def test_profile_returned_as_attachment(monkeypatch, tmp_path):
+    app = build_app(monkeypatch, ProfileSpool(str(tmp_path)))
+    client = TestClient(app)
+
+    response = client.get("/work")
+    assert response.json() == {"ok": True}
+
+    # Without a configured admin token the header is ignored, even with an empty token
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    response = client.get("/work", headers={"X-Profile": "attachment", "X-Admin-Token": ""})
+    assert response.json() == {"ok": True}
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "test-admin-token")
+
+    # Without a valid admin token the header is ignored
+    response = client.get("/work", headers={"X-Profile": "attachment", "X-Admin-Token": "wrong"})
+    assert response.json() == {"ok": True}
+
+    response = client.get(
+        "/work", headers={"X-Profile": "attachment", "X-Admin-Token": settings.ADMIN_TOKEN}
+    )
+    assert response.status_code == 200
+    assert response.headers["x-profiled-status"] == "200"
+    assert "attachment" in response.headers["content-disposition"]
+    assert "slow_sync_handler" in response.text
+
+
+def test_sampled_profiles_are_spooled(monkeypatch, tmp_path):
+    spool = ProfileSpool(str(tmp_path))
+    app = build_app(monkeypatch, spool, sample_rate=1.0, mode="cprofile")
+    client = TestClient(app)
+
+    response = client.get("/work")
+    assert response.json() == {"ok": True}
+
+    files = spool.files()
+    assert len(files) == 1
+    assert files[0].endswith("GET-work.prof")
+    stats = marshal.loads((tmp_path / files[0]).read_bytes())
+    assert any(name == "slow_sync_handler" for (_, _, name) in stats)
@@ -0,0 +1,67 @@
+import itertools
+import random
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.recommendations import CoOccurrenceMatrix, RecommendationEngine, recommendations
+from app.schemas.order import OrderCreate, OrderProductItem
+from app.schemas.product import ProductCreate
+
+
+def test_matrix_counts_pairs_and_stays_bounded():
+    rng = random.Random(3)
+    baskets = [rng.sample(range(1, 200), rng.randint(1, 6)) for _ in range(5000)]
+    exact = Counter(pair for basket in baskets for pair in itertools.permutations(basket, 2))
+
+    unpruned = CoOccurrenceMatrix(top_k=1000)
+    pruned = CoOccurrenceMatrix(top_k=5)
+    for basket in baskets:
+        unpruned.add(basket)
+        pruned.add(basket)
+
+    for product_id in (1, 50, 199):
+        expected = sorted(((other, n) for (p, other), n in exact.items() if p == product_id),
+                          key=lambda item: (-item[1], item[0]))
+        assert unpruned.related(product_id, 5) == expected[:5]
+    assert all(len(row) <= 10 for row in pruned.rows.values())
+    assert pruned.entries() < unpruned.entries() / 5
+
+
+def test_engine_matches_order_history(db: Session):
+    products = [
+        product_crud.create(db=db, obj_in=ProductCreate(
+            name=f"Basket Product {i}", sku=f"BASKET-00{i}", category="Test Category",
+            description="Test Description", price=9.99, stock=100,
+        )).id
+        for i in range(4)
+    ]
+
+    def place(*ids):
+        order_crud.create_with_stock_validation(db, obj_in=OrderCreate(products=[
+            OrderProductItem(product_id=product_id, quantity=1) for product_id in ids
+        ]))
+
+    place(products[0], products[1])
+    place(products[0], products[1], products[2])
+    place(products[0], products[2], products[0])
+
+    # Until the matrix is built, related products are counted from the order table
+    fallback = order_crud.get_bought_together(db, product_id=products[0])
+    assert [(r.product.id, r.orders) for r in fallback] == [(products[1], 2), (products[2], 2)]
+
+    engine = RecommendationEngine(batch_size=2)
+    engine.rebuild(db.connection())
+    assert engine.related(products[0]) == [(products[1], 2), (products[2], 2)]
+    assert engine.related(products[3]) == []
+
+    # Orders placed through this worker are counted as they are placed
+    recommendations.rebuild(db.connection())
+    try:
+        place(products[0], products[2])
+        related = order_crud.get_bought_together(db, product_id=products[0], limit=1)
+        assert [(r.product.id, r.orders) for r in related] == [(products[2], 3)]
+    finally:
+        recommendations.stop()
@@ -0,0 +1,100 @@
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.core.config import settings
+from app.db import session
+from app.db.session import STICKY_COOKIE, create_read_engine, get_db, get_read_db
+
+
+def test_read_engine_refuses_writes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'routing.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO item (id) VALUES (1)"))
+    read_engine = create_read_engine(engine)
+
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        with pytest.raises(OperationalError, match="readonly"):
+            conn.execute(text("INSERT INTO item (id) VALUES (2)"))
+
+    # Writes committed on the write engine are read at once
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO item (id) VALUES (3)"))
+    with read_engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM item")).scalar() == 2
+
+    # Another connection to an in-memory database would open an empty one
+    memory = create_engine("sqlite://")
+    assert create_read_engine(memory) is memory
+
+
+def _request(cookies: str = "") -> Request:
+    return Request({"type": "http", "headers": [(b"cookie", cookies.encode())] if cookies else []})
+
+
+def test_reads_stick_to_the_write_engine_after_a_write(monkeypatch):
+    assert session.read_engine is not session.engine
+
+    def bind_of(dependency, *args):
+        sessions = dependency(*args)
+        db = next(sessions)
+        bind = db.get_bind()
+        sessions.close()
+        return bind
+
+    # Off by default: writes set no cookie and reads use the read engine
+    response = Response()
+    assert bind_of(get_db, response) is session.engine
+    assert "set-cookie" not in response.headers
+    assert bind_of(get_read_db, _request(f"{STICKY_COOKIE}=1")) is session.read_engine
+
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 5.0)
+    response = Response()
+    sessions = get_db(response)
+    db = next(sessions)
+    assert "set-cookie" not in response.headers
+    db.commit()
+    sessions.close()
+    assert response.headers["set-cookie"].startswith(f"{STICKY_COOKIE}=1;")
+    assert "Max-Age=5" in response.headers["set-cookie"]
+    assert bind_of(get_read_db, _request(f"{STICKY_COOKIE}=1")) is session.engine
+    assert bind_of(get_read_db, _request()) is session.read_engine
+
+
+def test_sticky_cookie_only_follows_successful_writes(monkeypatch):
+    monkeypatch.setattr(settings, "DB_READ_YOUR_WRITES_SECONDS", 5.0)
+    app = FastAPI()
+
+    @app.post("/write")
+    def write(db=Depends(get_db)):
+        db.commit()
+        return {"ok": True}
+
+    @app.post("/noop")
+    def noop(db=Depends(get_db)):
+        return {"ok": True}
+
+    @app.post("/missing")
+    def missing(db=Depends(get_db)):
+        raise HTTPException(status_code=404, detail="Not found")
+
+    @app.post("/conflict")
+    def conflict(db=Depends(get_db)):
+        db.commit()
+        raise HTTPException(status_code=409, detail="Conflict")
+
+    @app.post("/invalid")
+    def invalid(quantity: int, db=Depends(get_db)):
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert STICKY_COOKIE in client.post("/write").cookies
+    assert "set-cookie" not in client.post("/noop").headers
+    for path in ("/missing", "/conflict", "/invalid?quantity=many"):
+        response = client.post(path)
+        assert response.status_code >= 400
+        assert "set-cookie" not in response.headers
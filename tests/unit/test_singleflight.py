@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def run_herd(flight, count, fn, generation=None):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def caller(i):
+        barrier.wait()
+        try:
+            results[i] = flight.do("hot", fn, generation=generation)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    executions = []
+
+    def load():
+        executions.append(1)
+        time.sleep(0.2)
+        return {"id": 1}
+
+    results = run_herd(flight, 20, load)
+    assert len(executions) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.metrics.top() == [{"key": "hot", "calls": 20, "executions": 1, "shared": 19, "errors": 0}]
+
+    # The call is forgotten once finished
+    assert flight.do("hot", lambda: "fresh") == "fresh"
+
+
+def test_errors_are_shared_with_waiters():
+    flight = SingleFlight()
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("database is locked")
+
+    results = run_herd(flight, 5, fail)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.metrics.top()[0]["errors"] == 5
+
+
+def test_newer_generation_does_not_join_older_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+
+    def old_load():
+        started.set()
+        release.wait()
+        return "old"
+
+    old = []
+    thread = threading.Thread(target=lambda: old.append(flight.do("hot", old_load, generation=1)))
+    thread.start()
+    started.wait()
+    assert flight.do("hot", lambda: "new", generation=2) == "new"
+    release.set()
+    thread.join()
+    assert old == ["old"]
+
+
+def test_async_calls_share_one_execution():
+    flight = AsyncSingleFlight()
+    executions = []
+
+    async def load():
+        executions.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise KeyError("missing")
+
+    async def main():
+        results = await asyncio.gather(*(flight.do(1, load) for _ in range(10)))
+        errors = await asyncio.gather(*(flight.do(2, failing) for _ in range(3)), return_exceptions=True)
+        return results, errors
+
+    results, errors = asyncio.run(main())
+    assert results == ["value"] * 10
+    assert len(executions) == 1
+    assert all(isinstance(error, KeyError) for error in errors)
+    stats = {entry["key"]: entry for entry in flight.metrics.top()}
+    assert stats["1"]["shared"] == 9 and stats["2"]["errors"] == 3
+
+
+def test_async_waiter_cancellation_leaves_call_running():
+    flight = AsyncSingleFlight()
+
+    async def load():
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do(1, load))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do(1, load))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert asyncio.run(main()) == "value"
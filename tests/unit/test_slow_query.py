@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud.product import product as product_crud
+from app.db.session import slow_query_log
+from app.db.slow_query import SlowQueryLog
+from app.schemas.product import ProductCreate
+
+
+def test_slow_query_captures_plan(db: Session):
+    log = SlowQueryLog(threshold_ms=0, maxlen=5)
+    engine = db.get_bind().engine
+    log.install(engine)
+    try:
+        product_crud.get_by_sku(db, sku="MISSING-001")
+    finally:
+        log.uninstall(engine)
+
+    entries = log.entries()
+    assert len(entries) == 1
+    entry = entries[0]
+    assert "FROM product" in entry.statement
+    assert "MISSING-001" in entry.parameters
+    assert any("ix_product_sku" in line or "uq_product_sku" in line or "autoindex" in line for line in entry.plan)
+    assert entry.route is None
+
+
+def test_slow_query_threshold_and_ring_buffer(db: Session):
+    log = SlowQueryLog(threshold_ms=0, maxlen=3)
+    engine = db.get_bind().engine
+    log.install(engine)
+    try:
+        for i in range(5):
+            product_crud.get(db, id=i)
+    finally:
+        log.uninstall(engine)
+    assert len(log.entries()) == 3
+    assert len(log.entries(limit=1)) == 1
+
+    log = SlowQueryLog(threshold_ms=10_000)
+    log.install(engine)
+    try:
+        product_crud.get(db, id=1)
+    finally:
+        log.uninstall(engine)
+    assert log.entries() == []
+
+
+def test_slow_query_sampling(db: Session):
+    log = SlowQueryLog(threshold_ms=0, sample_rate=0.0)
+    engine = db.get_bind().engine
+    log.install(engine)
+    try:
+        product_crud.get(db, id=1)
+    finally:
+        log.uninstall(engine)
+    assert log.entries() == []
+
+
+def test_failed_statements_leave_no_timing_behind(db: Session):
+    log = SlowQueryLog(threshold_ms=0)
+    engine = db.get_bind().engine
+    log.install(engine)
+    try:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                db.execute(text("SELECT * FROM missing_table"))
+        product_crud.get(db, id=1)
+    finally:
+        log.uninstall(engine)
+    assert "slow_query_start" not in db.connection().info
+    entries = log.entries()
+    assert len(entries) == 1 and "FROM product" in entries[0].statement
+
+
+def test_admin_endpoints_are_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "")
+    assert client.get("/admin/slow-queries").status_code == 404
+    assert client.get("/admin/slow-queries", headers={"X-Admin-Token": ""}).status_code == 404
+
+
+def test_admin_slow_queries_endpoint(client, db: Session, monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "test-admin-token")
+    product_crud.create(db, obj_in=ProductCreate(
+        name="Slow Query Product",
+        sku="SLOW-001",
+        category="Electronics",
+        description="Product used by the slow-query test",
+        price=10.0,
+        stock=1,
+    ))
+    engine = db.get_bind().engine
+    threshold = slow_query_log.threshold_ms
+    slow_query_log.threshold_ms = 0
+    slow_query_log.clear()
+    slow_query_log.install(engine)
+    try:
+        client.get("/products/1")
+    finally:
+        slow_query_log.uninstall(engine)
+        slow_query_log.threshold_ms = threshold
+
+    response = client.get("/admin/slow-queries")
+    assert response.status_code == 403
+
+    headers = {"X-Admin-Token": settings.ADMIN_TOKEN}
+    response = client.get("/admin/slow-queries", headers=headers)
+    assert response.status_code == 200
+    entries = response.json()
+    assert entries
+    assert entries[0]["route"] == "GET /products/{product_id}"
+    assert entries[0]["plan"]
+
+    response = client.delete("/admin/slow-queries", headers=headers)
+    assert response.status_code == 204
+    assert client.get("/admin/slow-queries", headers=headers).json() == []
@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.product import product as product_crud
+from app.db.base import Base
+from app.db.generate_data import generate
+from app.db.models.product import Product
+from app.db.snapshot import CatalogSnapshot, CatalogSnapshotManager, build_snapshot, read_version
+from app.schemas.product import Product as ProductSchema
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'catalog.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def test_snapshot_round_trips_products(engine, tmp_path):
+    generate(engine, products=300, orders=0, seed=4)
+    session = sessionmaker(bind=engine)()
+    session.add(Product(name="Torch 1", sku="TORCH-1", category="Grocery",
+                        description="Crème brûlée torch, 日本製", price=3.5, stock=0))
+    session.commit()
+    expected = [ProductSchema.model_validate(p) for p in session.query(Product).order_by(Product.id)]
+    session.close()
+
+    path = str(tmp_path / "catalog.snapshot")
+    version = build_snapshot(engine, path)
+    assert read_version(path) == version > 0
+
+    snapshot = CatalogSnapshot(path)
+    assert len(snapshot) == 301
+    assert [snapshot.get(p.id) for p in expected] == expected
+    assert snapshot.get(0) is None and snapshot.get(10_000) is None
+    assert snapshot.page(295, 100) == expected[295:]
+    assert snapshot.page(400, 10) == []
+
+
+def test_empty_catalog(engine, tmp_path):
+    path = str(tmp_path / "catalog.snapshot")
+    assert build_snapshot(engine, path) == 0
+    assert len(CatalogSnapshot(path)) == 0
+
+
+def test_manager_serves_without_queries_until_products_change(engine, tmp_path):
+    generate(engine, products=50, orders=0, seed=5)
+    manager = CatalogSnapshotManager(str(tmp_path / "catalog.snapshot"), rebuild_interval=3600)
+    manager.refresh(engine)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert manager.get(7).id == 7
+    assert [p.id for p in manager.page(0, 10)] == list(range(1, 11))
+    assert statements == []
+
+    # A write by this worker is visible immediately, other writes after the next poll
+    manager.mark_dirty(7)
+    assert manager.get(7) is None
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE product SET stock = 0 WHERE id = 8")
+    assert manager.get(8) is not None
+    manager.refresh(engine)
+    assert manager.get(8) is None and manager.get(9) is not None
+    assert manager.page(0, 10) is None
+    assert manager.page(10, 10) is not None
+
+    # Inserts shift listing pages, so the snapshot stops serving them until rebuilt
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO product (name, sku, category, price, stock) VALUES ('New Lamp', 'NEW-1', 'Home', 5, 1)"
+        )
+    manager.refresh(engine)
+    assert manager.page(10, 10) is None
+
+    manager.rebuild_interval = 0
+    manager.refresh(engine)
+    assert manager.get(8).stock == 0
+    assert manager.page(50, 10)[0].name == "New Lamp"
+
+
+def test_crud_reads_fall_back_for_changed_products(engine, tmp_path, monkeypatch):
+    generate(engine, products=20, orders=0, seed=6)
+    manager = CatalogSnapshotManager(str(tmp_path / "catalog.snapshot"), rebuild_interval=3600)
+    manager.refresh(engine)
+    monkeypatch.setattr("app.crud.product.catalog_snapshot", manager)
+
+    with sessionmaker(bind=engine)() as db:
+        before = product_crud.get_cached(db, id=3)
+        product_crud.update_stock(db, product_id=3, quantity_change=5)
+        assert product_crud.get_cached(db, id=3).stock == before.stock + 5
+        assert product_crud.get_multi_cached(db, skip=0, limit=5)[2].stock == before.stock + 5
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.crud.product import product as product_crud
+from app.db.models.product import Product
+from app.db.uniqueness import CountingBloomFilter, product_key_filter
+from app.schemas.product import ProductCreate
+
+
+def test_counting_bloom_filter_false_positive_rate():
+    bloom = CountingBloomFilter(10_000, error_rate=0.01)
+    for i in range(10_000):
+        bloom.add(f"key-{i}")
+    assert all(f"key-{i}" in bloom for i in range(10_000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20_000))
+    assert false_positives / 20_000 < 0.02
+
+    for i in range(5_000):
+        bloom.remove(f"key-{i}")
+    assert all(f"key-{i}" in bloom for i in range(5_000, 10_000))
+    assert sum(f"key-{i}" in bloom for i in range(5_000)) < 100
+
+
+def make_product(name: str, sku: str) -> ProductCreate:
+    return ProductCreate(
+        name=name, sku=sku, category="Test Category", description="Test Description", price=9.99, stock=0,
+    )
+
+
+def test_create_skips_uniqueness_queries_for_new_keys(db: Session):
+    # Committed, so the filter built from the engine sees it; the fixture drops the tables afterwards
+    engine = db.get_bind().engine
+    with Session(bind=engine) as committed:
+        product_crud.create(db=committed, obj_in=make_product("Existing Product", "EXIST-001"))
+    product_key_filter.rebuild(engine)
+    selects = []
+
+    def listener(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        product_crud.create(db=db, obj_in=make_product("New Product", "NEW-001"))
+        # Only the refresh of the created product
+        assert len(selects) == 1
+
+        with pytest.raises(HTTPException) as excinfo:
+            product_crud.create(db=db, obj_in=make_product("Existing Product", "EXIST-002"))
+        assert excinfo.value.detail == "Product with name 'Existing Product' already exists"
+
+        # A duplicate the filter does not know of is rejected by the unique constraint
+        db.add(Product(name="Elsewhere Product", sku="ELSE-001", category="Test Category", price=1.0, stock=0))
+        db.flush()
+        # The failed write rolls back its session; a session of its own, joined to the
+        # fixture's transaction through a savepoint, keeps that transaction alive
+        with Session(bind=db.connection(), join_transaction_mode="create_savepoint") as conflicting:
+            with pytest.raises(HTTPException) as excinfo:
+                product_crud.create(db=conflicting, obj_in=make_product("Other Product", "ELSE-001"))
+        assert excinfo.value.detail == "Product with SKU 'ELSE-001' already exists"
+        assert product_crud.get_by_sku(db, sku="ELSE-001").name == "Elsewhere Product"
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+        product_key_filter.stop()
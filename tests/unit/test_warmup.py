@@ -0,0 +1,80 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import LRUCache, product_cache
+from app.core.readiness import Readiness
+from app.crud.order import order as order_crud
+from app.crud.product import product as product_crud
+from app.db.generate_data import generate
+from app.db.models.order import Order
+from app.db.models.product import Product
+from app.db.session import create_read_engine
+from app.db.warmup import warm_up
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a" and cache.get(3) == "c"
+    assert cache.stats()["hits"] == 3
+
+    # A value loaded before an invalidation may be stale and is not cached
+    epoch = cache.epoch
+    cache.invalidate(9)
+    assert cache.set(4, "d", epoch=epoch) is False
+    assert cache.set(4, "d", epoch=cache.epoch) is True
+
+    disabled = LRUCache(0)
+    disabled.set(1, "a")
+    assert disabled.get(1) is None
+
+
+def test_stock_update_invalidates_cached_product(db: Session):
+    generate(db.get_bind().engine, products=5, orders=0, seed=1)
+    cached = product_crud.get_cached(db, id=1)
+    assert product_cache.get(1) is cached
+
+    product_crud.update_stock(db, product_id=1, quantity_change=3)
+    assert product_cache.get(1) is None
+    assert product_crud.get_cached(db, id=1).stock == cached.stock + 3
+
+
+def test_warm_up_preloads_popular_products(db: Session):
+    engine = db.get_bind().engine
+    generate(engine, products=200, orders=1000, seed=2)
+    read_engine = create_read_engine(engine)
+    readiness = Readiness()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for bind in (engine, read_engine):
+        event.listen(bind, "before_cursor_execute", record)
+    try:
+        outcome = warm_up(engine, readiness, budget_seconds=30, top_products=10, read_bind=read_engine)
+    finally:
+        for bind in (engine, read_engine):
+            event.remove(bind, "before_cursor_execute", record)
+        read_engine.dispose()
+
+    assert outcome == {"statements": "done", "indexes": "done", "products": "done"}
+    assert set(readiness.steps) == {"statements", "indexes", "products"}
+    popular = order_crud.get_popular_product_ids(db, limit=10)
+    assert len(popular) == 10
+    assert all(product_cache.get(product_id) is not None for product_id in popular)
+    # Warm-up only reads, and succeeds on the query_only read engine
+    assert statements and not [s for s in statements if s.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+    assert db.query(Product).count() == 200
+    assert db.query(Order).count() == 1000
+
+
+def test_warm_up_skips_steps_past_budget(db: Session):
+    readiness = Readiness()
+    outcome = warm_up(db.get_bind().engine, readiness, budget_seconds=0, top_products=10)
+    assert set(outcome.values()) == {"skipped"}
+    assert readiness.steps == {}